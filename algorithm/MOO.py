@@ -1,17 +1,12 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import concurrent.futures
 import re
 import copy
-from tqdm import tqdm
-# Set your OpenAI API key
 import random
-import torch
 from functools import partial
 import os
-from algorithm.base import ItemFactory,HistoryBuffer
-from openai import AzureOpenAI
-from rdkit import Chem
+from algorithm.base import ItemFactory,HistoryBuffer,MoleculeBuffer
+from model.lazy_import import lazy_import, when_imported
 import json
 from eval import get_evaluation
 import time
@@ -22,18 +17,26 @@ import pickle
 from model.LLM import LLM
 
 
-def set_seed(seed):
-    random.seed(seed)
-    np.random.seed(seed)
+# heavy backends are imported on first use, SACS / VMEC runs never load them
+Chem = lazy_import('rdkit.Chem')
+tqdm = lazy_import('tqdm', 'tqdm')
+
+def _seed_torch(seed, torch):
     torch.manual_seed(seed)
     if torch.cuda.is_available():
         torch.cuda.manual_seed(seed)
         torch.cuda.manual_seed_all(seed)  # if you are using multi-GPU.
-    os.environ['PYTHONHASHSEED'] = str(seed)
     
     torch.backends.cudnn.deterministic = True
     torch.backends.cudnn.benchmark = False
 
+def set_seed(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    os.environ['PYTHONHASHSEED'] = str(seed)
+    # torch is seeded now if loaded, otherwise as soon as something (a local model) imports it
+    when_imported('torch', partial(_seed_torch, seed))
+
 class MOO:
     def __init__(self, reward_system, llm,property_list,config,seed):
         self.reward_system = reward_system
@@ -50,9 +53,9 @@ class MOO:
         self.save_dir = os.path.join(self.config.get('save_dir'),self.config.get('model.name'))
         self.prompt_module = getattr(PromptTemplate ,self.config.get('model.prompt_module',default='Prompt'))
         self.history_moles = []
-        self.mol_buffer = [] # same as all_mols but with orders for computing auc
-        self.main_mol_buffer = []
-        self.au_mol_buffer = []
+        self.mol_buffer = MoleculeBuffer() # same as all_mols but with orders for computing auc
+        self.main_mol_buffer = MoleculeBuffer()
+        self.au_mol_buffer = MoleculeBuffer()
         self.results_dict = {'results':[]}
         self.main_results_dict = {'results':[]}
         self.au_results_dict = {'results':[]}
@@ -74,6 +77,9 @@ class MOO:
         self.num_gen = 0  # Initialize generation counter
         self.start_time = time.time()
         self.num_offspring = self.config.get('optimization.num_offspring',default=2)
+        # time/error budget of the hypervolume estimate for more than 3 objectives
+        self.hv_budget = {'max_time': self.config.get('optimization.hv_max_time',default=1.0),
+                          'rel_error': self.config.get('optimization.hv_rel_error',default=0.01)}
 
     def generate_initial_population(self, n):
         module_path = self.config.get('evalutor_path')  # e.g., "molecules"
@@ -112,9 +118,8 @@ class MOO:
     def store_history_moles(self,pops):
         unique_pop = []
         for i in pops:
-            if i.value not in self.history_moles:
+            if self.mol_buffer.add(i):
                 self.history_moles.append(i.value)
-                self.mol_buffer.append([i, len(self.mol_buffer)+1])
                 unique_pop.append(i)
             else:
                 self.repeat_num += 1
@@ -132,7 +137,8 @@ class MOO:
         for the given molecular buffer, and saves them to JSON.
 
         Parameters:
-        - mol_buffer (list): The molecular buffer to evaluate, list of (Molecule, Info) tuples.
+        - mol_buffer (MoleculeBuffer): The molecular buffer to evaluate; its order, total and
+          score columns are used directly.
         - buffer_type (str): The name of the buffer type ('main', 'au', or 'default' for mol_buffer).
         - finish (bool): Whether this is the final evaluation.
         """
@@ -142,12 +148,13 @@ class MOO:
         auc10 = top_auc(mol_buffer, 10, finish=finish, freq_log=100, max_oracle_calls=self.budget)
         auc100 = top_auc(mol_buffer, 100, finish=finish, freq_log=100, max_oracle_calls=self.budget)
 
-        top100 = sorted(mol_buffer, key=lambda item: item[0].total, reverse=True)[:100]
-        top100_mols = [i[0] for i in top100]
+        totals = mol_buffer.totals
+        top100_idx = np.argsort(-totals, kind='stable')[:100]
+        top100_mols = [mol_buffer[i][0] for i in top100_idx]
         top10 = top100_mols[:10]
 
-        avg_top10 = np.mean([i.total for i in top10])
-        avg_top100 = np.mean([i.total for i in top100_mols])
+        avg_top10 = np.mean(totals[top100_idx[:10]])
+        avg_top100 = np.mean(totals[top100_idx])
 
         if self.config.get('cal_div',default=False):
             from tdc import Evaluator
@@ -158,16 +165,16 @@ class MOO:
         
         ### 
         if 'l_delta_b' in top10[0].property and 'aspect_ratio' in top10[0].property:
-            all_mols = [item[0] for item in mol_buffer]
-            all_mols = [i for i in all_mols if i.constraints['feasibility']<0.01]
-            if len(all_mols)>0:
-                scores = np.array([[-i.property['l_delta_b'],i.property['aspect_ratio']] for i in all_mols])
+            feasible = mol_buffer.column('constraints', 'feasibility') < 0.01
+            if feasible.any():
+                scores = np.column_stack([-mol_buffer.column('property', 'l_delta_b'),
+                                          mol_buffer.column('property', 'aspect_ratio')])[feasible]
                 volume = cal_fusion_hv(scores)
             else:
                 volume = 0
         else:
-            scores = np.array([i.scores for i in top100_mols])
-            volume = cal_hv(scores) ###
+            scores = mol_buffer.scores[top100_idx]
+            volume = cal_hv(scores, **self.hv_budget) ###
 
         if buffer_type == "default":
             uniqueness = 1 - self.repeat_num / (self.generated_num + 1e-6)
@@ -308,6 +315,8 @@ class MOO:
                 population = self.evaluate(population) # including removing invalid and repeated candidates
             self.log_results()
             init_pops = copy.deepcopy(population)
+        # prompts/responses are appended to <store_path>_history.log; checkpoints only reference it
+        self.history.open(os.path.splitext(store_path)[0] + '_history')
         data = {
                 'history':self.history,
                 'init_pops':init_pops,
@@ -530,35 +539,32 @@ class MOO:
         Stores non-duplicate molecules into a specified buffer.
 
         Parameters:
-        - mol_buffer (list): List buffer to store Item objects.
+        - mol_buffer (MoleculeBuffer): Buffer to store Item objects.
         - mols (list): List of Item objects to attempt storing.
 
         Returns:
-        - list: Updated mol_buffer with new unique molecules.
+        - MoleculeBuffer: Updated mol_buffer with new unique molecules.
         """
-        all_smiles = [i[0].value for i in mol_buffer]
         for child in mols:
+            # values already in the buffer are canonical, no need to parse them again
+            if child.value in mol_buffer.index:
+                continue
             mol = Chem.MolFromSmiles(child.value) 
             if mol is None: # check if valid
                 pass
             else:
                 child.value = Chem.MolToSmiles(mol,canonical=True)
-                # check if repeated
-                if child.value in all_smiles:
-                    pass
-                else:
-                    all_smiles.append(child.value)
-                    mol_buffer.append([child,len(mol_buffer)+1])
+                mol_buffer.add(child)
         return mol_buffer
 
 
     def select_next_population(self,pop_size):
-        whole_population = [i[0] for i in self.mol_buffer]
+        whole_population = self.mol_buffer.items()
         if len(self.property_list)>1:
             # Fixed: Use proper NSGA-II selection instead of hybrid nsga2_so_selection
-            return nsga2_selection(whole_population, pop_size)
+            return nsga2_selection(whole_population, pop_size, scores=self.mol_buffer.scores)
         else:
-            return so_selection(whole_population,pop_size)
+            return so_selection(whole_population,pop_size, totals=self.mol_buffer.totals)
 
     def generate_offspring_au(self, population, offspring_times=20):
         parents = [random.sample(population, 2) for i in range(offspring_times)]
@@ -582,7 +588,7 @@ class MOO:
             ckpt = pickle.load(f)
         with open(json_path,'rb') as f:
             result_ckpt = json.load(f)
-        self.mol_buffer = ckpt['all_mols']
+        self.mol_buffer = MoleculeBuffer(ckpt['all_mols'])
         population = self.select_next_population(self.pop_size) 
         init_pops = ckpt['init_pops']
         self.history = ckpt['history']
@@ -2,12 +2,14 @@ from model.util import nsga2_selection
 import numpy as np
 
 from algorithm.base import Item
-import pygmo as pg
+from model.lazy_import import lazy_import
 from typing import List, Dict, Optional, Union
 import json
 import random
 import yaml
 
+pg = lazy_import('pygmo')
+
 
 class Prompt:
     def __init__(self, config, original_item: Item = None):
@@ -1,6 +1,10 @@
 import numpy as np
 import pickle
 import os
+import struct
+import tempfile
+import zlib
+from collections import deque
 from typing import List, Dict, Any
 
 class Item:
@@ -59,18 +63,334 @@ class ItemFactory:
             Item: A new Item instance.
         """
         return Item(value, self.property_list)
-    
+
+
+class MoleculeBuffer(list):
+    def __init__(self, pairs: List = ()) -> None:
+        """
+        Append-only buffer of [Item, order] pairs, the layout used by top_auc, log_results
+        and the checkpoints. Alongside the list it keeps a map from Item.value to position
+        and columnar arrays of the evaluation order, Item.total and Item.scores, so
+        membership tests, selection and metrics run on contiguous arrays instead of
+        walking the Items. Columns of Item.property / Item.constraints entries are built
+        on first use and extended incrementally.
+
+        The Items are the authoritative copy; the arrays are a cache of them. An Item
+        appended before its results were assigned is copied into the arrays by _sync()
+        on the next read of totals, scores, column() or snapshot(). Once an Item has
+        both total and scores it is not read again, so results must not be changed
+        after evaluation.
+
+        Args:
+            pairs (List): Existing [Item, order] pairs, e.g. a buffer loaded from a checkpoint.
+        """
+        super().__init__()
+        self.index = {}
+        self._totals = np.empty((64,))
+        self._orders = np.empty((64,), dtype=np.int64)
+        self._scores = None  # (capacity, n_objectives), allocated with the first scored item
+        self._stale = set()  # positions appended before their results were assigned
+        self._columns = {}
+        for pair in pairs:
+            self.append(pair)
+
+    def __reduce__(self):
+        return (self.__class__, (list(self),))
+
+    def _grow(self) -> None:
+        n = len(self._totals)
+        for name in ('_totals', '_orders', '_scores'):
+            old = getattr(self, name)
+            if old is None:
+                continue
+            new = np.full((2 * n,) + old.shape[1:], np.nan) if old.dtype.kind == 'f' else np.empty((2 * n,), old.dtype)
+            new[:n] = old
+            setattr(self, name, new)
+
+    def _fill(self, i: int, item: Item) -> bool:
+        self._totals[i] = np.nan if item.total is None else item.total
+        if item.scores is None:
+            return False
+        if self._scores is None:
+            self._scores = np.full((len(self._totals), len(item.scores)), np.nan)
+        self._scores[i] = item.scores
+        return item.total is not None
+
+    def _sync(self) -> None:
+        """Pick up results assigned to Items after they were appended."""
+        for i in sorted(self._stale):
+            if self._fill(i, list.__getitem__(self, i)[0]):
+                self._stale.discard(i)
+                self._columns.clear()
+
+    def append(self, pair: List) -> None:
+        item = pair[0]
+        n = len(self)
+        if n == len(self._totals):
+            self._grow()
+        self._orders[n] = pair[1]
+        if not self._fill(n, item):
+            self._stale.add(n)
+        self.index.setdefault(item.value, n)
+        super().append(pair)
+
+    def extend(self, pairs: List) -> None:
+        for pair in pairs:
+            self.append(pair)
+
+    def __iadd__(self, pairs: List) -> 'MoleculeBuffer':
+        self.extend(pairs)
+        return self
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('MoleculeBuffer is append-only')
+
+    __setitem__ = __delitem__ = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def add(self, item: Item) -> bool:
+        """
+        Appends [item, order] unless an item with the same value is already stored.
+
+        Args:
+            item (Item): Item whose value is already in canonical form.
+
+        Returns:
+            bool: True if the item was added.
+        """
+        if item.value in self.index:
+            return False
+        self.append([item, len(self) + 1])
+        return True
+
+    @staticmethod
+    def _view(array: np.ndarray) -> np.ndarray:
+        array.flags.writeable = False
+        return array
+
+    @property
+    def totals(self) -> np.ndarray:
+        """Read-only Item.total column (NaN where not evaluated), in buffer order."""
+        self._sync()
+        return self._view(self._totals[:len(self)])
+
+    @property
+    def orders(self) -> np.ndarray:
+        """Read-only evaluation order column (the second element of each pair)."""
+        return self._view(self._orders[:len(self)])
+
+    @property
+    def scores(self) -> np.ndarray:
+        """Read-only (n, n_objectives) matrix of Item.scores."""
+        self._sync()
+        if self._scores is None:
+            return np.empty((len(self), 0))
+        return self._view(self._scores[:len(self)])
+
+    def column(self, field: str, name: str) -> np.ndarray:
+        """
+        Float column of Item.<field>[name] for field 'property' or 'constraints'
+        (NaN where an Item lacks the entry).
+
+        Args:
+            field (str): 'property' or 'constraints'.
+            name (str): Key inside that dict.
+
+        Returns:
+            np.ndarray: Read-only array of length len(self).
+        """
+        self._sync()
+        values, n = self._columns.get((field, name), (np.empty((0,)), 0))
+        if n < len(self):
+            new = np.full((len(self) - n,), np.nan)
+            for k in range(n, len(self)):
+                entries = getattr(list.__getitem__(self, k)[0], field)
+                if entries and entries.get(name) is not None:
+                    new[k - n] = entries[name]
+            values = np.concatenate([values, new])
+            self._columns[(field, name)] = (values, len(self))
+        return self._view(values)
+
+    def items(self) -> List[Item]:
+        return [pair[0] for pair in self]
+
+    def snapshot(self) -> 'MoleculeBufferView':
+        """
+        Returns a read-only view of the current entries. Later appends are not visible
+        through it and nothing is copied.
+        """
+        self._sync()
+        return MoleculeBufferView(self, len(self))
+
+
+class MoleculeBufferView:
+    def __init__(self, buffer: MoleculeBuffer, n: int) -> None:
+        """
+        Read-only view of the first n entries of a MoleculeBuffer.
+
+        Args:
+            buffer (MoleculeBuffer): The underlying buffer.
+            n (int): Number of entries covered by the view.
+        """
+        self._buffer = buffer
+        self.n = n
+        self.totals = buffer._totals[:n]
+        self.totals.flags.writeable = False
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __contains__(self, value: str) -> bool:
+        return self._buffer.index.get(value, self.n) < self.n
+
+    def __getitem__(self, i: int) -> Item:
+        if not -self.n <= i < self.n:
+            raise IndexError(i)
+        return self._buffer[i % self.n][0]
+
+    def value(self, i: int) -> str:
+        return self[i].value
+
 class HistoryBuffer:
-    def __init__(self) -> None:
+    def __init__(self, log_path: str = None, window: int = 8) -> None:
         """
-        Initializes a history buffer for storing prompts, generations, and responses.
+        History of prompts, generations, and responses. Each pushed record is appended
+        to a compressed on-disk log (<log_path>.log plus an offset index <log_path>.idx)
+        and only the last `window` records stay in memory. prompts / generations /
+        responses are indexable, lazily loaded sequences, and pickling the buffer (the
+        checkpoints) stores the log location and length, not the records.
+
+        Args:
+            log_path (str): Path prefix of the log files; can also be set later with open().
+                A temporary file is used if records are pushed before a path is set.
+            window (int): Number of most recent records kept in memory.
         """
-        self.prompts = []
-        self.generations= []
-        self.responses = []
+        self.log_path = os.path.abspath(log_path) if log_path else None
+        self.n = 0
+        self.window = window
         self.successful_molecules = []
         self.failed_molecules = []
         self.save_path = 'checkpoint/'
+        self._reset_handles()
+
+    def _reset_handles(self) -> None:
+        self._recent = deque(maxlen=self.window)
+        self._legacy = None  # in-memory (prompts, generations, responses) lists of an old checkpoint
+        self._writer = None
+        self._reader = None
+
+    def __getstate__(self) -> Dict:
+        state = {k: v for k, v in self.__dict__.items() if not k.startswith('_')}
+        if self._legacy is not None:
+            state['prompts'], state['generations'], state['responses'] = self._legacy
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        state = dict(state)
+        legacy = None
+        if 'prompts' in state:
+            # checkpoint written before the on-disk log, or one holding records not yet spilled
+            legacy = (list(state.pop('prompts')), list(state.pop('generations')), list(state.pop('responses')))
+        state.setdefault('log_path', None)
+        state.setdefault('window', 8)
+        state.setdefault('n', len(legacy[0]) if legacy and state['log_path'] is None else 0)
+        self.__dict__.update(state)
+        self._reset_handles()
+        if legacy is not None and self.log_path is None:
+            self._legacy = legacy
+
+    @property
+    def prompts(self) -> 'HistoryField':
+        return HistoryField(self, 0)
+
+    @property
+    def generations(self) -> 'HistoryField':
+        return HistoryField(self, 1)
+
+    @property
+    def responses(self) -> 'HistoryField':
+        return HistoryField(self, 2)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def open(self, log_path: str) -> None:
+        """
+        Sets the log location unless the buffer already has one (a resumed checkpoint
+        keeps writing to its own log). Records of an old in-memory checkpoint are
+        moved to the log.
+        """
+        if self.log_path is not None:
+            return
+        self.log_path = os.path.abspath(log_path)
+        if self._legacy is not None:
+            legacy, self._legacy, self.n = self._legacy, None, 0
+            for record in zip(*legacy):
+                self.push(*record)
+
+    def _open_writer(self) -> None:
+        if self.log_path is None:
+            fd, path = tempfile.mkstemp(prefix='history_', suffix='.log')
+            os.close(fd)
+            self.log_path = path[:-len('.log')]
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        log = open(self.log_path + '.log', 'ab')
+        idx = open(self.log_path + '.idx', 'ab')
+        # drop records written after the checkpoint this buffer was loaded from
+        idx.truncate(8 * self.n)
+        log.truncate(self._end_offset(self.n - 1) if self.n else 0)
+        log.seek(0, os.SEEK_END)
+        idx.seek(0, os.SEEK_END)
+        self._writer = (log, idx)
+
+    def _end_offset(self, i: int) -> int:
+        with open(self.log_path + '.idx', 'rb') as f:
+            f.seek(8 * i)
+            return struct.unpack('<Q', f.read(8))[0]
+
+    def push(self, prompts: Any, generation: Any, responses: Any) -> None:
+        """
+        Appends a new generation record to the buffer.
+
+        Args:
+            prompts (Any): The prompt(s) used to generate molecules.
+            generation (Any): Generated molecule(s).
+            responses (Any): Model's response(s), e.g., SMILES strings.
+        """
+        record = (prompts, generation, responses)
+        if self._legacy is not None:
+            for values, value in zip(self._legacy, record):
+                values.append(value)
+            self.n += 1
+            return
+        if self._writer is None:
+            self._open_writer()
+        log, idx = self._writer
+        log.write(zlib.compress(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)))
+        log.flush()
+        idx.write(struct.pack('<Q', log.tell()))
+        idx.flush()
+        self._recent.append((self.n, record))
+        self.n += 1
+
+    def record(self, i: int) -> tuple:
+        """
+        Returns the (prompts, generation, responses) record i, reading it from the log
+        unless it is among the most recent ones.
+        """
+        if not -self.n <= i < self.n:
+            raise IndexError(i)
+        i %= self.n
+        if self._legacy is not None:
+            return tuple(values[i] for values in self._legacy)
+        if self._recent and i >= self._recent[0][0]:
+            return self._recent[i - self._recent[0][0]][1]
+        if self._reader is None:
+            self._reader = (open(self.log_path + '.log', 'rb'), open(self.log_path + '.idx', 'rb'))
+        log, idx = self._reader
+        idx.seek(8 * (i - 1) if i else 0)
+        start, end = struct.unpack('<QQ', idx.read(16)) if i else (0, struct.unpack('<Q', idx.read(8))[0])
+        log.seek(start)
+        return pickle.loads(zlib.decompress(log.read(end - start)))
 
     def save_to_pkl(self, filename: str) -> None:
         """
@@ -99,18 +419,31 @@ class HistoryBuffer:
         print(f"Data loaded from {filename}")
         return obj
 
-    def push(self, prompts: Any, generation: Any, responses: Any) -> None:
+
+class HistoryField:
+    def __init__(self, buffer: HistoryBuffer, field: int) -> None:
         """
-        Appends a new generation record to the buffer.
+        Read-only sequence over one field (prompts, generations or responses) of a
+        HistoryBuffer; entries are loaded on access.
 
         Args:
-            prompts (Any): The prompt(s) used to generate molecules.
-            generation (Any): Generated molecule(s).
-            responses (Any): Model's response(s), e.g., SMILES strings.
+            buffer (HistoryBuffer): The underlying buffer.
+            field (int): Position of the field in a record.
         """
-        self.prompts.append(prompts)
-        self.generations.append(generation)
-        self.responses.append(responses)
+        self._buffer = buffer
+        self._field = field
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        return self._buffer.record(i)[self._field]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
 
 
 '''
@@ -18,6 +18,7 @@ from model.util import *
 import importlib
 import pickle
 from model.LLM import LLM
+from evaluation_broker import make_rewarding_system
 from typing import List, Dict
 import yaml
 import argparse
@@ -347,7 +348,7 @@ class MOO:
             if population and population[0].total is None: population = self.evaluate(population)
             if population: self.log_results() # Only log if population is not empty
             init_pops = copy.deepcopy(population)
-        
+        self.history.open(os.path.splitext(store_path)[0] + '_history')
         data = {'history':self.history,'init_pops':init_pops,'final_pops':population,'all_mols':self.mol_buffer,'properties':self.property_list,
                 'evaluation': self.results_dict.get('results',[]),'running_time':f'{(time.time()-start_time)/3600:.2f} hours'}
         with open(store_path, 'wb') as f: pickle.dump(data, f)
@@ -530,7 +531,7 @@ if __name__ == "__main__":
         if not module_path: raise ValueError("'evalutor_path' not found in config.")
         module = importlib.import_module(module_path)
         RewardingSystem = getattr(module, "RewardingSystem")
-        reward_system = RewardingSystem(config=config)
+        reward_system = make_rewarding_system(config, RewardingSystem)
     except (ImportError, AttributeError, ValueError) as e:
         print(f"ERROR: Failed to initialize Rewarding System. Check 'evalutor_path' in your config. Details: {e}")
         exit(1)
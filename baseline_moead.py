@@ -11,6 +11,7 @@ from pymoo.optimize import minimize
 from pymoo.core.problem import Problem
 from pymoo.util.ref_dirs import get_reference_directions
 import yaml
+from evaluation_broker import make_rewarding_system
 
 # =========================================================================================================
 # UTILS (Copied from your framework for consistency)
@@ -109,7 +110,7 @@ def main():
             return yaml.dump(self._data)
 
     config = Config(config_data)
-    seed = 42
+    seed = int(os.environ.get('MOLLM_SEED', 42))
 
     # --- 2. Setup Environment ---
     property_list = config.get('goals')
@@ -124,7 +125,7 @@ def main():
     RewardingSystem = module.RewardingSystem
     generate_initial_population = module.generate_initial_population
     
-    reward_system = RewardingSystem(config)
+    reward_system = make_rewarding_system(config, RewardingSystem)
     
     class ItemFactory:
         def __init__(self, property_list):
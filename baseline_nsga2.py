@@ -25,11 +25,13 @@ class NSGA2BaselineMOO(BaselineMOO):
         """
         重写种群选择方法，实现 NSGA-II 的精英选择策略。
         """
-        whole_population = [item[0] for item in self.mol_buffer if item[0].total is not None]
-        if not whole_population:
+        evaluated = np.flatnonzero(~np.isnan(self.mol_buffer.totals))
+        if len(evaluated) == 0:
             return []
+        items = self.mol_buffer.items()
+        whole_population = [items[i] for i in evaluated]
         # print(f"[NSGA-II Selection] Selecting {pop_size} individuals from an archive of {len(whole_population)}.")
-        return nsga2_selection(whole_population, pop_size)
+        return nsga2_selection(whole_population, pop_size, scores=self.mol_buffer.scores[evaluated])
 
 
 class NSGA2BaselineRunner(MOLLM):
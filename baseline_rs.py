@@ -33,6 +33,7 @@ from model.MOLLM import ConfigLoader
 from algorithm.base import ItemFactory
 from problem.sacs_geo_jk.evaluator import RewardingSystem, generate_initial_population
 from model.util import nsga2_so_selection, top_auc, cal_hv
+from evaluation_broker import make_rewarding_system
 
 
 # =========================================================================
@@ -152,7 +153,7 @@ def run_rs_baseline(config_path: str, seed: int):
     print(f"评估预算: {eval_budget}, 日志记录频率: {log_freq}")
 
     item_factory = ItemFactory(goals)
-    reward_system = RewardingSystem(config=config)
+    reward_system = make_rewarding_system(config, RewardingSystem)
     print("ItemFactory 和 RewardingSystem 初始化完成。")
 
     model_name_folder = config.get('model.name').split(',')[-1]
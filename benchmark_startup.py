@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Startup cost of the optimizer modules, for tracking the effect of lazy imports.
+
+Each module is imported in a fresh interpreter (the situation of a
+ProcessPoolExecutor worker started with 'spawn') and the script reports the
+import time, the resident memory of that process, and which heavy backends
+(torch, rdkit, pygmo, pymoo, ...) ended up loaded. With --out the rows are
+appended to a JSONL file so runs can be compared over time.
+
+    python benchmark_startup.py
+    python benchmark_startup.py --modules algorithm.MOO problem.sacs_results --repeat 5 --out startup.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+DEFAULT_MODULES = ['model.util', 'model.LLM', 'algorithm.MOO']
+
+PROBE = r'''
+import json, sys, time, importlib, resource
+sys.path.insert(0, {root!r})
+def rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+base = rss_kb()
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - start
+from model.lazy_import import loaded_heavy_modules
+print(json.dumps({{'import_s': elapsed, 'rss_kb': rss_kb(), 'rss_delta_kb': rss_kb() - base,
+                  'heavy_loaded': loaded_heavy_modules(), 'n_modules': len(sys.modules)}}))
+'''
+
+
+def probe(module: str, root: str) -> dict:
+    result = subprocess.run([sys.executable, '-c', PROBE.format(root=root, module=module)],
+                            capture_output=True, text=True, cwd=root)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return {'error': lines[-1] if lines else f'exit code {result.returncode}'}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time and worker memory of the optimizer modules.')
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES)
+    parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per module (median is reported)')
+    parser.add_argument('--out', default=None, help='append results to this JSONL file')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    print(f"{'module':<28}{'import (s)':>12}{'RSS (MB)':>10}{'+RSS (MB)':>11}  heavy backends loaded")
+    for module in args.modules:
+        runs = [probe(module, root) for _ in range(max(1, args.repeat))]
+        ok = [r for r in runs if 'error' not in r]
+        if not ok:
+            print(f"{module:<28}  failed: {runs[0]['error']}")
+            rows.append({'module': module, 'error': runs[0]['error']})
+            continue
+        row = {
+            'module': module,
+            'import_s': statistics.median(r['import_s'] for r in ok),
+            'rss_mb': statistics.median(r['rss_kb'] for r in ok) / 1024,
+            'rss_delta_mb': statistics.median(r['rss_delta_kb'] for r in ok) / 1024,
+            'heavy_loaded': ok[-1]['heavy_loaded'],
+            'n_modules': ok[-1]['n_modules'],
+        }
+        rows.append(row)
+        print(f"{module:<28}{row['import_s']:>12.3f}{row['rss_mb']:>10.1f}{row['rss_delta_mb']:>11.1f}  "
+              f"{', '.join(row['heavy_loaded']) or '-'}")
+
+    if args.out:
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with open(args.out, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps({'time': stamp, 'python': sys.version.split()[0], **row}) + '\n')
+        print(f"Results appended to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
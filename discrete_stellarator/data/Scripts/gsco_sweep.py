@@ -0,0 +1,358 @@
+"""
+gsco_sweep.py
+
+Runs a grid of GSCO optimizations of the 96x100 wireframe in parallel, for
+trade-off studies over the sparsity weight lambda_S, the GSCO loop current
+fraction and (for the multi-step procedure) the current fraction schedule.
+
+Two problem setups are supported:
+  sector:    as in gsco_sector.py, with planar TF coils built into the
+             wireframe and a single GSCO run per configuration
+  multistep: as in gsco_multistep.py, with external TF coils and repeated
+             GSCO steps whose loop current shrinks by cur_frac_decay per step
+
+The wireframe, plasma boundary and normal-field matrices (Amat, bvec) are
+computed once, saved as .npy files and memory-mapped read-only by every
+worker process, so the expensive Biot-Savart step is not repeated per
+configuration. The matrices are reused on later sweeps with the same setup.
+Results (objectives, field error, timings and convergence) are collected into
+one CSV table with a row per configuration.
+
+Example:
+  OMP_NUM_THREADS=1 python gsco_sweep.py --mode sector \\
+      --log_lambda_S -8 -7.5 -7 --cur_frac 0.02 0.03 0.04 --n_jobs 9
+"""
+
+import os
+import csv
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from simsopt.geo import SurfaceRZFourier, ToroidalWireframe, \
+                        create_equally_spaced_curves
+from simsopt.solve import optimize_wireframe
+from simsopt.solve.wireframe_optimization import bnorm_obj_matrices
+from simsopt.field import WireframeField, BiotSavart, Current, \
+                          coils_via_symmetries
+from helper_functions import constrain_enclosed_segments, find_coil_sizes
+
+# Number of wireframe segments per half period in the toroidal dimension
+wf_nPhi = 96
+
+# Number of wireframe segments in the poloidal dimension
+wf_nTheta = 100
+
+# Resolution of test points on plasma boundary (poloidal and toroidal)
+plas_n = 32
+
+# Number of planar TF coils in the solution per half period
+n_tf_coils_hp = 3
+
+# Toroidal width, in cells, of the restricted regions (breaks) between sectors
+break_width = 4
+
+# Average magnetic field on axis, in Teslas, to be produced by the wireframe.
+field_on_axis = 1.0
+
+# File for the desired boundary magnetic surface:
+filename_equil = '../Supporting_Files/input.LandremanPaul2021_QA'
+
+# File specifying the geometry of the wireframe surface (made with BNORM)
+filename_wf_surf = '../Supporting_Files/nescin.LandremanPaul2021_QA'
+
+############################################################
+# End of fixed input parameters.
+############################################################
+
+
+def build_problem(mode):
+    """
+    Constructs the plasma boundary, the constrained wireframe and, for the
+    multistep setup, the external TF coil field. This is cheap compared to
+    the normal-field matrices and is repeated for every configuration.
+    """
+
+    surf_plas = SurfaceRZFourier.from_vmec_input(filename_equil,
+                    nphi=plas_n, ntheta=plas_n, range='half period')
+    surf_wf = SurfaceRZFourier.from_nescoil_input(filename_wf_surf, 'current')
+    wf = ToroidalWireframe(surf_wf, wf_nPhi, wf_nTheta)
+
+    # Calculate the required net poloidal current
+    mu0 = 4.0 * np.pi * 1e-7
+    pol_cur = -2.0*np.pi*surf_plas.get_rc(0,0)*field_on_axis/mu0
+
+    ext_field = None
+    if mode == 'sector':
+        tfcoil_current = pol_cur/(2*wf.nfp*n_tf_coils_hp)
+        wf.add_tfcoil_currents(n_tf_coils_hp, tfcoil_current)
+        wf.set_toroidal_breaks(n_tf_coils_hp, break_width,
+                               allow_pol_current=True)
+        wf.set_poloidal_current(pol_cur)
+    else:
+        wf.set_toroidal_breaks(n_tf_coils_hp, break_width)
+        wf.set_poloidal_current(0)
+        tf_curves = create_equally_spaced_curves(n_tf_coils_hp, surf_plas.nfp,
+                                                 True, R0=1.0, R1=0.85)
+        tf_curr = [Current(-pol_cur/(2*n_tf_coils_hp*surf_plas.nfp))
+                   for i in range(n_tf_coils_hp)]
+        tf_coils = coils_via_symmetries(tf_curves, tf_curr, surf_plas.nfp, True)
+        ext_field = BiotSavart(tf_coils)
+
+    return surf_plas, wf, pol_cur, ext_field
+
+
+def problem_key(mode):
+    return {'mode': mode, 'wf_nPhi': wf_nPhi, 'wf_nTheta': wf_nTheta,
+            'plas_n': plas_n, 'n_tf_coils_hp': n_tf_coils_hp,
+            'break_width': break_width, 'field_on_axis': field_on_axis,
+            'filename_equil': os.path.abspath(filename_equil),
+            'filename_wf_surf': os.path.abspath(filename_wf_surf)}
+
+
+def prepare_matrices(mode, matrix_dir):
+    """
+    Computes Amat and bvec once and saves them to matrix_dir, unless files
+    for the same problem setup are already there.
+    """
+
+    meta_file = os.path.join(matrix_dir, 'problem.json')
+    if os.path.exists(meta_file):
+        with open(meta_file) as f:
+            if json.load(f) == problem_key(mode):
+                print('Reusing normal-field matrices in ' + matrix_dir)
+                return
+
+    os.makedirs(matrix_dir, exist_ok=True)
+    surf_plas, wf, pol_cur, ext_field = build_problem(mode)
+    t0 = time.time()
+    Amat, bvec = bnorm_obj_matrices(wf, surf_plas, ext_field=ext_field,
+                                    verbose=False)
+    print('Normal-field matrices computed in %.1f s, Amat %d x %d'
+          % (time.time() - t0, Amat.shape[0], Amat.shape[1]))
+    np.save(os.path.join(matrix_dir, 'Amat.npy'), np.ascontiguousarray(Amat))
+    np.save(os.path.join(matrix_dir, 'bvec.npy'), np.ascontiguousarray(bvec))
+    with open(meta_file, 'w') as f:
+        json.dump(problem_key(mode), f, indent=2)
+
+
+_worker = {}
+
+
+def _init_worker(mode, matrix_dir):
+    _worker['mode'] = mode
+    _worker['Amat'] = np.load(os.path.join(matrix_dir, 'Amat.npy'),
+                              mmap_mode='r')
+    _worker['bvec'] = np.load(os.path.join(matrix_dir, 'bvec.npy'),
+                              mmap_mode='r')
+
+
+def field_error(wf, surf_plas, ext_field):
+    """Area-weighted mean of |B.n|/|B| on the plasma boundary"""
+
+    mf = WireframeField(wf) if ext_field is None \
+         else WireframeField(wf) + ext_field
+    mf.set_points(surf_plas.gamma().reshape((-1,3)))
+    Bfield = mf.B().reshape((plas_n, plas_n, 3))
+    Bnormal = np.sum(Bfield * surf_plas.unitnormal(), axis=2)
+    modB = np.sqrt(np.sum(Bfield**2, axis=2))
+    area = np.sqrt(np.sum(surf_plas.normal()**2, axis=2))/float(modB.size)
+    return np.sum(np.abs(Bnormal/modB)*area)/np.sum(area)
+
+
+def run_sector(config, wf, pol_cur, Amat, bvec):
+    opt_params = {'lambda_S': config['lambda_S'],
+                  'max_iter': config['max_iter'],
+                  'print_interval': config['max_iter'],
+                  'no_crossing': True,
+                  'default_current': np.abs(config['cur_frac']*pol_cur),
+                  'max_current': 1.1 * np.abs(config['cur_frac']*pol_cur)
+                 }
+    res = optimize_wireframe(wf, 'gsco', opt_params, Amat=Amat, bvec=bvec,
+                             verbose=False)
+    return res, 1
+
+
+def run_multistep(config, wf, pol_cur, Amat, bvec):
+    soln_prev = np.full(wf.currents.shape, np.nan)
+    soln_current = np.array(wf.currents)
+    cur_frac = config['cur_frac']
+    loop_count = None
+    final_step = False
+    encl_segs = []
+    n_step = 0
+    converged = False
+
+    while not final_step:
+
+        n_step += 1
+
+        # at the step cap the final adjustment still runs, and the row
+        # reports converged=False
+        converged = bool(np.all(soln_prev == soln_current))
+        if converged or n_step >= config['max_steps']:
+            final_step = True
+            wf.set_segments_free(encl_segs)
+
+        opt_params = {'lambda_S': config['lambda_S'],
+                      'max_iter': config['max_iter'],
+                      'print_interval': config['max_iter'],
+                      'no_crossing': True,
+                      'max_loop_count': 1,
+                      'loop_count_init': loop_count
+                     }
+        if not final_step:
+            opt_params['default_current'] = np.abs(cur_frac*pol_cur)
+            opt_params['max_current'] = 1.1 * np.abs(cur_frac*pol_cur)
+        else:
+            opt_params['match_current'] = True
+            opt_params['no_new_coils'] = True
+            opt_params['default_current'] = 0
+            opt_params['max_current'] = \
+                1.1 * np.abs(config['cur_frac']*pol_cur)
+
+        res = optimize_wireframe(wf, 'gsco', opt_params, Amat=Amat,
+                                 bvec=bvec, verbose=False)
+
+        if not final_step:
+
+            # "Sweep" the solution to remove coils that are too small
+            coil_sizes = find_coil_sizes(res['loop_count'],
+                                         wf.get_cell_neighbors())
+            small_inds = np.where(np.logical_and(coil_sizes > 0,
+                            coil_sizes < config['min_coil_size']))[0]
+            adjoining_segs = wf.get_cell_key()[small_inds,:]
+            segs_to_zero = np.unique(adjoining_segs.reshape((-1)))
+            loop_count = res['loop_count']
+            wf.currents[segs_to_zero] = 0
+            loop_count[small_inds] = 0
+            encl_segs = constrain_enclosed_segments(wf, loop_count)
+
+        cur_frac *= config['cur_frac_decay']
+        soln_prev = soln_current
+        soln_current = np.array(wf.currents)
+
+    res['converged'] = converged
+    return res, n_step
+
+
+def _run_config(config):
+    """Runs one configuration in a worker and returns its summary row"""
+
+    row = dict(config)
+    t0 = time.time()
+    try:
+        surf_plas, wf, pol_cur, ext_field = build_problem(_worker['mode'])
+        Amat, bvec = _worker['Amat'], _worker['bvec']
+        run = run_sector if _worker['mode'] == 'sector' else run_multistep
+        res, n_steps = run(config, wf, pol_cur, Amat, bvec)
+
+        x = np.array(wf.currents).reshape((-1,1))
+        f_hist = res.get('f_hist')
+        row.update({
+            'status': 'ok',
+            'constraints_ok': bool(wf.check_constraints()),
+            'f_B': 0.5 * np.sum((Amat @ x - bvec.reshape((-1,1)))**2),
+            'f_S': 0.5 * np.linalg.norm(x.ravel(), ord=0),
+            'mean_rel_Bn': field_error(wf, surf_plas, ext_field),
+            'I_max': np.max(np.abs(x)),
+            'n_active_segments': int(np.count_nonzero(x)),
+            'n_steps': n_steps,
+            'converged': res.get('converged'),
+            'n_iter_last_step': len(res['iter_hist']) - 1
+                                if 'iter_hist' in res else None,
+            'f_last_step_start': f_hist[0] if f_hist is not None else None,
+            'f_last_step_end': f_hist[-1] if f_hist is not None else None,
+        })
+    except Exception as e:
+        row.update({'status': 'failed', 'error': '%s: %s'
+                    % (type(e).__name__, e)})
+    row['opt_time'] = time.time() - t0
+    return row
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Parallel GSCO sweep')
+    parser.add_argument('--mode', choices=['sector', 'multistep'],
+                        default='sector')
+    parser.add_argument('--log_lambda_S', type=float, nargs='+',
+                        default=[-7.5], help='log10 of the sparsity weight')
+    parser.add_argument('--cur_frac', type=float, nargs='+', default=None,
+                        help='GSCO loop current as a fraction of the net TF '
+                             'current (default 0.03 sector, 0.2 multistep)')
+    parser.add_argument('--cur_frac_decay', type=float, nargs='+',
+                        default=[0.5], help='multistep: per-step factor')
+    parser.add_argument('--min_coil_size', type=int, nargs='+',
+                        default=[20], help='multistep: min saddle coil size')
+    parser.add_argument('--max_steps', type=int, default=20,
+                        help='multistep: cap on the number of GSCO steps, '
+                             'the last one is the final adjustment step')
+    parser.add_argument('--max_iter', type=int, default=None,
+                        help='GSCO iterations per run (default 20000 '
+                             'sector, 2500 multistep)')
+    parser.add_argument('--n_jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--out_dir', default='./output/')
+    args = parser.parse_args()
+
+    sector = args.mode == 'sector'
+    cur_fracs = args.cur_frac or [0.03 if sector else 0.2]
+    max_iter = args.max_iter or (20000 if sector else 2500)
+    schedules = [(1.0, 0)] if sector else \
+                list(itertools.product(args.cur_frac_decay, args.min_coil_size))
+
+    configs = []
+    for log_lambda_S, cur_frac, (decay, min_size) in \
+            itertools.product(args.log_lambda_S, cur_fracs, schedules):
+        configs.append({'mode': args.mode,
+                        'lambda_S': 10**log_lambda_S,
+                        'cur_frac': cur_frac,
+                        'cur_frac_decay': decay,
+                        'min_coil_size': min_size,
+                        'max_iter': max_iter,
+                        'max_steps': 1 if sector else args.max_steps})
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    matrix_dir = os.path.join(args.out_dir, 'gsco_sweep_matrices_' + args.mode)
+    prepare_matrices(args.mode, matrix_dir)
+
+    print('Running %d configurations on %d processes'
+          % (len(configs), min(args.n_jobs, len(configs))))
+    rows = []
+    t0 = time.time()
+    with ProcessPoolExecutor(max_workers=min(args.n_jobs, len(configs)),
+                             initializer=_init_worker,
+                             initargs=(args.mode, matrix_dir)) as pool:
+        futures = [pool.submit(_run_config, c) for c in configs]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            if row['status'] == 'ok':
+                print('  [%d/%d] lambda_S %9.3e  cur_frac %6.3f  f_B %11.4e'
+                      '  f_S %11.4e  <|Bn|/|B|> %11.4e  %8.1f s'
+                      % (len(rows), len(configs), row['lambda_S'],
+                         row['cur_frac'], row['f_B'], row['f_S'],
+                         row['mean_rel_Bn'], row['opt_time']))
+            else:
+                print('  [%d/%d] lambda_S %9.3e  cur_frac %6.3f  FAILED: %s'
+                      % (len(rows), len(configs), row['lambda_S'],
+                         row['cur_frac'], row['error']))
+
+    rows.sort(key=lambda r: (r['lambda_S'], r['cur_frac'],
+                             r['cur_frac_decay'], r['min_coil_size']))
+    fields = []
+    for row in rows:
+        fields += [k for k in row if k not in fields]
+    out_file = os.path.join(args.out_dir, 'gsco_sweep_%s.csv' % (args.mode))
+    with open(out_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    print('Sweep finished in %.1f s, summary written to %s'
+          % (time.time() - t0, out_file))
+
+
+if __name__ == '__main__':
+    main()
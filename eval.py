@@ -49,10 +49,11 @@ def judge(requirement,input_mol_value,output_mol_value):
         return (a<=output_mol_value<=b)
 
 import re
-from tqdm import tqdm
-import requests
 import json
 import numpy as np
+from model.lazy_import import lazy_import
+tqdm = lazy_import('tqdm', 'tqdm')
+requests = lazy_import('requests')
 url = 'http://cpu1.ms.wyue.site:8000/process'
 import time
 
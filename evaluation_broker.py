@@ -0,0 +1,424 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Local evaluation broker: a job queue on localhost between optimizer processes
+and the workers that own a RewardingSystem (and with it a SACS project
+directory). Several experiments on one host then share one worker pool
+instead of each driving the solver in its own process.
+
+    # broker
+    python evaluation_broker.py serve --port 8765
+    # one worker per SACS project copy, all serving the same pool
+    python evaluation_broker.py worker --config sacs_section_jk/config.yaml --pool section_jk
+    # stand-in worker (no solver, deterministic fake scores) for tests
+    python evaluation_broker.py worker --config sacs_section_jk/config.yaml --pool section_jk --stand_in
+
+Optimizers opt in through their config:
+
+    broker:
+      url: http://127.0.0.1:8765
+      pool: section_jk
+      client: my_experiment    # optional, defaults to host:pid
+      weight: 1                # optional fair-share weight
+
+and `make_rewarding_system` then returns a BrokerRewardingSystem, which has
+the same evaluate(items) -> (items, log_dict) interface as RewardingSystem.
+
+Every item is one task. Workers claim tasks from their pool; among the clients
+with queued tasks the broker serves the one with the fewest tasks in flight
+per unit of weight, so a large batch from one experiment cannot starve the
+others. A claimed task that is not completed within its lease (worker crash,
+hung solver) goes back to the front of its client's queue.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import argparse
+import threading
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+def _to_json(obj):
+    return json.dumps(obj, default=lambda o: o.item() if hasattr(o, 'item') else str(o)).encode('utf-8')
+
+
+class EvaluationBroker:
+    def __init__(self, lease_seconds: float = 900.) -> None:
+        """
+        In-memory broker state. All methods are thread-safe.
+
+        Args:
+            lease_seconds (float): Time a worker may hold a task before it is re-queued.
+        """
+        self.lease_seconds = lease_seconds
+        self.cond = threading.Condition()
+        self.queues = {}        # pool -> client -> deque of task ids
+        self.in_flight = {}     # pool -> client -> number of claimed tasks
+        self.last_served = {}   # (pool, client) -> time of last claim
+        self.weights = {}       # (pool, client) -> fair-share weight
+        self.tasks = {}         # task id -> task dict
+        self.batches = {}       # batch id -> list of task ids
+        self.workers = {}       # worker id -> {'pool', 'last_seen', 'completed'}
+
+    def submit(self, pool: str, client: str, payloads: List[Any], weight: float = 1.) -> str:
+        batch_id = uuid.uuid4().hex
+        with self.cond:
+            queue = self.queues.setdefault(pool, {}).setdefault(client, deque())
+            self.in_flight.setdefault(pool, {}).setdefault(client, 0)
+            self.weights[(pool, client)] = max(float(weight), 1e-6)
+            task_ids = []
+            for payload in payloads:
+                task_id = uuid.uuid4().hex
+                self.tasks[task_id] = {'task_id': task_id, 'batch_id': batch_id, 'pool': pool, 'client': client,
+                                       'payload': payload, 'state': 'queued', 'result': None,
+                                       'deadline': None, 'attempts': 0}
+                queue.append(task_id)
+                task_ids.append(task_id)
+            self.batches[batch_id] = task_ids
+            self.cond.notify_all()
+        return batch_id
+
+    def _requeue_expired(self, now: float) -> None:
+        for task in self.tasks.values():
+            if task['state'] == 'claimed' and task['deadline'] < now:
+                task['state'] = 'queued'
+                self.in_flight[task['pool']][task['client']] -= 1
+                self.queues[task['pool']][task['client']].appendleft(task['task_id'])
+
+    def _pick_client(self, pool: str) -> Optional[str]:
+        candidates = [c for c, q in self.queues.get(pool, {}).items() if q]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: (self.in_flight[pool][c] / self.weights[(pool, c)],
+                                              self.last_served.get((pool, c), 0.)))
+
+    def claim(self, pool: str, worker_id: str, wait: float = 0.) -> Optional[Dict]:
+        end = time.time() + wait
+        with self.cond:
+            self.workers[worker_id] = {**self.workers.get(worker_id, {'completed': 0}),
+                                       'pool': pool, 'last_seen': time.time()}
+            while True:
+                now = time.time()
+                self._requeue_expired(now)
+                client = self._pick_client(pool)
+                if client is not None:
+                    task = self.tasks[self.queues[pool][client].popleft()]
+                    task.update(state='claimed', worker=worker_id, deadline=now + self.lease_seconds,
+                                attempts=task['attempts'] + 1)
+                    self.in_flight[pool][client] += 1
+                    self.last_served[(pool, client)] = now
+                    return {'task_id': task['task_id'], 'payload': task['payload']}
+                if now >= end:
+                    return None
+                self.cond.wait(min(end - now, 1.))
+
+    def complete(self, task_id: str, worker_id: str, result: Any) -> bool:
+        with self.cond:
+            task = self.tasks.get(task_id)
+            # a late answer for a task that was re-queued and handed to someone else still counts
+            if task is None or task['state'] == 'done':
+                return False
+            if task['state'] == 'claimed':
+                self.in_flight[task['pool']][task['client']] -= 1
+            else:
+                self.queues[task['pool']][task['client']].remove(task_id)
+            task.update(state='done', result=result)
+            if worker_id in self.workers:
+                self.workers[worker_id]['completed'] += 1
+                self.workers[worker_id]['last_seen'] = time.time()
+            self.cond.notify_all()
+            return True
+
+    def results(self, batch_id: str, wait: float = 0., forget: bool = True) -> Optional[Dict]:
+        """Results in submission order once the whole batch is done, else the progress so far"""
+        end = time.time() + wait
+        with self.cond:
+            if batch_id not in self.batches:
+                return None
+            while True:
+                tasks = [self.tasks[t] for t in self.batches[batch_id]]
+                n_done = sum(t['state'] == 'done' for t in tasks)
+                if n_done == len(tasks):
+                    response = {'done': True, 'n_done': n_done, 'results': [t['result'] for t in tasks]}
+                    if forget:
+                        for t in self.batches.pop(batch_id):
+                            del self.tasks[t]
+                    return response
+                now = time.time()
+                if now >= end:
+                    return {'done': False, 'n_done': n_done, 'n_total': len(tasks)}
+                self.cond.wait(min(end - now, 1.))
+
+    def status(self) -> Dict:
+        with self.cond:
+            return {
+                'pools': {pool: {client: {'queued': len(q), 'in_flight': self.in_flight[pool][client]}
+                                 for client, q in clients.items()}
+                          for pool, clients in self.queues.items()},
+                'workers': self.workers,
+                'open_batches': len(self.batches),
+            }
+
+
+class _BrokerHandler(BaseHTTPRequestHandler):
+    broker: EvaluationBroker = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, code, body):
+        data = _to_json(body)
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._reply(200, self.broker.status())
+        else:
+            self._reply(404, {'error': f'unknown path {self.path}'})
+
+    def do_POST(self):
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if self.path == '/submit':
+                batch_id = self.broker.submit(request['pool'], request['client'], request['payloads'],
+                                              request.get('weight', 1.))
+                self._reply(200, {'batch_id': batch_id})
+            elif self.path == '/claim':
+                self._reply(200, {'task': self.broker.claim(request['pool'], request['worker_id'],
+                                                            min(float(request.get('wait', 0.)), 60.))})
+            elif self.path == '/complete':
+                self._reply(200, {'accepted': self.broker.complete(request['task_id'], request['worker_id'],
+                                                                   request['result'])})
+            elif self.path == '/results':
+                response = self.broker.results(request['batch_id'], min(float(request.get('wait', 0.)), 60.))
+                self._reply(200 if response is not None else 404, response or {'error': 'unknown batch'})
+            else:
+                self._reply(404, {'error': f'unknown path {self.path}'})
+        except (KeyError, ValueError) as e:
+            self._reply(400, {'error': f'{type(e).__name__}: {e}'})
+
+
+def serve(host: str = '127.0.0.1', port: int = 8765, lease_seconds: float = 900.,
+          broker: Optional[EvaluationBroker] = None) -> ThreadingHTTPServer:
+    """Starts the broker in a background thread and returns the server (server.shutdown() stops it)"""
+    handler = type('BrokerHandler', (_BrokerHandler,), {'broker': broker or EvaluationBroker(lease_seconds)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class BrokerClient:
+    def __init__(self, url: str, timeout: float = 120.) -> None:
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _post(self, path: str, body: Dict) -> Dict:
+        request = urllib.request.Request(self.url + path, data=_to_json(body),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def submit(self, pool: str, client: str, payloads: List[Any], weight: float = 1.) -> str:
+        return self._post('/submit', {'pool': pool, 'client': client, 'payloads': payloads,
+                                      'weight': weight})['batch_id']
+
+    def results(self, batch_id: str, wait: float = 30.) -> Dict:
+        return self._post('/results', {'batch_id': batch_id, 'wait': wait})
+
+    def wait_results(self, batch_id: str) -> List[Any]:
+        while True:
+            response = self.results(batch_id)
+            if response['done']:
+                return response['results']
+
+    def claim(self, pool: str, worker_id: str, wait: float = 30.) -> Optional[Dict]:
+        return self._post('/claim', {'pool': pool, 'worker_id': worker_id, 'wait': wait})['task']
+
+    def complete(self, task_id: str, worker_id: str, result: Any) -> bool:
+        return self._post('/complete', {'task_id': task_id, 'worker_id': worker_id, 'result': result})['accepted']
+
+
+class BrokerRewardingSystem:
+    def __init__(self, config) -> None:
+        """
+        Drop-in replacement for a problem's RewardingSystem that sends every item to
+        the broker named in config['broker'] and copies the workers' results back.
+
+        Args:
+            config (ConfigLoader): Experiment config with a `broker` section.
+        """
+        self.config = config
+        self.client = BrokerClient(config.get('broker.url'))
+        self.pool = config.get('broker.pool')
+        self.name = config.get('broker.client', default=f'{socket.gethostname()}:{os.getpid()}')
+        self.weight = config.get('broker.weight', default=1.)
+        self.directions = config.get('optimization_direction')
+
+    def submit(self, items) -> str:
+        """Queues the items and returns a batch id for collect(), without waiting"""
+        return self.client.submit(self.pool, self.name, [item.value for item in items], self.weight)
+
+    def collect(self, batch_id: str, items):
+        log_dict = {'invalid_num': 0, 'repeated_num': 0}
+        for item, result in zip(items, self.client.wait_results(batch_id)):
+            item.property = result['property']
+            item.scores = result['scores']
+            item.total = result['total']
+            item.constraints = result['constraints']
+            for key in log_dict:
+                log_dict[key] += result['log'].get(key, 0)
+            if item.scores is None or item.total is None:
+                # a worker that neither evaluated nor penalized the candidate
+                assign_penalty(item, self.directions, result['log'].get('error', 'no result from worker'))
+                if not result['log'].get('invalid_num'):
+                    log_dict['invalid_num'] += 1
+        return items, log_dict
+
+    def evaluate(self, items):
+        return self.collect(self.submit(items), items)
+
+
+PENALTY_SCORE = 99999
+
+
+def assign_penalty(item, directions=None, reason: str = '') -> None:
+    """
+    Gives an item the worst-case results the SACS evaluators assign to candidates
+    they cannot evaluate (RewardingSystem._assign_penalty), so a failed remote
+    evaluation has the same shape as a failed local one.
+
+    Args:
+        item (Item): Item to penalize.
+        directions (List[str]): 'min'/'max' per objective of item.property_list (all 'min' if None).
+        reason (str): Stored as error_reason in the item's constraints.
+    """
+    objs = item.property_list
+    directions = directions or ['min'] * len(objs)
+    item.assign_results({
+        'original_results': {obj: PENALTY_SCORE if d == 'min' else -PENALTY_SCORE for obj, d in zip(objs, directions)},
+        'transformed_results': {obj: 1.0 for obj in objs},
+        'overall_score': -1.0,
+        'constraint_results': {'is_feasible': 0.0, 'error_reason': reason},
+    })
+
+
+def make_rewarding_system(config, RewardingSystem):
+    """The broker client if the config has a broker section, otherwise the local RewardingSystem"""
+    if config.get('broker.url'):
+        return BrokerRewardingSystem(config)
+    return RewardingSystem(config=config)
+
+
+class StandInRewardingSystem:
+    def __init__(self, config, delay: float = 0.) -> None:
+        """
+        Worker-side stand-in for tests: deterministic pseudo-scores from a hash of
+        the candidate, no solver and no project directory.
+        """
+        self.objs = config.get('goals', [])
+        self.delay = delay
+
+    def evaluate(self, items):
+        for item in items:
+            time.sleep(self.delay)
+            digest = hashlib.sha1(item.value.encode('utf-8')).digest()
+            scores = {obj: digest[i % len(digest)] / 255. for i, obj in enumerate(self.objs)}
+            item.assign_results({'original_results': dict(scores), 'transformed_results': scores,
+                                 'overall_score': 1. - sum(scores.values()) / max(len(scores), 1),
+                                 'constraint_results': {'is_feasible': 1.0}})
+        return items, {'invalid_num': 0, 'repeated_num': 0}
+
+
+def run_worker(url: str, pool: str, reward_system, property_list: List[str],
+               worker_id: Optional[str] = None, max_tasks: Optional[int] = None) -> int:
+    """Claims and evaluates tasks until max_tasks are done (forever if None)"""
+    from algorithm.base import Item
+
+    client = BrokerClient(url)
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+    n_done = 0
+    while max_tasks is None or n_done < max_tasks:
+        try:
+            task = client.claim(pool, worker_id)
+        except OSError as e:
+            print(f'[{worker_id}] broker unreachable ({e}), retrying')
+            time.sleep(5)
+            continue
+        if task is None:
+            continue
+        item = Item(task['payload'], property_list)
+        try:
+            _, log_dict = reward_system.evaluate([item])
+        except Exception as e:
+            # the evaluators penalize bad candidates themselves, this only catches worker bugs;
+            # penalize like a local evaluation failure so the client gets a complete item
+            reason = f'Worker_Error: {type(e).__name__}: {e}'
+            log_dict = {'invalid_num': 1, 'repeated_num': 0, 'error': reason}
+            if hasattr(reward_system, '_assign_penalty'):
+                reward_system._assign_penalty(item, reason)
+            else:
+                assign_penalty(item, reason=reason)
+        client.complete(task['task_id'], worker_id, {'property': item.property, 'scores': item.scores,
+                                                     'total': item.total, 'constraints': item.constraints,
+                                                     'log': log_dict})
+        n_done += 1
+    return n_done
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local evaluation broker and workers')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('serve')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--lease', type=float, default=900., help='seconds before an unfinished task is re-queued')
+    p = sub.add_parser('worker')
+    p.add_argument('--url', default='http://127.0.0.1:8765')
+    p.add_argument('--config', required=True, help='problem config, relative to problem/')
+    p.add_argument('--pool', default=None, help='defaults to the config directory name')
+    p.add_argument('--project_path', default=None, help='SACS project copy owned by this worker')
+    p.add_argument('--stand_in', action='store_true', help='fake scores, no solver')
+    p.add_argument('--stand_in_delay', type=float, default=0.)
+    p.add_argument('--max_tasks', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server = serve(args.host, args.port, args.lease)
+        print(f'Evaluation broker listening on http://{args.host}:{args.port}')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    import importlib
+    from model.MOLLM import ConfigLoader
+
+    config = ConfigLoader(args.config)
+    if args.project_path:
+        config.config.setdefault('sacs', {})['project_path'] = args.project_path
+    if args.stand_in:
+        reward_system = StandInRewardingSystem(config, args.stand_in_delay)
+    else:
+        module = importlib.import_module(config.get('evalutor_path'))
+        reward_system = module.RewardingSystem(config=config)
+    pool = args.pool or os.path.basename(os.path.dirname(args.config))
+    print(f'Worker serving pool {pool} from {args.url}')
+    run_worker(args.url, pool, reward_system, config.get('goals'), max_tasks=args.max_tasks)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Concurrent experiment scheduler with declared resource limits.
+
+Every job is a subprocess that declares how much of each named resource it
+holds while running, e.g. {'solver': 1, 'sacs:section_jk': 1, 'cpu': 1} for
+a SACS baseline or {'llm_rpm': 30, 'cpu': 1} for an LLM-driven run. A job
+starts only when all of its resources fit under the limits given to the
+scheduler, so SACS licenses, a shared SACS project directory, the LLM
+requests-per-minute quota and CPU cores are never oversubscribed.
+
+A job that exits with code 0 and leaves its result file gets a completion
+marker next to it (<result>.done), so early-stopped runs count as finished.
+Jobs whose result file already holds a finished run are skipped, failed jobs
+are retried up to `retries` times, and the status and timings of every job
+are kept in a JSON manifest that is rewritten after each state change.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class Job:
+    job_id: str
+    cmd: List[str]
+    resources: Dict[str, float] = field(default_factory=dict)
+    result_path: Optional[str] = None
+    log_path: Optional[str] = None
+    cwd: Optional[str] = None
+    env: Dict[str, str] = field(default_factory=dict)
+    # runs right before the subprocess, with the job's resources held (e.g. resetting a SACS seed file)
+    before_start: Optional[Callable[[], bool]] = None
+    # decides whether an existing result file is a finished run
+    is_complete: Optional[Callable[[str], bool]] = None
+    meta: Dict = field(default_factory=dict)
+
+
+def completion_marker(path) -> str:
+    return f"{path}.done"
+
+
+def result_is_complete(path, budget=None):
+    """
+    A result json counts as finished when the scheduler left its completion marker.
+    Results written before markers existed count when they parse and, if an
+    evaluation budget is given, their last logged record reached it.
+    """
+    if os.path.exists(completion_marker(path)):
+        return True
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if budget is None:
+        return True
+    records = data.get('results') if isinstance(data, dict) else None
+    if not records:
+        return False
+    last = records[-1]
+    n = last.get('all_unique_moles', last.get('generated_num', 0))
+    return n >= budget
+
+
+class ResourcePool:
+    def __init__(self, limits: Dict[str, float]):
+        """
+        Counted resources. Names without a limit are unconstrained.
+
+        Args:
+            limits (Dict[str, float]): Capacity of each named resource.
+        """
+        self.limits = dict(limits)
+        self.in_use = {name: 0. for name in limits}
+
+    def fits(self, request: Dict[str, float]) -> bool:
+        return all(self.in_use[name] + amount <= self.limits[name]
+                   for name, amount in request.items() if name in self.limits)
+
+    def acquire(self, request: Dict[str, float]) -> None:
+        for name, amount in request.items():
+            if name in self.limits:
+                self.in_use[name] += amount
+
+    def release(self, request: Dict[str, float]) -> None:
+        for name, amount in request.items():
+            if name in self.limits:
+                self.in_use[name] -= amount
+
+    def can_ever_fit(self, request: Dict[str, float]) -> bool:
+        return all(amount <= self.limits[name] for name, amount in request.items() if name in self.limits)
+
+
+class ExperimentScheduler:
+    def __init__(self, limits: Dict[str, float], manifest_path: str, retries: int = 0,
+                 echo: Callable[[str], None] = print, poll_interval: float = 1.0) -> None:
+        """
+        Runs jobs concurrently under the given resource limits.
+
+        Args:
+            limits (Dict[str, float]): Resource capacities, see ResourcePool.
+            manifest_path (str): JSON file with the status of every job.
+            retries (int): Extra attempts for a job that exits with a non-zero code.
+            echo (Callable): Logging function for progress lines.
+            poll_interval (float): Seconds between scheduling passes while jobs are running.
+        """
+        self.pool = ResourcePool(limits)
+        self.manifest_path = Path(manifest_path)
+        self.retries = retries
+        self.echo = echo
+        self.poll_interval = poll_interval
+        self.lock = threading.Condition()
+        self.entries = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self.entries = {e['job_id']: e for e in json.load(f).get('jobs', [])}
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def _write_manifest(self) -> None:
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'updated': datetime.now().isoformat(), 'limits': self.pool.limits,
+                       'jobs': list(self.entries.values())}, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def _update(self, job: Job, **fields) -> None:
+        entry = self.entries.setdefault(job.job_id, {'job_id': job.job_id})
+        entry.update(fields)
+        self._write_manifest()
+
+    def _finished(self, job: Job) -> bool:
+        if not job.result_path or not os.path.exists(job.result_path):
+            return False
+        if job.is_complete is not None:
+            return job.is_complete(job.result_path)
+        return self.entries.get(job.job_id, {}).get('status') in ('success', 'skipped')
+
+    def _mark_complete(self, job: Job) -> None:
+        """Record a clean exit next to the result file, whatever budget the run reached."""
+        if not job.result_path or not os.path.exists(job.result_path):
+            return
+        with open(completion_marker(job.result_path), 'w', encoding='utf-8') as f:
+            json.dump({'job_id': job.job_id, 'finished': datetime.now().isoformat()}, f)
+
+    def _run(self, job: Job) -> None:
+        attempts = 0
+        status, return_code, error = 'failed', None, None
+        start = time.time()
+        while attempts <= self.retries:
+            attempts += 1
+            with self.lock:
+                self._update(job, status='running', attempts=attempts, start_time=datetime.now().isoformat())
+            try:
+                if job.before_start is not None and not job.before_start():
+                    error = 'before_start hook failed'
+                    break
+                if job.result_path and os.path.exists(completion_marker(job.result_path)):
+                    os.remove(completion_marker(job.result_path))
+                if job.log_path:
+                    Path(job.log_path).parent.mkdir(parents=True, exist_ok=True)
+                with open(job.log_path or os.devnull, 'a', encoding='utf-8') as log:
+                    return_code = subprocess.call(job.cmd, cwd=job.cwd, env={**os.environ, **job.env},
+                                                  stdout=log, stderr=subprocess.STDOUT)
+                if return_code == 0:
+                    status, error = 'success', None
+                    self._mark_complete(job)
+                    break
+                error = f'return code {return_code}'
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+            if attempts <= self.retries:
+                self.echo(f"Retrying {job.job_id} ({error}), attempt {attempts + 1}/{self.retries + 1}")
+
+        elapsed = time.time() - start
+        with self.lock:
+            self.pool.release(job.resources)
+            self._update(job, status=status, return_code=return_code, error=error,
+                         end_time=datetime.now().isoformat(), elapsed_s=elapsed)
+            self.lock.notify_all()
+        mark = '✓' if status == 'success' else '✗'
+        self.echo(f"{mark} {job.job_id} {status} in {elapsed / 3600:.2f} hours"
+                  + (f" ({error}), log: {job.log_path}" if error else ""))
+
+    def run(self, jobs: List[Job], dry_run: bool = False) -> Dict[str, dict]:
+        """
+        Runs all jobs and returns the manifest entries of this batch, keyed by job id.
+        Jobs are started in list order whenever their resources fit.
+        """
+        pending = []
+        with self.lock:
+            for job in jobs:
+                base = {'cmd': job.cmd, 'resources': job.resources, 'result_path': job.result_path,
+                        'log_path': job.log_path, **job.meta}
+                if self._finished(job):
+                    self._update(job, status='skipped', **base)
+                    self.echo(f"- {job.job_id} already finished ({job.result_path}), skipping")
+                elif not self.pool.can_ever_fit(job.resources):
+                    self._update(job, status='failed', error='resources exceed limits', **base)
+                    self.echo(f"✗ {job.job_id} requests {job.resources}, more than the limits {self.pool.limits}")
+                elif dry_run:
+                    self.echo(f"[DRY RUN] {job.job_id}: {' '.join(job.cmd)} with {job.resources}")
+                else:
+                    self._update(job, status='pending', attempts=0, error=None, **base)
+                    pending.append(job)
+
+        threads = []
+        with self.lock:
+            while pending:
+                started = False
+                for job in list(pending):
+                    if self.pool.fits(job.resources):
+                        self.pool.acquire(job.resources)
+                        pending.remove(job)
+                        self.echo(f"Starting {job.job_id} ({len(pending)} pending, in use: {self.pool.in_use})")
+                        thread = threading.Thread(target=self._run, args=(job,), daemon=True)
+                        thread.start()
+                        threads.append(thread)
+                        started = True
+                if pending and not started:
+                    self.lock.wait(self.poll_interval)
+        for thread in threads:
+            thread.join()
+
+        return {job.job_id: self.entries[job.job_id] for job in jobs if job.job_id in self.entries}
+
+
+def python_cmd(script, *args):
+    return [sys.executable, str(script), *[str(a) for a in args]]
@@ -2,11 +2,15 @@ import pandas as pd
 import numpy as np
 from sklearn.utils import shuffle
 import torch
-from mol_mdp_ext import MolMDPExtended, BlockMoleculeDataExtended
+from mol_mdp_ext import MolMDPExtended, BlockMoleculeDataExtended, FeaturizationCache
+import os
 import time
 import threading
+import traceback
+from queue import Empty, Full
+import torch.multiprocessing as mp
 from tqdm import tqdm
-from botorch.utils.multi_objective.hypervolume import Hypervolume
+from model.hypervolume import HypervolumeEstimator
 
 class Dataset:
 
@@ -26,6 +30,10 @@ class Dataset:
         else:
             self.mdp.floatX = torch.float
         self.mdp._cue_max_blocks = args.max_blocks
+        # train/test molecules are featurized once and reused by every minibatch
+        self.mdp.molcache = FeaturizationCache(max_size=args.feat_cache_size)
+        if args.feat_cache_path:
+            self.mdp.molcache.load(args.feat_cache_path)
         self.max_blocks = args.max_blocks
         self.oracle = oracle
         self._device = device
@@ -34,7 +42,9 @@ class Dataset:
 
         self.target_norm = [-8.6, 1.10]  # for dockerscore
 
-        self.hypervolume = Hypervolume(ref_point=torch.zeros(len(args.objectives)))
+        self.hypervolume = HypervolumeEstimator(ref_point=np.zeros(len(args.objectives)), maximize=True,
+                                                max_time=getattr(args, 'hv_max_time', 1.0),
+                                                rel_error=getattr(args, 'hv_rel_error', 0.01))
 
     def load_h5(self, path, test_ratio=0.1, num_init_examples=None):
         import json
@@ -130,49 +140,76 @@ class Dataset:
         self.stop_event.clear()
 
     def compute_hypervolume(self):
-        scores = torch.tensor(pd.DataFrame.from_dict(self.scores).values)
+        scores = pd.DataFrame.from_dict(self.scores).values
         volume = self.hypervolume.compute(scores)
 
         return volume
     
     def start_samplers(self, n, mbsize):
-        self.ready_events = [threading.Event() for i in range(n)]
-        self.resume_events = [threading.Event() for i in range(n)]
-        self.results = [None] * n
-        def f(idx):
-            while not self.stop_event.is_set():
-                try:
-                    self.results[idx] = self.sample2batch(self.sample(mbsize))
-                except Exception as e:
-                    print("Exception while sampling:")
-                    print(e)
-                    self.sampler_threads[idx].failed = True
-                    self.sampler_threads[idx].exception = e
-                    self.ready_events[idx].set()
-                    break
-                self.ready_events[idx].set()
-                self.resume_events[idx].clear()
-                self.resume_events[idx].wait()
-        self.sampler_threads = [threading.Thread(target=f, args=(i,)) for i in range(n)]
+        """
+        Fork n sampler processes that fill a bounded queue with collated (Batch, scores)
+        minibatches; tensors travel through shared memory. Returns a blocking get().
+        """
+        # featurize the training molecules here, so that the forked samplers start
+        # from a warm cache and the entries stay in the parent's (persisted) cache
+        for m in self.train_mols:
+            self.mdp.mol2repr(m)
+        ctx = mp.get_context('fork')
+        self.sampler_queue = ctx.Queue(maxsize=2 * n)
+        self.sampler_stop = ctx.Event()
+        self.sampler_threads = [ctx.Process(target=_sampler_process, daemon=True,
+                                            args=(self, i, mbsize, self.sampler_queue, self.sampler_stop))
+                                for i in range(n)]
         [setattr(i, 'failed', False) for i in self.sampler_threads]
         [i.start() for i in self.sampler_threads]
-        round_robin_idx = [0]
+
         def get():
-            while True:
-                idx = round_robin_idx[0]
-                round_robin_idx[0] = (round_robin_idx[0] + 1) % n
-                if self.ready_events[idx].is_set():
-                    r = self.results[idx]
-                    self.ready_events[idx].clear()
-                    self.resume_events[idx].set()
-                    return r
-                elif round_robin_idx[0] == 0:
-                    time.sleep(0.001)
+            idx, status, r = self.sampler_queue.get()
+            if status == 'error':
+                print("Exception while sampling:")
+                print(r)
+                try:
+                    raise RuntimeError('sampler {} failed:\n{}'.format(idx, r))
+                except RuntimeError as e:
+                    self.sampler_threads[idx].failed = True
+                    self.sampler_threads[idx].exception = e
+                return None
+            s, r = r
+            return s.to(self._device), r.to(self._device)
         return get
 
     def stop_samplers_and_join(self):
         self.stop_event.set()
         if hasattr(self, 'sampler_threads'):
-          while any([i.is_alive() for i in self.sampler_threads]):
-            [i.set() for i in self.resume_events]
-            [i.join(0.05) for i in self.sampler_threads]
\ No newline at end of file
+            self.sampler_stop.set()
+            # drain the queue so that samplers blocked on put see the stop flag
+            try:
+                while True:
+                    self.sampler_queue.get_nowait()
+            except Empty:
+                pass
+            for i in self.sampler_threads:
+                i.join(1)
+                if i.is_alive():
+                    i.terminate()
+
+
+def _sampler_process(dataset, idx, mbsize, queue, stop):
+    # batches are built on cpu, the consumer moves them to the training device
+    dataset._device = 'cpu'
+    dataset.mdp.device = 'cpu'
+    torch.set_num_threads(1)
+    np.random.seed((int(time.time()) + os.getpid() + idx) % (2 ** 32))
+    while not stop.is_set():
+        try:
+            item = (idx, 'ok', dataset.sample2batch(dataset.sample(mbsize)))
+        except Exception:
+            item = (idx, 'error', traceback.format_exc())
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                break
+            except Full:
+                continue
+        if item[1] == 'error':
+            break
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Samples-per-second benchmark for the Genetic GFN agent. Every run appends one JSON
+line to --output so CPU/GPU settings can be tracked across commits and machines.
+Run from the repository root:
+    python -m genetic_gfn.multi_objective.genetic_gfn.benchmark_sampling --device cpu --num_threads 8
+"""
+
+import os
+import json
+import time
+import platform
+import argparse
+
+import torch
+
+from genetic_gfn.multi_objective.genetic_gfn.utils import set_device
+from genetic_gfn.multi_objective.genetic_gfn.model import RNN
+from genetic_gfn.multi_objective.genetic_gfn.data_structs import Vocabulary
+
+
+def benchmark(device=None, num_threads=0, compile=False, bf16=False, batch_size=128, repeats=5, warmup=1):
+    device = set_device(device)
+    if device.type == 'cpu' and num_threads:
+        torch.set_num_threads(num_threads)
+    use_bf16 = bf16 and device.type == 'cpu'
+
+    path_here = os.path.dirname(os.path.realpath(__file__))
+    voc = Vocabulary(init_from_file=os.path.join(path_here, "data/Voc"))
+    agent = RNN(voc)
+    agent.rnn.load_state_dict(torch.load(os.path.join(path_here, 'data/Prior.ckpt'), map_location=device))
+    if compile:
+        agent.rnn = torch.compile(agent.rnn)
+
+    rates = []
+    for i in range(warmup + repeats):
+        start = time.perf_counter()
+        with torch.inference_mode(), torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=use_bf16):
+            seqs, _, _ = agent.sample(batch_size)
+        if device.type == 'cuda':
+            torch.cuda.synchronize()
+        if i >= warmup:
+            rates.append(len(seqs) / (time.perf_counter() - start))
+
+    return {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'host': platform.node(),
+        'device': str(device),
+        'num_threads': torch.get_num_threads(),
+        'compile': compile,
+        'bf16': use_bf16,
+        'batch_size': batch_size,
+        'samples_per_second': sum(rates) / len(rates),
+        'min_samples_per_second': min(rates),
+        'torch': torch.__version__,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--device', default=None)
+    parser.add_argument('--num_threads', type=int, default=0)
+    parser.add_argument('--compile', action='store_true')
+    parser.add_argument('--bf16', action='store_true')
+    parser.add_argument('--batch_size', type=int, default=128)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', default='results/benchmark_sampling.jsonl')
+    args = parser.parse_args()
+
+    result = benchmark(args.device, args.num_threads, args.compile, args.bf16, args.batch_size, args.repeats)
+    print(json.dumps(result, indent=2))
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(result) + '\n')
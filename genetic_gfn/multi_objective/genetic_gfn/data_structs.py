@@ -6,7 +6,7 @@ from rdkit import Chem
 import sys
 import time
 import torch
-from torch.utils.data import Dataset
+from torch.utils.data import Dataset, IterableDataset, get_worker_info
 
 from genetic_gfn.multi_objective.genetic_gfn.utils import Variable
 
@@ -115,6 +115,63 @@ class MolData(Dataset):
             collated_arr[i, :seq.size(0)] = seq
         return collated_arr
 
+class TokenizedMolData(IterableDataset):
+    """Streams padded batches from a corpus written by build_tokenized_corpus.
+       The token array is memory-mapped and sorted by length, so every batch
+       is one contiguous slice of similar-length sequences and no SMILES is
+       tokenized during training.
+
+        Args:
+                prefix     : path prefix of the .tokens.npy / .index.npy pair
+                batch_size : number of sequences per batch
+                shuffle    : shuffle the order of the batches every epoch
+                drop_last  : drop the last, smaller batch
+
+        Returns:
+                (batch_size, max_length) LongTensors padded with 0 like MolData.collate_fn.
+    """
+    def __init__(self, prefix, batch_size=128, shuffle=True, drop_last=True, seed=0):
+        self.tokens = np.load(prefix + '.tokens.npy', mmap_mode='r')
+        index = np.load(prefix + '.index.npy')
+        self.offsets, self.lengths = index[:, 0], index[:, 1]
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+    def __str__(self):
+        return "Tokenized dataset containing {} structures.".format(len(self.lengths))
+
+    def get_batch(self, b):
+        start = b * self.batch_size
+        lengths = self.lengths[start:start + self.batch_size]
+        first, last = self.offsets[start], self.offsets[start + len(lengths) - 1] + lengths[-1]
+        flat = np.asarray(self.tokens[first:last], dtype=np.int64)
+        batch = np.zeros((len(lengths), lengths.max()), dtype=np.int64)
+        mask = np.arange(batch.shape[1])[None, :] < lengths[:, None]
+        batch[mask] = flat
+        return torch.from_numpy(batch)
+
+    def __iter__(self):
+        # workers get a fresh copy of the dataset every epoch; their shared base
+        # seed changes per epoch and keeps the batch order identical across workers
+        worker = get_worker_info()
+        seed = self.seed + self.epoch if worker is None else worker.seed - worker.id
+        self.epoch += 1
+        order = np.arange(len(self))
+        if self.shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        if worker is not None:
+            order = order[worker.id::worker.num_workers]
+        for b in order:
+            yield self.get_batch(b)
+
 class Experience(object):
     """Class for prioritized experience replay that remembers the highest scored sequences
        seen and samples from them with probabilities relative to their scores."""
@@ -122,6 +179,19 @@ class Experience(object):
         self.memory = []
         self.max_size = max_size
         self.voc = voc
+        self.encoded = {}
+
+    def encode(self, smile):
+        """Encoded sequence of a SMILES, tokenized only the first time it is sampled.
+           Raises KeyError for SMILES with tokens outside the vocabulary."""
+        if smile not in self.encoded:
+            try:
+                self.encoded[smile] = Variable(self.voc.encode(self.voc.tokenize(smile)))
+            except KeyError:
+                self.encoded[smile] = None
+        if self.encoded[smile] is None:
+            raise KeyError(smile)
+        return self.encoded[smile]
 
     def add_experience(self, experience):
         """Experience should be a list of (smiles, score, (n_atoms)) tuples"""
@@ -137,6 +207,7 @@ class Experience(object):
             # Retain highest scores
             self.memory.sort(key = lambda x: x[1], reverse=True)
             self.memory = self.memory[:self.max_size]
+            self.encoded = {x[0]: self.encoded[x[0]] for x in self.memory if x[0] in self.encoded}
             # print("\nBest score in memory: {:.2f}".format(self.memory[0][1]))
 
     def get_elems(self):
@@ -158,8 +229,7 @@ class Experience(object):
         encoded, valid_scores = [], []
         for i, smile in enumerate(smiles):
             try:
-                tokenized = self.voc.tokenize(smile)
-                encoded.append(Variable(self.voc.encode(tokenized)))
+                encoded.append(self.encode(smile))
                 valid_scores.append(scores[i])
             except:
                 pass
@@ -181,8 +251,7 @@ class Experience(object):
             encoded, valid_scores = [], []
             for i in indices:
                 try:
-                    tokenized = self.voc.tokenize(self.memory[i][0])
-                    encoded.append(Variable(self.voc.encode(tokenized)))
+                    encoded.append(self.encode(self.memory[i][0]))
                     valid_scores.append(self.memory[i][1])
                 except:
                     pass
@@ -208,8 +277,7 @@ class Experience(object):
                 
                 for i in indices:
                     try:
-                        tokenized = self.voc.tokenize(eligible_population[i][0])
-                        encoded.append(Variable(self.voc.encode(tokenized)))
+                        encoded.append(self.encode(eligible_population[i][0]))
                         valid_scores.append(eligible_population[i][1])
                     except:
                         pass
@@ -309,6 +377,33 @@ def write_smiles_to_file(smiles_list, fname):
         for smiles in smiles_list:
             f.write(smiles + "\n")
 
+def build_tokenized_corpus(smiles_fname, voc, prefix):
+    """Tokenizes a SMILES file once for TokenizedMolData. Writes prefix.tokens.npy,
+       all encoded sequences concatenated in order of length, and prefix.index.npy,
+       one (offset, length) row per sequence. SMILES with tokens outside the
+       vocabulary are skipped."""
+    encoded = []
+    with open(smiles_fname, 'r') as f:
+        for i, line in enumerate(f):
+            if i % 100000 == 0:
+                print("{} lines processed.".format(i))
+            try:
+                encoded.append(voc.encode(voc.tokenize(line.split()[0])))
+            except (KeyError, IndexError):
+                pass
+    lengths = np.array([len(seq) for seq in encoded], dtype=np.int64)
+    order = np.argsort(lengths, kind='stable')
+    lengths = lengths[order]
+    offsets = np.cumsum(lengths) - lengths
+    dtype = np.uint8 if voc.vocab_size <= 256 else np.int16
+    tokens = np.lib.format.open_memmap(prefix + '.tokens.npy', mode='w+', dtype=dtype, shape=(int(lengths.sum()),))
+    for offset, i in zip(offsets, order):
+        tokens[offset:offset + len(encoded[i])] = encoded[i]
+    tokens.flush()
+    np.save(prefix + '.index.npy', np.stack([offsets, lengths], axis=1))
+    print("{} SMILES tokenized into {}".format(len(lengths), prefix))
+    return len(lengths)
+
 def filter_on_chars(smiles_list, chars):
     """Filters SMILES on the characters they contain.
        Used to remove SMILES containing very rare/undesirable
@@ -1,12 +1,14 @@
 from __future__ import print_function
 
+import os
+import atexit
 import torch
 import random
+import multiprocessing
+from collections import Counter
 from typing import List
 
-import joblib
 import numpy as np
-from joblib import delayed
 from rdkit import Chem, rdBase
 from rdkit.Chem.rdchem import Mol
 rdBase.DisableLog('rdApp.error')
@@ -14,8 +16,6 @@ rdBase.DisableLog('rdApp.error')
 import genetic_gfn.multi_objective.genetic_gfn.genetic_operator.crossover as co
 import genetic_gfn.multi_objective.genetic_gfn.genetic_operator.mutate as mu
 
-import gc
-
 
 MINIMUM = 1e-10
 
@@ -83,6 +83,102 @@ def reproduce(mating_pool, mutation_rate):
     return new_child
 
 
+# per-process cache of the parsed mating pool, so a worker parses it once per generation
+_worker_state = {}
+
+
+def _init_reproduction_worker(seed):
+    rdBase.DisableLog('rdApp.error')
+    # forked workers inherit the parent RNG state, decorrelate them by worker index
+    # (1..n_jobs) so that a run is reproducible for a given seed
+    index = multiprocessing.current_process()._identity[-1]
+    worker_seed = (seed + index) % (2 ** 32)
+    random.seed(worker_seed)
+    np.random.seed(worker_seed)
+
+
+def _reproduce_chunk(task):
+    """
+    Breed a chunk of children from a mating pool given as SMILES
+    Args:
+        task: (pool_id, mating pool SMILES, mutation rate, number of children)
+    Returns: list of (smiles, n_atoms, outcome), smiles is None unless outcome == 'ok'
+    """
+    pool_id, pool_smis, mutation_rate, n_children = task
+    if _worker_state.get('pool_id') != pool_id:
+        _worker_state['pool_id'] = pool_id
+        _worker_state['mating_pool'] = [Chem.MolFromSmiles(s) for s in pool_smis]
+    mating_pool = _worker_state['mating_pool']
+
+    results = []
+    for _ in range(n_children):
+        parent_a = random.choice(mating_pool)
+        parent_b = random.choice(mating_pool)
+        child = co.crossover(parent_a, parent_b)
+        if child is None:
+            results.append((None, 0, 'crossover_failed'))
+            continue
+        child = mu.mutate(child, mutation_rate)
+        if child is None:
+            results.append((None, 0, 'mutation_failed'))
+            continue
+        try:
+            results.append((Chem.MolToSmiles(child), child.GetNumAtoms(), 'ok'))
+        except:
+            results.append((None, 0, 'invalid'))
+    return results
+
+
+class ReproductionPool:
+    """
+    Long-lived worker processes for crossover and mutation.
+    Workers are started once; every generation the mating pool is shipped as SMILES
+    with each chunk of work and children stream back as chunks finish. Small queries
+    (or n_jobs <= 1) are bred in-process, without any per-generation setup.
+    """
+
+    def __init__(self, n_jobs=1, chunk_size=8, seed=0):
+        if n_jobs < 0:  # joblib convention, -1 is all cpus
+            n_jobs = max(1, os.cpu_count() + 1 + n_jobs)
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.stats = Counter()
+        self._pool = None
+        self._pool_id = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.n_jobs, initializer=_init_reproduction_worker,
+                                              initargs=(self.seed,))
+            atexit.register(self.close)
+        return self._pool
+
+    def reproduce(self, pool_smis, mutation_rate, n_children):
+        """Yield (smiles, n_atoms, outcome) for n_children offspring, in completion order"""
+        self._pool_id += 1
+        if self.n_jobs <= 1 or n_children < 2 * self.chunk_size:
+            yield from _reproduce_chunk((('local', self._pool_id), pool_smis, mutation_rate, n_children))
+            return
+
+        tasks = [(self._pool_id, pool_smis, mutation_rate, min(self.chunk_size, n_children - i))
+                 for i in range(0, n_children, self.chunk_size)]
+        for results in self._get_pool().imap_unordered(_reproduce_chunk, tasks):
+            yield from results
+
+    def success_rates(self):
+        """Fraction of reproduction attempts per outcome, plus unique/duplicate children"""
+        attempts = self.stats['attempts']
+        return {k: v / attempts for k, v in self.stats.items() if k != 'attempts'} if attempts else {}
+
+    def close(self):
+        atexit.unregister(self.close)
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
 class GeneticOperatorHandler:
     def __init__(self, mutation_rate: float=0.067, population_size=200):
         self.mutation_rate = mutation_rate
@@ -92,7 +188,7 @@ class GeneticOperatorHandler:
     #     new_mating_pool, new_mating_scores, _, _ = make_mating_pool(mating_pool[0], mating_pool[1], self.population_size, rank_coefficient)
     #     return (new_mating_pool, new_mating_scores)
 
-    def query(self, query_size, mating_pool, pool, rank_coefficient=0.01, mutation_rate=None):
+    def query(self, query_size, mating_pool, pool: ReproductionPool, rank_coefficient=0.01, mutation_rate=None):
         # print(mating_pool)
         if mutation_rate is None:
             mutation_rate = self.mutation_rate
@@ -104,30 +200,27 @@ class GeneticOperatorHandler:
 
         cross_mating_pool, cross_mating_scores = make_mating_pool(population_mol, population_scores, query_size, rank_coefficient)
 
-        offspring_mol = pool(delayed(reproduce)(cross_mating_pool, mutation_rate) for _ in range(query_size))
-        new_mating_pool = cross_mating_pool
-        new_mating_scores = cross_mating_scores
-
-        smis, n_atoms = [], []
-        for m in offspring_mol:
-            try:
-                # smis.append(Chem.MolToSmiles(m))
-                smi = Chem.MolToSmiles(m)
-                if smi not in smis:  # unique
-                    smis.append(smi)
-                    n_atoms.append(m.GetNumAtoms())
-            except:
-                pass
-
-        gc.collect()
-
         pop_valid_smis, pop_valid_scores = [], []
-        for m, s in zip(new_mating_pool, new_mating_scores):
+        for m, s in zip(cross_mating_pool, cross_mating_scores):
             try:
-                # pop_valid_smis.append(Chem.MolToSmiles(m))
                 pop_valid_smis.append(Chem.MolToSmiles(m))
                 pop_valid_scores.append(s)
             except:
                 pass
-        
+
+        # children are deduplicated as they stream back from the workers
+        smis, n_atoms, seen = [], [], set()
+        for smi, n_atom, outcome in pool.reproduce(pop_valid_smis, mutation_rate, query_size):
+            pool.stats['attempts'] += 1
+            pool.stats[outcome] += 1
+            if smi is None:
+                continue
+            if smi in seen:
+                pool.stats['duplicate'] += 1
+                continue
+            seen.add(smi)
+            smis.append(smi)
+            n_atoms.append(n_atom)
+            pool.stats['unique'] += 1
+
         return smis, n_atoms, pop_valid_smis, pop_valid_scores
@@ -4,7 +4,7 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from genetic_gfn.multi_objective.genetic_gfn.utils import Variable
+from genetic_gfn.multi_objective.genetic_gfn.utils import Variable, get_device
 
 class MultiGRU(nn.Module):
     """ Implements a three layer GRU cell including an embedding layer
@@ -19,7 +19,7 @@ class MultiGRU(nn.Module):
 
     def forward(self, x, h):
         x = self.embedding(x)
-        h_out = Variable(torch.zeros(h.size()))
+        h_out = torch.zeros(h.size(), dtype=h.dtype, device=h.device)
         x = h_out[0] = self.gru_1(x, h[0])
         x = h_out[1] = self.gru_2(x, h[1])
         x = h_out[2] = self.gru_3(x, h[2])
@@ -36,8 +36,7 @@ class RNN():
     def __init__(self, voc):
         self.rnn = MultiGRU(voc.vocab_size)
         print('need to wait several minutes')
-        if torch.cuda.is_available():
-            self.rnn.cuda()
+        self.rnn.to(get_device())
         self.voc = voc
 
     def likelihood(self, target):
@@ -89,10 +88,8 @@ class RNN():
 
         sequences = []
         log_probs = Variable(torch.zeros(batch_size))
-        finished = torch.zeros(batch_size).byte()
+        finished = torch.zeros(batch_size, device=get_device()).byte()
         entropy = Variable(torch.zeros(batch_size))
-        if torch.cuda.is_available():
-            finished = finished.cuda()
 
         # for step in range(max_length):
         #     logits, h = self.rnn(x, h)
@@ -144,10 +141,8 @@ class RNN():
         
         sequences = []
         log_probs = Variable(torch.zeros(batch_size))
-        finished = torch.zeros(batch_size).byte()
+        finished = torch.zeros(batch_size, device=get_device()).byte()
         entropy = Variable(torch.zeros(batch_size))
-        if torch.cuda.is_available():
-            finished = finished.cuda()
 
         for step in range(max_length):
             logits, h = self.rnn(x, h)
@@ -183,10 +178,7 @@ def NLLLoss(inputs, targets):
             loss : (batch_size) *Loss for each example*
     """
 
-    if torch.cuda.is_available():
-        target_expanded = torch.zeros(inputs.size()).cuda()
-    else:
-        target_expanded = torch.zeros(inputs.size())
+    target_expanded = torch.zeros(inputs.size(), dtype=inputs.dtype, device=inputs.device)
 
     target_expanded.scatter_(1, targets.contiguous().view(-1, 1).data, 1.0)
     loss = Variable(target_expanded) * inputs
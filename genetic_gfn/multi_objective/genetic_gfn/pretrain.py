@@ -1,27 +1,35 @@
 #!/usr/bin/env python
 
+import os
+import argparse
 import torch
 from torch.utils.data import DataLoader
 from rdkit import Chem
 from rdkit import rdBase
 from tqdm import tqdm
 
-from data_structs import MolData, Vocabulary
+from data_structs import MolData, TokenizedMolData, Vocabulary, build_tokenized_corpus
 from model import RNN
-from utils import decrease_learning_rate
+from utils import Variable, decrease_learning_rate
 rdBase.DisableLog('rdApp.error')
 
-def pretrain(restore_from=None):
-    """Trains the Prior RNN"""
+def pretrain(restore_from=None, corpus=None, num_workers=2):
+    """Trains the Prior RNN. With corpus, batches are streamed from the
+       pre-tokenized files written by build_tokenized_corpus."""
 
     # Read vocabulary from a file
     voc = Vocabulary(init_from_file="data/Voc")
 
-
-    print('# Create a Dataset from a SMILES file')
-    moldata = MolData("data/mols_filtered.smi", voc)
-    data = DataLoader(moldata, batch_size=128, shuffle=True, drop_last=True,
-                      collate_fn=MolData.collate_fn)
+    if corpus:
+        print('# Stream batches from the tokenized corpus {}'.format(corpus))
+        moldata = TokenizedMolData(corpus, batch_size=128, shuffle=True, drop_last=True)
+        data = DataLoader(moldata, batch_size=None, num_workers=num_workers,
+                          pin_memory=torch.cuda.is_available())
+    else:
+        print('# Create a Dataset from a SMILES file')
+        moldata = MolData("data/mols_filtered.smi", voc)
+        data = DataLoader(moldata, batch_size=128, shuffle=True, drop_last=True,
+                          collate_fn=MolData.collate_fn)
     print('build DataLoader')
 
     Prior = RNN(voc)
@@ -40,7 +48,7 @@ def pretrain(restore_from=None):
         for step, batch in tqdm(enumerate(data), total=len(data)):
 
             # Sample from DataLoader
-            seqs = batch.long()
+            seqs = Variable(batch).long()
 
             # Calculate loss
             log_p, _ = Prior.likelihood(seqs)
@@ -72,4 +80,13 @@ def pretrain(restore_from=None):
         torch.save(Prior.rnn.state_dict(), "data/Prior.ckpt")
 
 if __name__ == "__main__":
-    pretrain()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--restore_from', default=None)
+    parser.add_argument('--corpus', default=None,
+                        help='prefix of a tokenized corpus, built from --smiles first if missing')
+    parser.add_argument('--smiles', default='data/mols_filtered.smi')
+    parser.add_argument('--num_workers', type=int, default=2)
+    args = parser.parse_args()
+    if args.corpus and not os.path.exists(args.corpus + '.index.npy'):
+        build_tokenized_corpus(args.smiles, Vocabulary(init_from_file="data/Voc"), args.corpus)
+    pretrain(args.restore_from, args.corpus, args.num_workers)
@@ -1,19 +1,18 @@
 import os
 import sys
+import time
 import numpy as np
 path_here = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(path_here)
 sys.path.append('/'.join(path_here.rstrip('/').split('/')[:-2]))
 from genetic_gfn.multi_objective.optimizer import BaseOptimizer
-from genetic_gfn.multi_objective.genetic_gfn.utils import Variable, seq_to_smiles, unique
+from genetic_gfn.multi_objective.genetic_gfn.utils import Variable, seq_to_smiles, unique, set_device
 from genetic_gfn.multi_objective.genetic_gfn.model import RNN
 from genetic_gfn.multi_objective.genetic_gfn.data_structs import Vocabulary, Experience
-from algorithm.base import Item
+from algorithm.base import MoleculeBuffer
 import torch
 from rdkit import Chem
-from copy import deepcopy
-from joblib import Parallel
-from genetic_gfn.multi_objective.genetic_gfn.graph_ga_expert import GeneticOperatorHandler
+from genetic_gfn.multi_objective.genetic_gfn.graph_ga_expert import GeneticOperatorHandler, ReproductionPool
 
 
 def sanitize(smiles):
@@ -32,10 +31,34 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
         super().__init__(args)
         self.model_name = "genetic_gfn"
         self.history_smiles = []
-    
+        self.samples_per_second = []
+        self.pool = None
+
+    def reproduction_pool(self, config):
+        """The optimizer's single ReproductionPool, started on first use"""
+        if self.pool is None:
+            self.pool = ReproductionPool(n_jobs=config['num_jobs'], seed=getattr(self.args, 'seed', 0))
+        return self.pool
+
+    def setup_device(self, config):
+        """
+        Selects the torch device from config['device'] (GPU when available by default).
+        On CPU, config['num_threads'] sets the intra-op thread count and config['bf16']
+        turns on bfloat16 autocast for sampling and likelihoods.
+        """
+        self.device = set_device(config.get('device'))
+        self.use_bf16 = bool(config.get('bf16', False)) and self.device.type == 'cpu'
+        if self.device.type == 'cpu' and config.get('num_threads'):
+            torch.set_num_threads(config['num_threads'])
+        return self.device
+
+    def autocast(self):
+        return torch.autocast(device_type=self.device.type, dtype=torch.bfloat16, enabled=self.use_bf16)
+
     def setup_model(self, oracle, config):
         self.oracle.set_objectives(*(oracle))
         self.config = config
+        self.setup_device(config)
 
         path_here = os.path.dirname(os.path.realpath(__file__))
         restore_prior_from = os.path.join(path_here, 'data/Prior.ckpt')
@@ -46,17 +69,17 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
         self.Prior = RNN(voc)
         self.Agent = RNN(voc)
 
-        if torch.cuda.is_available():
-            self.Prior.rnn.load_state_dict(torch.load(restore_prior_from))
-            self.Agent.rnn.load_state_dict(torch.load(restore_agent_from))
-        else:
-            self.Prior.rnn.load_state_dict(torch.load(restore_prior_from, map_location='cpu'))
-            self.Agent.rnn.load_state_dict(torch.load(restore_agent_from, map_location='cpu'))
+        self.Prior.rnn.load_state_dict(torch.load(restore_prior_from, map_location=self.device))
+        self.Agent.rnn.load_state_dict(torch.load(restore_agent_from, map_location=self.device))
 
         for param in self.Prior.rnn.parameters():
             param.requires_grad = False
 
-        self.log_z = torch.nn.Parameter(torch.tensor([5.]).cuda() if torch.cuda.is_available() else torch.tensor([5.]))
+        if config.get('compile', False):
+            self.Prior.rnn = torch.compile(self.Prior.rnn)
+            self.Agent.rnn = torch.compile(self.Agent.rnn)
+
+        self.log_z = torch.nn.Parameter(torch.tensor([5.], device=self.device))
         self.optimizer = torch.optim.Adam([
             {'params': self.Agent.rnn.parameters(), 'lr': config['learning_rate']},
             {'params': self.log_z, 'lr': config['lr_z']}
@@ -66,7 +89,7 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
         self.model_initialized = True
         self.ga_handler = GeneticOperatorHandler(mutation_rate=config['mutation_rate'], 
                                             population_size=config['population_size'])
-        self.pool = Parallel(n_jobs=config['num_jobs'])
+        self.reproduction_pool(config)
         print("Model setup complete.")
 
 
@@ -98,10 +121,11 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
                     exp_seqs, exp_score = experience.rank_based_sample(config['experience_replay'], config['rank_coefficient'])
                 else:
                     exp_seqs, exp_score = experience.sample(config['experience_replay'])
-                exp_agent_likelihood, _ = Agent.likelihood(exp_seqs.long())
-                prior_agent_likelihood, _ = Prior.likelihood(exp_seqs.long())
+                with self.autocast():
+                    exp_agent_likelihood, _ = Agent.likelihood(exp_seqs.long())
+                    prior_agent_likelihood, _ = Prior.likelihood(exp_seqs.long())
 
-                reward = torch.tensor(exp_score).cuda() 
+                reward = torch.tensor(exp_score, device=self.device)
 
                 exp_forward_flow = exp_agent_likelihood + log_z
                 exp_backward_flow = reward * config['beta']
@@ -117,52 +141,65 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
         else:
             print("Not enough experience to train. Current:", len(experience))
         
-    def mol_buffer_store(self,mol_buffer,smiles):
-        all_smiles = [i[0].value for i in mol_buffer]
+    def score_new_smiles(self, buffer_view, smiles):
+        """
+        Scores sanitized (canonical) SMILES and keeps those not yet in the buffer view.
+        Returns the new SMILES and their scores without touching the buffer.
+        """
         scores = np.array(self.oracle(smiles))
-        for i,child in enumerate(smiles):
-            mol = Chem.MolFromSmiles(child) 
-            if mol is None: # check if valid
-                pass
-            else:
-                child = Chem.MolToSmiles(mol,canonical=True)
-                # check if repeated
-                if child in all_smiles:
-                    pass
-                else:
-                    all_smiles.append(child)
-                    item = Item(child,['sa','drd2','qed','gsk3b','jnk3'])
-                    item.total = scores[i]
-                    mol_buffer.append([item,len(mol_buffer)+1])
-        return mol_buffer
+        new_smis, new_scores, seen = [], [], set()
+        for child, score in zip(smiles, scores):
+            if child in buffer_view or child in seen:
+                continue
+            seen.add(child)
+            new_smis.append(child)
+            new_scores.append(score)
+        return new_smis, np.array(new_scores, dtype=float)
+
+    def select_population(self, buffer_view, new_smis, new_scores, num_keep):
+        """
+        Best num_keep molecules of the buffer view plus the new samples, highest score first
+        (ties keep buffer order), read straight from the columnar score array.
+        """
+        totals = np.concatenate([buffer_view.totals, new_scores])
+        keys = np.where(np.isnan(totals), -np.inf, totals)
+        if len(keys) > num_keep:
+            top = np.argpartition(-keys, num_keep - 1)[:num_keep]
+        else:
+            top = np.arange(len(keys))
+        top = top[np.lexsort((top, -keys[top]))]
+        n = len(buffer_view)
+        pop_smis = [buffer_view.value(i) if i < n else new_smis[i - n] for i in top]
+        return pop_smis, totals[top].tolist()
 
     def sample_n_smiles(self, n: int,mol_buffer: list) -> list:
         """
         用当前Agent策略生成n个SMILES字符串
         """
-        mol_buffer = deepcopy(mol_buffer)
         if not self.model_initialized:
             raise RuntimeError("Please call setup_model() before sampling.")
+        if not isinstance(mol_buffer, MoleculeBuffer):
+            mol_buffer = MoleculeBuffer(mol_buffer)
+        buffer_view = mol_buffer.snapshot()
         all_smiles = []
         config = self.config
 
-        seqs, _, _ = self.Agent.sample(self.config['batch_size'])
+        start = time.perf_counter()
+        with torch.inference_mode(), self.autocast():
+            seqs, _, _ = self.Agent.sample(self.config['batch_size'])
+        self.samples_per_second.append(len(seqs) / (time.perf_counter() - start))
+        print(f'sampling: {self.samples_per_second[-1]:.1f} samples/s on {self.device}')
         unique_idxs = unique(seqs)
         seqs = seqs[unique_idxs]
         smiles = seq_to_smiles(seqs, self.voc)
         smiles = sanitize(smiles)
 
         all_smiles.extend(smiles)
-        self.mol_buffer_store(mol_buffer,smiles)
+        new_smis, new_scores = self.score_new_smiles(buffer_view, smiles)
         
         
-        if config['population_size'] and len(mol_buffer) > config['population_size']:
-            mol_buffer = sorted(mol_buffer, key=lambda item: item[0].total, reverse=True)
-            #pop_smis, pop_scores = tuple(map(list, zip(*[(smi, elem[0]) for (smi, elem) in mol_buffer.items()])))
-            pop_smis = [i[0].value for i in mol_buffer]
-            pop_scores = [i[0].total for i in mol_buffer]
-            
-            populations = (pop_smis[:config['num_keep']], pop_scores[:config['num_keep']])
+        if config['population_size'] and len(buffer_view) + len(new_smis) > config['population_size']:
+            populations = self.select_population(buffer_view, new_smis, new_scores, config['num_keep'])
             # populations = select_pop(pop_smis, pop_scores, config['population_size'], rank_coefficient=config['rank_coefficient'])
 
             for g in range(config['ga_generations']):
@@ -190,25 +227,25 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
         restore_agent_from=restore_prior_from 
         voc = Vocabulary(init_from_file=os.path.join(path_here, "data/Voc"))
 
+        self.setup_device(config)
         Prior = RNN(voc)
         Agent = RNN(voc)
 
         # By default restore Agent to same model as Prior, but can restore from already trained Agent too.
-        # Saved models are partially on the GPU, but if we dont have cuda enabled we can remap these
-        # to the CPU.
-        if torch.cuda.is_available():
-            Prior.rnn.load_state_dict(torch.load(os.path.join(path_here,'data/Prior.ckpt')))
-            Agent.rnn.load_state_dict(torch.load(restore_agent_from))
-        else:
-            Prior.rnn.load_state_dict(torch.load(os.path.join(path_here, 'data/Prior.ckpt'), map_location=lambda storage, loc: storage))
-            Agent.rnn.load_state_dict(torch.load(restore_agent_from, map_location=lambda storage, loc: storage))
+        # Saved models are partially on the GPU, remap them to the selected device.
+        Prior.rnn.load_state_dict(torch.load(os.path.join(path_here, 'data/Prior.ckpt'), map_location=self.device))
+        Agent.rnn.load_state_dict(torch.load(restore_agent_from, map_location=self.device))
 
         # We dont need gradients with respect to Prior
         for param in Prior.rnn.parameters():
             param.requires_grad = False
 
+        if config.get('compile', False):
+            Prior.rnn = torch.compile(Prior.rnn)
+            Agent.rnn = torch.compile(Agent.rnn)
+
         # optimizer = torch.optim.Adam(Agent.rnn.parameters(), lr=config['learning_rate'])
-        log_z = torch.nn.Parameter(torch.tensor([5.]).cuda())
+        log_z = torch.nn.Parameter(torch.tensor([5.], device=self.device))
         optimizer = torch.optim.Adam([{'params': Agent.rnn.parameters(), 
                                         'lr': config['learning_rate']},
                                     {'params': log_z, 
@@ -221,7 +258,7 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
 
         ga_handler = GeneticOperatorHandler(mutation_rate=config['mutation_rate'], 
                                             population_size=config['population_size'])
-        pool = Parallel(n_jobs=config['num_jobs'])
+        pool = self.reproduction_pool(config)
 
         print("Model initialized, starting training...")
 
@@ -239,7 +276,8 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
                 old_scores = 0
             
             # Sample from Agent
-            seqs, agent_likelihood, entropy = Agent.sample(config['batch_size'])
+            with torch.inference_mode(), self.autocast():
+                seqs, agent_likelihood, entropy = Agent.sample(config['batch_size'])
 
             # Remove duplicates, ie only consider unique seqs
             unique_idxs = unique(seqs)
@@ -326,10 +364,11 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
                     else:
                         exp_seqs, exp_score = experience.sample(config['experience_replay'])
 
-                    exp_agent_likelihood, _ = Agent.likelihood(exp_seqs.long())
-                    prior_agent_likelihood, _ = Prior.likelihood(exp_seqs.long())
+                    with self.autocast():
+                        exp_agent_likelihood, _ = Agent.likelihood(exp_seqs.long())
+                        prior_agent_likelihood, _ = Prior.likelihood(exp_seqs.long())
 
-                    reward = torch.tensor(exp_score).cuda()
+                    reward = torch.tensor(exp_score, device=self.device)
 
                     exp_forward_flow = exp_agent_likelihood + log_z
                     exp_backward_flow = reward * config['beta']
@@ -349,3 +388,4 @@ class Genetic_GFN_Optimizer(BaseOptimizer):
 
             step += 1
 
+        pool.close()
@@ -6,11 +6,10 @@ from rdkit import rdBase
 from rdkit.Chem import AllChem
 from rdkit import DataStructs
 from sklearn import svm
-import time
 import pickle
-import re
-import threading
-import pexpect
+import os
+import atexit
+from concurrent.futures import ProcessPoolExecutor
 rdBase.DisableLog('rdApp.error')
 
 """Scoring function should be a class where some tasks that are shared for every call
@@ -18,15 +17,15 @@ rdBase.DisableLog('rdApp.error')
    argument and returns a float. A multiprocessing class will then spawn workers and divide the
    list of SMILES given between them.
 
-   Passing *args and **kwargs through a subprocess call is slightly tricky because we need to know
-   their types - everything will be a string once we have passed it. Therefor, we instead use class
-   attributes which we can modify in place before any subprocess is created. Any **kwarg left over in
-   the call to get_scoring_function will be checked against a list of (allowed) kwargs for the class
-   and if a match is found the value of the item will be the new value for the class.
+   Scoring function classes take no constructor arguments, we instead use class attributes which
+   we can modify in place before any worker is created. Any **kwarg left over in the call to
+   get_scoring_function will be checked against a list of (allowed) kwargs for the class and if a
+   match is found the value of the item will be the new value for the class.
 
    If num_processes == 0, the scoring function will be run in the main process. Depending on how
    demanding the scoring function is and how well the OS handles the multiprocessing, this might
-   be faster than multiprocessing in some cases."""
+   be faster than multiprocessing in some cases. Otherwise a persistent process pool is used, where
+   each worker builds the scoring function once and the allowed **kwargs are forwarded to it."""
 
 class no_sulphur():
     """Scores structures based on not containing sulphur."""
@@ -91,79 +90,61 @@ class activity_model():
             nfp[0, nidx] += int(v)
         return nfp
 
-class Worker():
-    """A worker class for the Multiprocessing functionality. Spawns a subprocess
-       that is listening for input SMILES and inserts the score into the given
-       index in the given list."""
-    def __init__(self, scoring_function=None):
-        """The score_re is a regular expression that extracts the score from the
-           stdout of the subprocess. This means only scoring functions with range
-           0.0-1.0 will work, for other ranges this re has to be modified."""
+# scoring function instance kept warm by each pool worker
+_worker_scoring_function = None
+
 
-        self.proc = pexpect.spawn('./multiprocess.py ' + scoring_function,
-                                  encoding='utf-8')
+def _init_scoring_worker(scoring_function_class, kwargs):
+    global _worker_scoring_function
+    rdBase.DisableLog('rdApp.error')
+    # class attributes set in the parent are not inherited by spawned workers
+    for k, v in kwargs.items():
+        setattr(scoring_function_class, k, v)
+    _worker_scoring_function = scoring_function_class()
 
-        print(self.is_alive())
 
-    def __call__(self, smile, index, result_list):
-        self.proc.sendline(smile)
-        output = self.proc.expect([re.escape(smile) + " 1\.0+|[0]\.[0-9]+", 'None', pexpect.TIMEOUT])
-        if output is 0:
-            score = float(self.proc.after.lstrip(smile + " "))
-        elif output in [1, 2]:
-            score = 0.0
-        result_list[index] = score
+def _score_chunk(smiles):
+    scores = []
+    for smile in smiles:
+        try:
+            scores.append(float(_worker_scoring_function(smile)))
+        except Exception:
+            scores.append(0.0)
+    return scores
 
-    def is_alive(self):
-        return self.proc.isalive()
 
 class Multiprocessing():
-    """Class for handling multiprocessing of scoring functions. OEtoolkits cant be used with
-       native multiprocessing (cant be pickled), so instead we spawn threads that create
-       subprocesses."""
-    def __init__(self, num_processes=None, scoring_function=None):
-        self.n = num_processes
-        self.workers = [Worker(scoring_function=scoring_function) for _ in range(num_processes)]
-
-    def alive_workers(self):
-        return [i for i, worker in enumerate(self.workers) if worker.is_alive()]
+    """Scores SMILES on a persistent process pool. Every worker builds the scoring
+       function once, batches are split into chunks and sent as pickled lists, and
+       results come back in input order. Call close() (or use as a context manager)
+       to shut the workers down; this also happens at interpreter exit."""
+    def __init__(self, num_processes=None, scoring_function=None, chunk_size=None, **kwargs):
+        self.n = num_processes or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.pool = ProcessPoolExecutor(max_workers=self.n, initializer=_init_scoring_worker,
+                                        initargs=(scoring_function, kwargs))
+        atexit.register(self.close)
 
     def __call__(self, smiles):
-        scores = [0 for _ in range(len(smiles))]
-        smiles_copy = [smile for smile in smiles]
-        while smiles_copy:
-            alive_procs = self.alive_workers()
-            if not alive_procs:
-               raise RuntimeError("All subprocesses are dead, exiting.")
-            # As long as we still have SMILES to score
-            used_threads = []
-            # Threads name corresponds to the index of the worker, so here
-            # we are actually checking which workers are busy
-            for t in threading.enumerate():
-                # Workers have numbers as names, while the main thread cant
-                # be converted to an integer
-                try:
-                    n = int(t.name)
-                    used_threads.append(n)
-                except ValueError:
-                    continue
-            free_threads = [i for i in alive_procs if i not in used_threads]
-            for n in free_threads:
-                if smiles_copy:
-                    # Send SMILES and what index in the result list the score should be inserted at
-                    smile = smiles_copy.pop()
-                    idx = len(smiles_copy)
-                    t = threading.Thread(target=self.workers[n], name=str(n), args=(smile, idx, scores))
-                    t.start()
-            time.sleep(0.01)
-        for t in threading.enumerate():
-            try:
-                n = int(t.name)
-                t.join()
-            except ValueError:
-                continue
+        smiles = list(smiles)
+        if not smiles:
+            return np.array([], dtype=np.float32)
+        chunk_size = self.chunk_size or max(1, -(-len(smiles) // (4 * self.n)))
+        chunks = [smiles[i:i + chunk_size] for i in range(0, len(smiles), chunk_size)]
+        scores = [score for chunk in self.pool.map(_score_chunk, chunks) for score in chunk]
         return np.array(scores, dtype=np.float32)
 
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 class Singleprocessing():
     """Adds an option to not spawn new processes for the scoring functions, but rather
        run them in the main process."""
@@ -182,10 +163,10 @@ def get_scoring_function(scoring_function, num_processes=None, **kwargs):
     if scoring_function not in scoring_functions:
         raise ValueError("Scoring function must be one of {}".format([f for f in scoring_functions]))
 
+    kwargs = {k: v for k, v in kwargs.items() if k in scoring_function_class.kwargs}
     for k, v in kwargs.items():
-        if k in scoring_function_class.kwargs:
-            setattr(scoring_function_class, k, v)
+        setattr(scoring_function_class, k, v)
 
     if num_processes == 0:
         return Singleprocessing(scoring_function=scoring_function_class)
-    return Multiprocessing(scoring_function=scoring_function, num_processes=num_processes)
+    return Multiprocessing(scoring_function=scoring_function_class, num_processes=num_processes, **kwargs)
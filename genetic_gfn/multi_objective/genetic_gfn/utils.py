@@ -2,17 +2,29 @@ import torch
 import numpy as np
 from rdkit import Chem
 
+_device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+
+def set_device(device=None):
+    """Selects the device used by Variable, unique and the RNN models.
+       None picks the GPU when one is available and the CPU otherwise."""
+    global _device
+    if device is None:
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    _device = torch.device(device)
+    return _device
+
+def get_device():
+    return _device
 
 def Variable(tensor):
     """Wrapper for torch.autograd.Variable that also accepts
        numpy arrays directly and automatically assigns it to
-       the GPU. Be aware in case some operations are better
-       left to the CPU."""
+       the selected device (see set_device). Be aware in case
+       some operations are better left to the CPU."""
     if isinstance(tensor, np.ndarray):
         tensor = torch.from_numpy(tensor).float()
-    if torch.cuda.is_available():
-        return torch.autograd.Variable(tensor).cuda()
-    return torch.autograd.Variable(tensor)
+    return torch.autograd.Variable(tensor).to(_device)
 
 def decrease_learning_rate(optimizer, decrease_by=0.01):
     """Multiplies the learning rate of the optimizer by 1 - decrease_by"""
@@ -40,6 +52,4 @@ def unique(arr):
     arr = arr.cpu().numpy()
     arr_ = np.ascontiguousarray(arr).view(np.dtype((np.void, arr.dtype.itemsize * arr.shape[1])))
     _, idxs = np.unique(arr_, return_index=True)
-    if torch.cuda.is_available():
-        return torch.LongTensor(np.sort(idxs)).cuda()
-    return torch.LongTensor(np.sort(idxs))
+    return torch.LongTensor(np.sort(idxs)).to(_device)
@@ -12,6 +12,7 @@ from datetime import datetime
 import argparse
 import json
 import time
+import queue
 import threading
 import pdb
 import pickle
@@ -276,50 +277,47 @@ class RolloutWorker:
         return reward
 
     def start_samplers(self, generator, n, dataset):
-        self.ready_events = [threading.Event() for i in range(n)]
-        self.resume_events = [threading.Event() for i in range(n)]
-        self.results = [None] * n
+        # rollouts need the live generator, so samplers stay threads; they hand
+        # batches over through a bounded queue and the consumer blocks on it
+        self.sampler_queue = queue.Queue(maxsize=n)
 
         def f(idx):
             while not self.stop_event.is_set():
                 try:
-                    self.results[idx] = self.sample2batch(
+                    r = self.sample2batch(
                         self.execute_train_episode_batch(generator, dataset, use_rand_policy=True))
                 except Exception as e:
                     print("Exception while sampling:")
                     print(e)
                     self.sampler_threads[idx].failed = True
                     self.sampler_threads[idx].exception = e
-                    self.ready_events[idx].set()
+                    self.sampler_queue.put(None)
                     break
-                self.ready_events[idx].set()
-                self.resume_events[idx].clear()
-                self.resume_events[idx].wait()
+                while not self.stop_event.is_set():
+                    try:
+                        self.sampler_queue.put(r, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
 
         self.sampler_threads = [threading.Thread(
             target=f, args=(i,)) for i in range(n)]
         [setattr(i, 'failed', False) for i in self.sampler_threads]
         [i.start() for i in self.sampler_threads]
-        round_robin_idx = [0]
 
         def get():
-            while True:
-                idx = round_robin_idx[0]
-                round_robin_idx[0] = (round_robin_idx[0] + 1) % n
-                if self.ready_events[idx].is_set():
-                    r = self.results[idx]
-                    self.ready_events[idx].clear()
-                    self.resume_events[idx].set()
-                    return r
-                elif round_robin_idx[0] == 0:
-                    time.sleep(0.001)
+            return self.sampler_queue.get()
         return get
 
     def stop_samplers_and_join(self):
         self.stop_event.set()
         if hasattr(self, 'sampler_threads'):
             while any([i.is_alive() for i in self.sampler_threads]):
-                [i.set() for i in self.resume_events]
+                try:
+                    while True:
+                        self.sampler_queue.get_nowait()
+                except queue.Empty:
+                    pass
                 [i.join(0.05) for i in self.sampler_threads]
 
 
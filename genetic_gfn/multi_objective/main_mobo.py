@@ -18,7 +18,7 @@ import threading
 import pdb
 import pickle
 import gzip
-from botorch.utils.multi_objective.hypervolume import Hypervolume
+from model.hypervolume import HypervolumeEstimator
 from botorch.utils.sampling import sample_simplex
 from botorch.utils.transforms import normalize, unnormalize
 import torch.multiprocessing as mp
@@ -47,6 +47,10 @@ def arg_parse():
                         action='store_true', default=False)
     parser.add_argument("--log_dir", default='runs/mobo')
     parser.add_argument("--include_nblocks", default=False)
+    parser.add_argument("--feat_cache_path", default=None, type=str,
+                        help="Persist the proxy graph featurization cache to this file")
+    parser.add_argument("--feat_cache_size", default=50000, type=int,
+                        help="Maximum number of molecules kept in the featurization cache")
     parser.add_argument("--num_init_examples", default=200, type=int)
     parser.add_argument("--num_outer_loop_iters", default=8, type=int)
     parser.add_argument("--num_samples", default=100, type=int)
@@ -84,6 +88,8 @@ def arg_parse():
     parser.add_argument("--proxy_dropout", default=0.1,
                         help="MC Dropout in Proxy", type=float)
     parser.add_argument("--proxy_num_dropout_samples", default=5, type=int)
+    parser.add_argument("--proxy_ensemble_workers", default=0, type=int,
+                        help="Threads training ensemble members concurrently, 0 = one per member")
     parser.add_argument("--evidential_lam", default=0.1, type=float)    
     parser.add_argument(
         "--fp_radius", type=int, default=2, help="Morgan fingerprint radius."
@@ -91,6 +97,12 @@ def arg_parse():
     parser.add_argument(
         "--fp_nbits", type=int, default=1024, help="Morgan fingerprint nBits."
     )
+    parser.add_argument("--gp_refit_interval", default=4, type=int,
+                        help="Re-optimize GP hyperparameters every n rounds, incremental updates otherwise")
+    parser.add_argument("--hv_max_time", default=1.0, type=float,
+                        help="Seconds per hypervolume estimate, exact for up to 3 objectives")
+    parser.add_argument("--hv_rel_error", default=0.01, type=float,
+                        help="Target relative confidence half-width of the hypervolume estimate")
 
     # GFlowNet
     parser.add_argument("--min_blocks", default=2, type=int)
@@ -394,7 +406,8 @@ def sample_batch(args, generator, rollout_worker, oracle=None, proxy=None, ref_m
     scores = torch.tensor(pd.DataFrame.from_dict(scores_dict).values)
     test_loss = F.mse_loss(top_means, scores)
 
-    hypervolume = Hypervolume(ref_point=torch.zeros(len(args.objectives)))
+    hypervolume = HypervolumeEstimator(ref_point=np.zeros(len(args.objectives)), maximize=True,
+                                       max_time=args.hv_max_time, rel_error=args.hv_rel_error)
     volume = hypervolume.compute(top_means)
     volume_oracle = hypervolume.compute(scores)
     
@@ -475,6 +488,9 @@ def main(args):
 
     # Initialize surrogate function
     proxy = get_proxy(args, bpath, oracle)
+    if proxy.mdp.include_nblocks == dataset.mdp.include_nblocks and proxy.mdp.floatX == dataset.mdp.floatX:
+        # proxy inference reuses the graphs featurized for training
+        proxy.mdp.molcache = dataset.mdp.molcache
     proxy.update(dataset, 0, reset=False)
             
     for i in range(1, args.num_outer_loop_iters+1):
@@ -500,6 +516,8 @@ def main(args):
         dataset.add_samples(batch)
         log_overall_metrics(args, dataset, batch_infos, MultiObjective_metrics)
         args.logger.save(os.path.join(args.log_dir, 'logged_data.pkl.gz'))
+        if args.feat_cache_path:
+            dataset.mdp.molcache.save(args.feat_cache_path)
 
         # update proxy with new data
         if i != args.num_outer_loop_iters:
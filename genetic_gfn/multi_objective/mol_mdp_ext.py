@@ -1,6 +1,7 @@
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 import os.path
 import numpy as np
+import torch
 
 from genetic_gfn.multi_objective.utils.molMDP import BlockMoleculeData, MolMDP
 import genetic_gfn.multi_objective.utils.chem as chem
@@ -38,6 +39,69 @@ class BlockMoleculeDataExtended(BlockMoleculeData):
                 'stems': self.stems}
 
 
+def _to_cpu(r):
+    if isinstance(r, (list, tuple)):
+        return type(r)(_to_cpu(x) for x in r)
+    return r.cpu() if hasattr(r, 'cpu') else r
+
+
+class FeaturizationCache:
+    """LRU cache of graph representations of block molecules.
+
+    Records are keyed by the block structure (blockidxs, jbonds, stems), which
+    fixes the stem mask and the block count of the featurized graph, so a hit
+    never touches RDKit. Representations are kept on the cpu (mols2batch moves
+    the collated batch to the device), which keeps them usable from forked
+    sampler processes. At most max_size records are kept, the least recently
+    used is evicted first. One cache can be shared by several MolMDPExtended
+    instances (dataset, proxy) as long as they use the same repr_type and floatX.
+    """
+
+    def __init__(self, max_size=50000):
+        self.max_size = max_size
+        self.records = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.records)
+
+    @staticmethod
+    def key(mol):
+        return (tuple(mol.blockidxs),
+                tuple(tuple(b) for b in mol.jbonds),
+                tuple(tuple(s) for s in mol.stems))
+
+    def get(self, mol, featurize):
+        key = self.key(mol)
+        r = self.records.get(key)
+        if r is not None:
+            self.hits += 1
+            self.records.move_to_end(key)
+            return r
+        self.misses += 1
+        r = _to_cpu(featurize(mol))
+        self.records[key] = r
+        self._trim()
+        return r
+
+    def _trim(self):
+        if self.max_size is not None:
+            while len(self.records) > self.max_size:
+                self.records.popitem(last=False)
+
+    def save(self, path):
+        torch.save({'records': self.records}, path)
+
+    def load(self, path):
+        if os.path.exists(path):
+            for key, r in torch.load(path)['records'].items():
+                # older cache files stored {'smiles', 'numblocks', 'repr'} records
+                self.records[key] = r['repr'] if isinstance(r, dict) else r
+            self._trim()
+        return self
+
+
 class MolMDPExtended(MolMDP):
 
     def build_translation_table(self):
@@ -210,7 +274,8 @@ class MolMDPExtended(MolMDP):
         self.include_nblocks = include_nblocks
         self.include_bonds = include_bonds
         #print(self.max_num_atm, self.num_stem_types)
-        self.molcache = {}
+        # set to a FeaturizationCache to memoize mol2repr
+        self.molcache = None
 
     def mols2batch(self, mols):
         if self.repr_type == 'block_graph':
@@ -223,9 +288,11 @@ class MolMDPExtended(MolMDP):
     def mol2repr(self, mol=None):
         if mol is None:
             mol = self.molecule
-        #molhash = str(mol.blockidxs)+':'+str(mol.stems)+':'+str(mol.jbonds)
-        #if molhash in self.molcache:
-        #    return self.molcache[molhash]
+        if self.molcache is not None:
+            return self.molcache.get(mol, self._mol2repr)
+        return self._mol2repr(mol)
+
+    def _mol2repr(self, mol):
         if self.repr_type == 'block_graph':
             r = model_block.mol2graph(mol, self, self.floatX)
         elif self.repr_type == 'atom_graph':
@@ -234,7 +301,6 @@ class MolMDPExtended(MolMDP):
                                      nblocks=self.include_nblocks)
         elif self.repr_type == 'morgan_fingerprint':
             r = model_fingerprint.mol2fp(mol, self, self.floatX)
-        #self.molcache[molhash] = r
         return r
 
     def get_nx_graph(self, mol: BlockMoleculeData, true_block=False):
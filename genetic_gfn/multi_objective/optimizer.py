@@ -1,6 +1,8 @@
 import os
 import yaml
+import atexit
 import random
+from concurrent.futures import ProcessPoolExecutor
 import torch
 import numpy as np
 import pandas as pd
@@ -12,19 +14,14 @@ from rdkit.Chem import Draw
 # from tdc.generation import MolGen
 #import wandb
 # from main.utils.chem import *
-from botorch.utils.multi_objective.hypervolume import Hypervolume
-from pymoo.indicators.hv import HV
-from pymoo.util.nds.non_dominated_sorting import NonDominatedSorting
+from model.hypervolume import HypervolumeEstimator
 import tdc
 #from oracle.scorer.scorer import get_scores
 from genetic_gfn.multi_objective.utils.metrics import compute_success, compute_diversity
 
-def cal_hv(scores):
+def cal_hv(scores, **budget):
     ref_point = np.array([1.1]*len(scores[0]))
-    hv = HV(ref_point=ref_point)
-    nds = NonDominatedSorting().do(scores,only_non_dominated_front=True)
-    scores = scores[nds]
-    return hv(scores)
+    return HypervolumeEstimator(ref_point, **budget).compute(scores)
 
 def top_auc(buffer, top_n, finish, freq_log, max_oracle_calls):
     sum = 0
@@ -44,7 +41,40 @@ def top_auc(buffer, top_n, finish, freq_log, max_oracle_calls):
     if finish and len(buffer) < max_oracle_calls:
         sum += (max_oracle_calls - len(buffer)) * top_n_now
     return sum / max_oracle_calls
+# tdc oracles held warm by each pool worker, one entry per objective name
+_worker_score_functions = {}
+_oracle_pools = {}
+
+
+def _init_oracle_worker(names):
+    for name in names:
+        _worker_score_functions[name] = tdc.Oracle(name)
+
+
+def _score_objective(task):
+    name, smis = task
+    return list(_worker_score_functions[name](smis))
+
+
+def get_oracle_pool(names, n_jobs):
+    """Process pool shared by every Oracle scoring the same objectives"""
+    key = (tuple(names), n_jobs)
+    if key not in _oracle_pools:
+        _oracle_pools[key] = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_oracle_worker,
+                                                 initargs=(list(names),))
+    return _oracle_pools[key]
+
+
+@atexit.register
+def _shutdown_oracle_pools():
+    for pool in _oracle_pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 class Oracle:
+    # batches smaller than this are scored in-process, IPC would cost more than it saves
+    min_pool_batch = 16
+
     def __init__(self, args=None, mol_buffer={}):
         self.name = None
         self.evaluator = None
@@ -61,26 +91,55 @@ class Oracle:
             self.max_oracle_calls = args.max_oracle_calls
             self.freq_log = args.freq_log
             self.weights = np.array(args.alpha_vector) 
+        n_jobs = getattr(args, 'n_jobs', 1)
+        if n_jobs < 0:
+            n_jobs = max(1, os.cpu_count() + 1 + n_jobs)
+        self.n_jobs = n_jobs
         self.mol_buffer = mol_buffer
         # self.sa_scorer = tdc.Oracle(name = 'SA')
         # self.diversity_evaluator = tdc.Evaluator(name = 'Diversity')
         self.last_log = 0
         self.results_dict = []
         self.current_div = 1.
-        self.hypervolume = Hypervolume(ref_point=torch.zeros(len(args.objectives)))
+        self.hv_budget = {'max_time': getattr(args, 'hv_max_time', 1.0), 'rel_error': getattr(args, 'hv_rel_error', 0.01)}
+        self.hypervolume = HypervolumeEstimator(ref_point=np.zeros(len(args.objectives)), maximize=True, **self.hv_budget)
     
+    def _transform(self, p, raw):
+        if p in ['qed','jnk3','bbbp1']:
+            return 1 - raw
+        elif p == 'sa':
+            return (raw - 1) / 9
+        elif p in ['gsk3b','drd2','smarts_filter']:
+            return raw
+        else:
+            raise NotImplementedError(f"{p} property is not defined in base.py")
+
     def evaluate_array(self, smi):
-        scores = []
-        for p in self.name_list:
-            if p in ['qed','jnk3','bbbp1']:
-                scores.append(1- self.score_functions[p](smi)) 
-            elif p == 'sa':
-                scores.append((self.score_functions[p](smi) -1 ) /9) 
-            elif p in ['gsk3b','drd2','smarts_filter']:
-                scores.append(self.score_functions[p](smi))
-            else:
-                raise NotImplementedError("{p} property is not defined in base.py")
-        return scores
+        return self.evaluate_batch([smi])[0]
+
+    def evaluate_batch(self, smis):
+        """
+        evaluate_array for a list of SMILES. Each objective scores the whole list in one
+        call; large batches are split into chunks and fanned out over the process pool.
+        """
+        if not len(smis):
+            return []
+        if self.n_jobs > 1 and len(smis) >= self.min_pool_batch:
+            pool = get_oracle_pool(self.name_list, self.n_jobs)
+            chunk = -(-len(smis) * len(self.name_list) // self.n_jobs)
+            futures = {p: [pool.submit(_score_objective, (p, smis[i:i + chunk])) for i in range(0, len(smis), chunk)]
+                       for p in self.name_list}
+            raw = {p: sum((f.result() for f in fs), []) for p, fs in futures.items()}
+        else:
+            raw = {p: list(self.score_functions[p](list(smis))) for p in self.name_list}
+        return [[self._transform(p, raw[p][i]) for p in self.name_list] for i in range(len(smis))]
+
+    def lookup_arrays(self, smis):
+        """evaluate_array values, served from the scores stored in mol_buffer where possible"""
+        missing = [s for s in smis if s not in self.mol_buffer]
+        computed = dict(zip(missing, self.evaluate_batch(missing)))
+        return [list(1 - np.asarray(self.mol_buffer[s][-1])) if s in self.mol_buffer else computed[s]
+                for s in smis]
 
     @property
     def budget(self):
@@ -135,8 +194,8 @@ class Oracle:
         # Uncomment this line if want to log top-10 moelucles figures, so as the best_mol key values.
         # temp_top10 = list(self.mol_buffer.items())[:10]
 
-        scores_5d = np.array([self.evaluate_array(smi) for smi in smis])
-        volume = cal_hv(scores_5d)
+        scores_5d = np.array(self.lookup_arrays(smis))
+        volume = cal_hv(scores_5d, **self.hv_budget)
 
         auc1 = top_auc(self.mol_buffer, 1, finish, self.freq_log, self.max_oracle_calls)
         auc10 = top_auc(self.mol_buffer, 10, finish, self.freq_log, self.max_oracle_calls)
@@ -241,43 +300,55 @@ class Oracle:
         Return:
             score: a float represents the property of the molecule.
         """
-        if len(self.mol_buffer) > self.max_oracle_calls:
-            return 0
-        if smi is None:
-            return 0
-        mol = Chem.MolFromSmiles(smi)
-        if mol is None or len(smi) == 0:
-            return 0
-        else:
-            smi = Chem.MolToSmiles(mol)
-            if smi in self.mol_buffer:
-                pass
-            else:
-                reward, scores = self.moo_evaluator(mol)
-                self.mol_buffer[smi] = [float(reward), len(self.mol_buffer)+1, scores]
-            return self.mol_buffer[smi][0]
-    
-    def __call__(self, smiles_lst):
+        return self.score_batch([smi], log=False)[0]
+
+    def score_batch(self, smiles_lst, log=True):
         """
-        Score
+        Score a list of SMILES. Every molecule is parsed once, molecules not yet in
+        mol_buffer are scored together in one batch, repeats are served from the buffer.
+        Buffer insertion, budget and logging follow the one-by-one order of smiles_lst.
         """
-        if type(smiles_lst) == list:
-            score_list = []
-            for smi in smiles_lst:
-                score_list.append(self.score_smi(smi))
-                if len(self.mol_buffer) % self.freq_log == 0 and len(self.mol_buffer) > self.last_log:
+        canonical = []
+        for smi in smiles_lst:
+            mol = Chem.MolFromSmiles(smi) if smi else None
+            canonical.append(Chem.MolToSmiles(mol) if mol is not None else None)
+
+        # molecules that will enter the buffer before the budget runs out
+        new_smis, seen, n_buffer = [], set(), len(self.mol_buffer)
+        for smi in canonical:
+            if n_buffer > self.max_oracle_calls:
+                break
+            if smi is None or smi in self.mol_buffer or smi in seen:
+                continue
+            seen.add(smi)
+            new_smis.append(smi)
+            n_buffer += 1
+        new_arrays = dict(zip(new_smis, self.evaluate_batch(new_smis)))
+
+        score_list = []
+        for smi in canonical:
+            if len(self.mol_buffer) > self.max_oracle_calls or smi is None:
+                score_list.append(0)
+                continue
+            if smi not in self.mol_buffer:
+                scores = 1 - np.array(new_arrays[smi])
+                self.mol_buffer[smi] = [float(scores.sum()), len(self.mol_buffer)+1, scores]
+                if log and len(self.mol_buffer) % self.freq_log == 0 and len(self.mol_buffer) > self.last_log:
                     self.sort_buffer()
                     self.log_intermediate()
                     self.last_log = len(self.mol_buffer)
                     self.save_result(self.task_label)
-        else:  ### a string of SMILES 
-            score_list = self.score_smi(smiles_lst)
-            if len(self.mol_buffer) % self.freq_log == 0 and len(self.mol_buffer) > self.last_log:
-                self.sort_buffer()
-                self.log_intermediate()
-                self.last_log = len(self.mol_buffer)
-                self.save_result(self.task_label)
+            score_list.append(self.mol_buffer[smi][0])
         return score_list
+    
+    def __call__(self, smiles_lst):
+        """
+        Score
+        """
+        if type(smiles_lst) == list:
+            return self.score_batch(smiles_lst)
+        else:  ### a string of SMILES 
+            return self.score_batch([smiles_lst])[0]
 
     @property
     def finish(self):
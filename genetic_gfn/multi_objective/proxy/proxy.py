@@ -150,7 +150,8 @@ class Proxy:
 
     def update(self, dataset, round_idx, reset=False):
         print("Training surrogate function...")
-        if reset:
+        if reset and self.args.proxy_uncertainty != 'GP':
+            # the GP keeps its factorization and is updated incrementally
             self.init_model()
         self.partitioning = self.get_partitioning(dataset)
 
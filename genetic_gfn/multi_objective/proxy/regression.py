@@ -19,12 +19,9 @@ from botorch.models.model_list_gp_regression import ModelListGP
 #     AnalyticMultiOutputObjective,
 #     IdentityAnalyticMultiOutputObjective,
 # )
-from proxy.fingerprints import smiles_to_fp_array
-from proxy.tanimoto_gp import TanimotoGP
+from genetic_gfn.multi_objective.utils.similarity import get_fingerprint_cache
+from proxy.tanimoto_gp import TanimotoGP, IncrementalTanimotoGP
 from proxy.gp_utils import fit_gp_hyperparameters
-import functools
-from rdkit.Chem import rdMolDescriptors
-from rdkit import Chem
 
 import numpy as np
 import pandas as pd
@@ -33,6 +30,7 @@ import gzip
 import pickle
 import pdb
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import os.path as osp
 import os
 import time
@@ -470,6 +468,12 @@ class EnsembleRegressor(nn.Module):
                         version=version,
                         dropout_rate=dropout_rate).to(self.device) \
                             for _ in range(self.proxy_num_dropout_samples)]
+        # members run concurrently on a thread pool (torch ops release the GIL),
+        # each on its own CUDA stream when on GPU; 1 worker trains them one after another
+        num_workers = getattr(args, 'proxy_ensemble_workers', 0) or len(self.proxy)
+        self.pool = ThreadPoolExecutor(num_workers) if num_workers > 1 else None
+        self.streams = [torch.cuda.Stream() for _ in self.proxy] \
+            if self.pool is not None and str(self.device).startswith('cuda') else None
         
     def fit(self, dataset, opt, mean, std, round_idx):
         self.mean = mean
@@ -488,14 +492,9 @@ class EnsembleRegressor(nn.Module):
         for i in range(self.args.proxy_num_iterations+1):
             s, r = dataset.sample2batch(dataset.sample(mbsize))
             r = (r - mean) / std  # (batch_size, num_obj)
-            mol_out_s = self._call_models_train(s).mean(0)
-            
-            loss = F.mse_loss(mol_out_s, r)
+            loss = self._train_step(s, r, opt)
             last_losses.append((loss.item(),))
             train_losses.append((loss.item(),))
-            opt.zero_grad()
-            loss.backward()
-            opt.step()
             self.training_steps = i + 1
             
             if not i % 50:
@@ -542,16 +541,54 @@ class EnsembleRegressor(nn.Module):
                 i.data = torch.tensor(besti).to(self.device)
         # self.args.logger.save(self.args.save_path, self.args)
     
+    def _map_models(self, fn):
+        """Apply fn(i, model) to every member, concurrently if a pool is set up"""
+        if self.pool is None:
+            return [fn(i, model) for i, model in enumerate(self.proxy)]
+
+        # grad mode is thread local, hand the caller's over to the workers
+        grad_enabled = torch.is_grad_enabled()
+        if self.streams is not None:
+            for stream in self.streams:
+                stream.wait_stream(torch.cuda.current_stream())
+
+        def run(i, model):
+            with torch.set_grad_enabled(grad_enabled):
+                if self.streams is None:
+                    return fn(i, model)
+                with torch.cuda.stream(self.streams[i]):
+                    return fn(i, model)
+
+        outs = list(self.pool.map(run, range(len(self.proxy)), self.proxy))
+        if self.streams is not None:
+            for stream in self.streams:
+                torch.cuda.current_stream().wait_stream(stream)
+        return outs
+
+    def _train_step(self, x, r, opt):
+        for model in self.proxy:
+            model.train()
+        ys = self._map_models(lambda i, model: model(x, None, do_stems=False)[1])
+        loss = F.mse_loss(torch.stack(ys, dim=0).mean(0), r)
+
+        # the loss only couples the members through their mean: take its gradient
+        # w.r.t. each member output, then back-propagate the members independently
+        opt.zero_grad()
+        grads = torch.autograd.grad(loss, ys)
+        self._map_models(lambda i, model: ys[i].backward(grads[i]))
+        opt.step()
+        return loss.detach()
+
     def _call_models_train(self, x):
         for model in self.proxy:
             model.train()
-        ys = torch.stack([model(x, None, do_stems=False)[1] for model in self.proxy], dim=0)  # (5, 64, 2)
+        ys = torch.stack(self._map_models(lambda i, model: model(x, None, do_stems=False)[1]), dim=0)  # (5, 64, 2)
         return ys
     
     def _call_models_eval(self, x):
         for model in self.proxy:
             model.eval()
-        ys = torch.stack([model(x, None, do_stems=False)[1] for model in self.proxy], dim=0)
+        ys = torch.stack(self._map_models(lambda i, model: model(x, None, do_stems=False)[1]), dim=0)
         return ys
     
     def posterior(self, x):
@@ -581,21 +618,32 @@ class GPRegressor(nn.Module):
         self.device = args.device
         # self.objective = AnalyticMultiOutputObjective()
         self.NP_DTYPE = np.float32
-        fingerprint_func = functools.partial(
-            rdMolDescriptors.GetMorganFingerprintAsBitVect,
-            radius=self.args.fp_radius,
-            nBits=self.args.fp_nbits,
-        )
-        self.my_smiles_to_fp_array = functools.partial(
-            smiles_to_fp_array, fingerprint_func=fingerprint_func
-        )
+        self.fp_cache = get_fingerprint_cache(self.args.fp_radius, self.args.fp_nbits)
+        self.refit_interval = max(1, getattr(self.args, 'gp_refit_interval', 1))
+        self.num_fits = 0
+        self.gp = IncrementalTanimotoGP()
         
     def fit(self, dataset):
-        x_train = np.stack([self.my_smiles_to_fp_array(s) for s in dataset.smis]).astype(self.NP_DTYPE)  # (200, 1024)
-        y_train = pd.DataFrame.from_dict(dataset.scores).values.astype(self.NP_DTYPE)  # (200, num_obj)
-        x_train = torch.as_tensor(x_train)
-        y_train = torch.as_tensor(y_train)
-        self.proxy = self.get_trained_gp(X_train=x_train, y_train=y_train).to(self.device)
+        # only molecules added since the last round are featurized and factorized;
+        # hyperparameters are re-optimized (full O(n^3) refit) every gp_refit_interval rounds
+        num_seen = len(self.gp)
+        new_smis = dataset.smis[num_seen:]
+        if not len(new_smis):
+            return
+        x_new = self.fp_cache.dense(new_smis, dtype=self.NP_DTYPE)  # (k, 1024)
+        y_new = pd.DataFrame.from_dict(dataset.scores[num_seen:]).values.astype(self.NP_DTYPE)  # (k, num_obj)
+        x_new = torch.as_tensor(x_new).to(self.device)
+        y_new = torch.as_tensor(y_new).to(self.device)
+
+        if self.num_fits % self.refit_interval == 0:
+            x_train = x_new if self.gp.train_x is None else torch.cat([self.gp.train_x.to(x_new.dtype), x_new])
+            y_train = y_new if self.gp.train_y is None else torch.cat([self.gp.train_y.to(y_new.dtype), y_new])
+            self.proxy = self.get_trained_gp(X_train=x_train.cpu(), y_train=y_train.cpu()).to(self.device)
+            self.gp.set_hyperparameters(self.proxy)
+            self.gp.refit(x_train, y_train)
+        else:
+            self.gp.update(x_new, y_new)
+        self.num_fits += 1
     
     def get_trained_gp(self, X_train, y_train):
         models = []
@@ -609,10 +657,11 @@ class GPRegressor(nn.Module):
         return model
     
     def posterior(self, x): 
-        x = self.my_smiles_to_fp_array(Chem.MolToSmiles(x.mol))
-        x = torch.as_tensor(x).unsqueeze(0).to(self.device)
+        x = self.fp_cache.dense([x], dtype=self.NP_DTYPE)
+        x = torch.as_tensor(x).to(self.device)
         with torch.no_grad():
-            posterior = self.proxy.posterior(x)  #! oracle scale
+            mean, variance = self.gp.predict(x)  #! oracle scale
+        posterior = MyPosterior(mean.float(), variance.float())
         return posterior
     
 
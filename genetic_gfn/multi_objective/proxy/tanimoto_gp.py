@@ -93,3 +93,86 @@ class TanimotoSGP(TanimotoGP):
             "covar_module.base_kernel.outputscale": self.covar_module.base_kernel.outputscale.item(),
             "mean_module.constant": self.mean_module.constant.item(),
         }
+
+
+class IncrementalTanimotoGP:
+    """Exact multi-output Tanimoto GP that keeps its Cholesky factors across rounds.
+
+    Hyperparameters (constant mean, outputscale and noise per objective) are copied
+    from a fitted ``ModelListGP`` of ``TanimotoGP`` models. New observations extend
+    the factorization with a rank-k block update, so adding k points to n costs
+    O(n^2 k) instead of the O((n+k)^3) of a full refactorization.
+    """
+
+    def __init__(self, jitter=1e-6, dtype=torch.float64):
+        self.jitter = jitter
+        self.dtype = dtype
+        self.train_x = None
+        self.train_y = None
+        self.chol = None  # (num_obj, n, n), lower triangular
+        self.proj_y = None  # (num_obj, n, 1), L^{-1} (y - mean)
+
+    def __len__(self):
+        return 0 if self.train_x is None else self.train_x.shape[0]
+
+    def set_hyperparameters(self, model_list):
+        """Read per-objective hyperparameters from a fitted ModelListGP"""
+        hparams = [model.hparam_dict for model in model_list.models]
+        self.mean_constant = torch.tensor([h["mean_module.constant"] for h in hparams], dtype=self.dtype)
+        self.outputscale = torch.tensor([h["covar_module.outputscale"] for h in hparams], dtype=self.dtype)
+        self.noise = torch.tensor([h["likelihood.noise"] for h in hparams], dtype=self.dtype)
+
+    def _covar(self, x1, x2):
+        sim = batch_tanimoto_sim(x1, x2).unsqueeze(0)
+        return self.outputscale.to(sim.device)[:, None, None] * sim
+
+    def _train_covar(self, x):
+        eye = torch.eye(x.shape[0], dtype=self.dtype, device=x.device)
+        noise = (self.noise.to(x.device) + self.jitter)[:, None, None]
+        return self._covar(x, x) + noise * eye
+
+    def _residual(self, y):
+        # (n, num_obj) -> (num_obj, n, 1)
+        return (y - self.mean_constant.to(y.device)).t().unsqueeze(-1)
+
+    def refit(self, x, y):
+        """Factorize the full kernel matrix from scratch (O(n^3))"""
+        x, y = x.to(self.dtype), y.to(self.dtype)
+        self.train_x, self.train_y = x, y
+        self.chol = torch.linalg.cholesky(self._train_covar(x))
+        self.proj_y = torch.linalg.solve_triangular(self.chol, self._residual(y), upper=False)
+
+    def update(self, x_new, y_new):
+        """Append observations with a rank-k update of the Cholesky factors"""
+        if self.chol is None:
+            return self.refit(x_new, y_new)
+        x_new, y_new = x_new.to(self.dtype), y_new.to(self.dtype)
+        n, k = len(self), x_new.shape[0]
+
+        # [[L, 0], [B^T, C]] is the factor of [[K_oo, K_on], [K_no, K_nn]]
+        B = torch.linalg.solve_triangular(self.chol, self._covar(self.train_x, x_new), upper=False)
+        schur = self._train_covar(x_new) - B.transpose(-1, -2) @ B
+        C, info = torch.linalg.cholesky_ex(schur)
+        if info.any():
+            # lost positive definiteness through round-off, start over
+            return self.refit(torch.cat([self.train_x, x_new]), torch.cat([self.train_y, y_new]))
+
+        chol = self.chol.new_zeros(self.chol.shape[0], n + k, n + k)
+        chol[:, :n, :n] = self.chol
+        chol[:, n:, :n] = B.transpose(-1, -2)
+        chol[:, n:, n:] = C
+        proj_new = torch.linalg.solve_triangular(
+            C, self._residual(y_new) - B.transpose(-1, -2) @ self.proj_y, upper=False)
+
+        self.chol = chol
+        self.proj_y = torch.cat([self.proj_y, proj_new], dim=1)
+        self.train_x = torch.cat([self.train_x, x_new])
+        self.train_y = torch.cat([self.train_y, y_new])
+
+    def predict(self, x):
+        """Latent posterior mean and variance, both (q, num_obj)"""
+        x = x.to(self.dtype)
+        A = torch.linalg.solve_triangular(self.chol, self._covar(self.train_x, x), upper=False)
+        mean = self.mean_constant.to(x.device)[:, None] + (A * self.proj_y).sum(1)
+        variance = self.outputscale.to(x.device)[:, None] - (A ** 2).sum(1)
+        return mean.t(), variance.clamp_min(self.jitter).t()
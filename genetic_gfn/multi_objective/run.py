@@ -30,6 +30,8 @@ def prepare_optimization_inputs():
     parser.add_argument('--oracles', nargs="+", default=["QED"])
     parser.add_argument('--objectives', type=str, default='qed,sa,drd2,gsk3b,jnk3')
     parser.add_argument('--alpha_vector', default='1,1,1,1,1', type=str)
+    parser.add_argument('--hv_max_time', type=float, default=1.0, help='seconds per hypervolume estimate (> 3 objectives)')
+    parser.add_argument('--hv_rel_error', type=float, default=0.01, help='target relative CI half-width of the estimate')
     parser.add_argument('--log_results', action='store_true')
     parser.add_argument('--log_code', action='store_true')
     parser.add_argument('--wandb', type=str, default="disabled", choices=["online", "offline", "disabled"])
@@ -84,6 +86,8 @@ def main():
     parser.add_argument('--oracles', nargs="+", default=["QED"]) ### 
     parser.add_argument("--objectives", type=str, default='qed,sa,drd2,gsk3b,jnk3')
     parser.add_argument("--alpha_vector", default='1,1,1,1,1', type=str)
+    parser.add_argument('--hv_max_time', type=float, default=1.0, help='seconds per hypervolume estimate (> 3 objectives)')
+    parser.add_argument('--hv_rel_error', type=float, default=0.01, help='target relative CI half-width of the estimate')
     parser.add_argument('--log_results', action='store_true')
     parser.add_argument('--log_code', action='store_true')
     parser.add_argument('--wandb', type=str, default="disabled", choices=["online", "offline", "disabled"])
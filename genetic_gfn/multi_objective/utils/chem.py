@@ -1,7 +1,10 @@
 import contextlib
+import hashlib
 import logging
 import os
 import random
+import shlex
+import shutil
 import string
 import subprocess
 from collections import Counter
@@ -280,20 +283,38 @@ def mol_to_graph_backend(atmfeat, coord, bond, bondfeat, props={}, data_cls=Data
     return data
 
 class GenMolFile:
-    def __init__(self, outpath, mgltools, mglbin):
+    """Builds a docking-ready pdbqt for a SMILES: lowest MMFF energy conformer out of
+    num_conf, converted by obabel and prepare_ligand4. With cache_dir set, the pdbqt is
+    also stored there under a hash of the canonical SMILES and reused on later calls.
+    obabel_bin / pythonsh can point to stand-in executables for tests."""
+    def __init__(self, outpath, mgltools, mglbin, obabel_bin="obabel", pythonsh=None, cache_dir=None):
         self.outpath = outpath
         self.prepare_ligand4 = os.path.join(mgltools, "AutoDockTools/Utilities24/prepare_ligand4.py")
         self.mglbin = mglbin
+        self.obabel_bin = obabel_bin
+        self.pythonsh = pythonsh or os.path.join(mglbin, "pythonsh")
+        self.cache_dir = cache_dir
 
         os.makedirs(os.path.join(outpath, "sdf"), exist_ok=True)
         os.makedirs(os.path.join(outpath, "mol2"), exist_ok=True)
         os.makedirs(os.path.join(outpath, "pdbqt"), exist_ok=True)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_file(self, smi):
+        key = Chem.MolToSmiles(Chem.MolFromSmiles(smi))
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".pdbqt")
 
     def __call__(self, smi, mol_name, num_conf):
         sdf_file = os.path.join(self.outpath, "sdf", f"{mol_name}.sdf")
         mol2_file = os.path.join(self.outpath, "mol2", f"{mol_name}.mol2")
         pdbqt_file = os.path.join(self.outpath, "pdbqt", f"{mol_name}.pdbqt")
 
+        cache_file = self.cache_file(smi) if self.cache_dir else None
+        if cache_file and os.path.exists(cache_file):
+            shutil.copyfile(cache_file, pdbqt_file)
+            return pdbqt_file
+
         mol = Chem.MolFromSmiles(smi)
         Chem.SanitizeMol(mol)
         mol_h = Chem.AddHs(mol)
@@ -303,9 +324,17 @@ class GenMolFile:
         mp = AllChem.MMFFGetMoleculeProperties(mol_h, mmffVariant='MMFF94')
         # choose minimum energy conformer
         mi = np.argmin([AllChem.MMFFGetMoleculeForceField(mol_h, mp, confId=i).CalcEnergy() for i in range(num_conf)])
-        print(Chem.MolToMolBlock(mol_h, confId=int(mi)), file=open(sdf_file, 'w+'))
-        os.system(f"obabel -isdf {sdf_file} -omol2 -O {mol2_file}")
-        os.system(f"{self.mglbin}/pythonsh {self.prepare_ligand4} -l {mol2_file} -o {pdbqt_file}")
+        with open(sdf_file, 'w+') as f:
+            print(Chem.MolToMolBlock(mol_h, confId=int(mi)), file=f)
+        subprocess.run([self.obabel_bin, "-isdf", sdf_file, "-omol2", "-O", mol2_file],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        subprocess.run([self.pythonsh, self.prepare_ligand4, "-l", mol2_file, "-o", pdbqt_file],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if cache_file:
+            # copy then rename so concurrent workers never see a partial file
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            shutil.copyfile(pdbqt_file, tmp_file)
+            os.replace(tmp_file, cache_file)
         return pdbqt_file
 
 
@@ -318,41 +347,50 @@ class DockVina_smi:
                  rec_file="4jnc.nohet.aligned.pdbqt",
                  bindsite=(-13.4, 26.3, -13.3, 20.013, 16.3, 18.5),
                  dock_pars="",
-                 cleanup=True):
+                 cleanup=True,
+                 vina_bin=None,
+                 obabel_bin="obabel",
+                 pythonsh=None,
+                 conformer_cache_dir=None):
 
         self.outpath = outpath
         self.mgltools = os.path.join(mgltools_dir, "MGLToolsPckgs")
         self.mgltools_bin = os.path.join(mgltools_dir, "bin")
-        self.vina_bin = os.path.join(vina_dir, "bin/vina")
+        self.vina_bin = vina_bin or os.path.join(vina_dir, "bin/vina")
         self.rec_file = os.path.join(docksetup_dir, rec_file)
         self.bindsite = bindsite
         self.dock_pars = dock_pars
         self.cleanup = cleanup
 
-        self.gen_molfile = GenMolFile(self.outpath, self.mgltools, self.mgltools_bin)
+        self.gen_molfile = GenMolFile(self.outpath, self.mgltools, self.mgltools_bin, obabel_bin=obabel_bin,
+                                      pythonsh=pythonsh, cache_dir=conformer_cache_dir)
         # make vina command
-        self.dock_cmd = "{} --receptor {} " \
-                        "--center_x {} --center_y {} --center_z {} " \
-                        "--size_x {} --size_y {} --size_z {} "
-        self.dock_cmd = self.dock_cmd.format(self.vina_bin, self.rec_file, *self.bindsite)
-        self.dock_cmd += " --ligand {} --out {}"
+        self.dock_cmd = [self.vina_bin, "--receptor", self.rec_file]
+        for axis, value in zip(["center_x", "center_y", "center_z", "size_x", "size_y", "size_z"], self.bindsite):
+            self.dock_cmd += [f"--{axis}", str(value)]
+        self.dock_cmd += shlex.split(self.dock_pars)
 
         os.makedirs(os.path.join(self.outpath, "docked"), exist_ok=True)
 
     def dock(self, smi, mol_name=None, molgen_conf=20):
         mol_name = mol_name or ''.join(random.choices(string.ascii_uppercase + string.digits, k=15))
         docked_file = os.path.join(self.outpath, "docked", f"{mol_name}.pdb")
-        input_file = self.gen_molfile(smi, mol_name, molgen_conf)
-        # complete docking query
-        dock_cmd = self.dock_cmd.format(input_file, docked_file)
-        dock_cmd = dock_cmd + " " + self.dock_pars
-
-        # dock
-        cl = subprocess.Popen(dock_cmd, shell=True, stdout=subprocess.PIPE)
-        cl.wait()
-        # parse energy
-        with open(docked_file) as f:
-            docked_pdb = f.readlines()
+        try:
+            input_file = self.gen_molfile(smi, mol_name, molgen_conf)
+            # complete docking query and dock
+            subprocess.run(self.dock_cmd + ["--ligand", input_file, "--out", docked_file],
+                           check=True, stdout=subprocess.DEVNULL)
+            # parse energy
+            with open(docked_file) as f:
+                docked_pdb = f.readlines()
+        finally:
+            if self.cleanup:
+                for f in [os.path.join(self.outpath, "sdf", f"{mol_name}.sdf"),
+                          os.path.join(self.outpath, "mol2", f"{mol_name}.mol2"),
+                          os.path.join(self.outpath, "pdbqt", f"{mol_name}.pdbqt"),
+                          docked_file]:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(f)
         if docked_pdb[1].startswith("REMARK VINA RESULT"):
             dockscore = float(docked_pdb[1].split()[3])
         else:
@@ -371,11 +409,4 @@ class DockVina_smi:
                                     and line.split()[2][0] != 'H']  # ignore hydrogen
         coord.append([line.split()[-7:-4] for line in docked_pdb_model_1_atoms])
         coord = np.array(coord, dtype=np.float32)
-
-        if self.cleanup:
-            with contextlib.suppress(FileNotFoundError):
-                os.remove(os.path.join(self.outpath, "sdf", f"{mol_name}.sdf"))
-                os.remove(os.path.join(self.outpath, "mol2", f"{mol_name}.mol2"))
-                os.remove(os.path.join(self.outpath, "pdbqt", f"{mol_name}.pdbqt"))
-                os.remove(os.path.join(self.outpath, "docked", f"{mol_name}.pdb"))
         return mol_name, dockscore, coord
@@ -5,15 +5,13 @@ import matplotlib.pyplot as plt
 import torch
 import torch.nn as nn
 from botorch.utils.multi_objective.hypervolume import Hypervolume
-from rdkit.Chem import AllChem
-from rdkit import DataStructs
 from scipy import stats
 from scipy.special import kl_div
 import networkx as nx
 import itertools
 import time
 from tqdm import tqdm
-from genetic_gfn.multi_objective.mol_mdp_ext import BlockMoleculeDataExtended
+from genetic_gfn.multi_objective.utils.similarity import get_fingerprint_cache, max_tanimoto, mean_pairwise_tanimoto
 
 
 def compute_success(mols, scores, objectives, score_succ):
@@ -42,29 +40,17 @@ def compute_diversity(mols):
     if len(mols) == 0:
         return 0
 
-    sims = []
-    if isinstance(mols[0], BlockMoleculeDataExtended):
-        fps = [AllChem.GetMorganFingerprintAsBitVect(x.mol, 3, 2048) for x in mols]
-    else:
-        fps = [AllChem.GetMorganFingerprintAsBitVect(x, 3, 2048) for x in mols]
-    for i in range(len(fps)):
-        sims += DataStructs.BulkTanimotoSimilarity(fps[i], fps[:i])
-
-    return 1 - np.mean(sims)
+    fps = get_fingerprint_cache(3, 2048).packed(mols)
+    return 1 - mean_pairwise_tanimoto(fps)
 
 
 def compute_novelty(mols, ref_mols):
     print("Computing novelty...")
-    positive_fps = [AllChem.GetMorganFingerprintAsBitVect(
-        x.mol, 3, 2048) for x in mols]
-    ref_fps = [AllChem.GetMorganFingerprintAsBitVect(
-        x, 3, 2048) for x in ref_mols]
-
-    n_sim = 0.
-    for i in range(len(positive_fps)):
-        sims = DataStructs.BulkTanimotoSimilarity(positive_fps[i], ref_fps)
-        if max(sims) >= 0.4:
-            n_sim += 1
+    cache = get_fingerprint_cache(3, 2048)
+    positive_fps = cache.packed(mols)
+    ref_fps = cache.packed(ref_mols)
+
+    n_sim = float((max_tanimoto(positive_fps, ref_fps) >= 0.4).sum())
     novelty = 1. - 1. * n_sim / (len(positive_fps)+1e-6)
 
     return novelty
@@ -0,0 +1,116 @@
+""" Bit-packed Morgan fingerprints and vectorized Tanimoto similarity """
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import AllChem
+from rdkit.DataStructs.cDataStructs import ConvertToNumpyArray
+
+# number of set bits in every byte value, fallback for numpy < 2.0
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(x):
+    """Number of set bits along the last axis of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x).sum(-1, dtype=np.int64)
+    return _POPCOUNT8[x.view(np.uint8)].sum(-1, dtype=np.int64)
+
+
+class FingerprintCache:
+    """
+    Morgan bit fingerprints stored as packed uint64 rows, one per canonical SMILES.
+    Use get_fingerprint_cache to share one cache per (radius, nbits) in a process.
+    """
+
+    def __init__(self, radius=2, nbits=1024):
+        assert nbits % 64 == 0
+        self.radius = radius
+        self.nbits = nbits
+        self.fps = {}
+
+    def __len__(self):
+        return len(self.fps)
+
+    def _fingerprint(self, mol):
+        bits = np.zeros((self.nbits,), dtype=np.uint8)
+        if mol is not None:
+            ConvertToNumpyArray(AllChem.GetMorganFingerprintAsBitVect(mol, self.radius, self.nbits), bits)
+        return np.packbits(bits).view(np.uint64)
+
+    def packed(self, mols):
+        """
+        (n, nbits // 64) uint64 array for a list of SMILES strings or RDKit Mols
+        (anything with a .mol attribute, e.g. BlockMoleculeDataExtended, works too)
+        """
+        rows = []
+        for m in mols:
+            if not isinstance(m, str):
+                m = getattr(m, 'mol', m)
+                m = Chem.MolToSmiles(m) if m is not None else ''
+            fp = self.fps.get(m)
+            if fp is None:
+                fp = self._fingerprint(Chem.MolFromSmiles(m) if m else None)
+                self.fps[m] = fp
+            rows.append(fp)
+        if not rows:
+            return np.zeros((0, self.nbits // 64), dtype=np.uint64)
+        return np.stack(rows)
+
+    def dense(self, mols, dtype=np.float32):
+        """(n, nbits) 0/1 array, the layout expected by the Tanimoto GP"""
+        packed = self.packed(mols)
+        return np.unpackbits(packed.view(np.uint8), axis=-1).astype(dtype)
+
+
+_caches = {}
+
+
+def get_fingerprint_cache(radius=2, nbits=1024):
+    key = (radius, nbits)
+    if key not in _caches:
+        _caches[key] = FingerprintCache(radius, nbits)
+    return _caches[key]
+
+
+def iter_tanimoto_blocks(a, b, max_block_elements=2 ** 24):
+    """
+    Yield (row_start, similarity block) over row blocks of the Tanimoto matrix
+    between packed fingerprints a (n, w) and b (m, w), keeping memory bounded.
+    """
+    if len(a) == 0 or len(b) == 0:
+        return
+    a_count = popcount(a)
+    b_count = popcount(b)
+    block_size = max(1, max_block_elements // (len(b) * a.shape[1]))
+    for start in range(0, len(a), block_size):
+        block = a[start:start + block_size]
+        inter = popcount(block[:, None, :] & b[None, :, :])
+        union = a_count[start:start + block_size, None] + b_count[None, :] - inter
+        yield start, np.divide(inter, union, out=np.zeros(inter.shape), where=union > 0)
+
+
+def tanimoto_matrix(a, b, max_block_elements=2 ** 24):
+    """Full (n, m) Tanimoto similarity matrix between packed fingerprints"""
+    sims = np.zeros((len(a), len(b)))
+    for start, block in iter_tanimoto_blocks(a, b, max_block_elements):
+        sims[start:start + len(block)] = block
+    return sims
+
+
+def max_tanimoto(a, b, max_block_elements=2 ** 24):
+    """Highest similarity of every row of a to any row of b"""
+    out = np.zeros((len(a),))
+    for start, block in iter_tanimoto_blocks(a, b, max_block_elements):
+        out[start:start + len(block)] = block.max(1)
+    return out
+
+
+def mean_pairwise_tanimoto(a, max_block_elements=2 ** 24):
+    """Mean similarity over all unordered pairs i > j of packed fingerprints a"""
+    total, count = 0., 0
+    for start, block in iter_tanimoto_blocks(a, a, max_block_elements):
+        rows = np.arange(start, start + len(block))[:, None]
+        lower = np.arange(len(a))[None, :] < rows
+        total += block[lower].sum()
+        count += int(lower.sum())
+    return total / count if count else np.nan
@@ -1,7 +1,12 @@
 import os
-import requests
-from openai import AzureOpenAI,OpenAI
 import time
+from model.lazy_import import lazy_import, is_available
+
+# client libraries are imported when the corresponding model is initialised
+requests = lazy_import('requests')
+OpenAI = lazy_import('openai', 'OpenAI')
+AzureOpenAI = lazy_import('openai', 'AzureOpenAI')
+genai = lazy_import('google.generativeai')
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -19,10 +24,6 @@ def DefaultAzureCredential():
     pass
 def get_bearer_token_provider():
     pass
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
 class LLM:
     def __init__(self,model='chatgpt',config=None):
         
@@ -135,7 +136,7 @@ class LLM:
         return response.choices[0].message.content
     
     def _init_gemini(self):
-        if genai is None:
+        if not is_available('google.generativeai'):
             raise RuntimeError("google.generativeai (genai) 未安装或导入失败。请先安装 `google-generativeai` 包。")
         genai.configure(api_key=os.getenv('GEMINI_API_KEY', self.config.get('model.gemini.api_key', default='')))
         model = genai.GenerativeModel("gemini-1.5-flash")
@@ -5,8 +5,8 @@ import os
 import pickle
 from algorithm.MOO import MOO
 from eval import eval_mo_results,mean_sr
-import pandas as pd
 import importlib
+from evaluation_broker import make_rewarding_system
 class ConfigLoader:
     def __init__(self, config_path="config.yaml"):
         config_path = os.path.join('problem',config_path)
@@ -57,7 +57,7 @@ class MOLLM:
             module_path = self.config.get('evalutor_path')  # e.g., "molecules"
             module = importlib.import_module(module_path)
             RewardingSystem = getattr(module, "RewardingSystem")
-            self.reward_system = RewardingSystem(config=self.config)
+            self.reward_system = make_rewarding_system(self.config, RewardingSystem)
         self.llm = LLM(model = self.config.get('model.name'),config = self.config)
         self.seed = seed
         self.history = []
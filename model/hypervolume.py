@@ -0,0 +1,146 @@
+import time
+from statistics import NormalDist
+from typing import NamedTuple
+
+import numpy as np
+from scipy.stats import qmc
+
+
+class HVEstimate(NamedTuple):
+    value: float
+    half_width: float  # of the confidence interval, 0 for exact results
+    exact: bool
+    n_samples: int
+
+
+def pareto_front(points):
+    """Non-dominated rows of a (n, d) array under minimization"""
+    points = np.unique(np.asarray(points, dtype=float), axis=0)
+    if len(points) < 2:
+        return points
+    keep = np.ones(len(points), dtype=bool)
+    block = max(1, 2 ** 22 // (len(points) * points.shape[1]))
+    for start in range(0, len(points), block):
+        p = points[start:start + block]
+        le = (points[None, :, :] <= p[:, None, :]).all(-1)
+        lt = (points[None, :, :] < p[:, None, :]).any(-1)
+        keep[start:start + block] = ~(le & lt).any(-1)
+    return points[keep]
+
+
+def _hv_2d(points, ref):
+    points = points[np.argsort(points[:, 0])]
+    # running minimum of the second coordinate gives the staircase of the front
+    y = np.minimum.accumulate(points[:, 1])
+    widths = np.diff(np.append(points[:, 0], ref[0]))
+    return float(np.sum(widths * (ref[1] - y)))
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def _exact_cost(n, d):
+    """Element comparisons made by _hv_exact on n points in d objectives, including
+    the pareto_front filter of every slice"""
+    if d <= 2:
+        return n * max(1., np.log2(max(n, 2)))
+    return n ** 3 * (d - 1) / 3 + n * _exact_cost(n, d - 1)
+
+
+def _hv_exact(points, ref, deadline=None):
+    """Exact hypervolume by slicing along the last objective; raises _BudgetExceeded after deadline"""
+    d = points.shape[1]
+    if len(points) == 0:
+        return 0.
+    if d == 1:
+        return float(ref[0] - points[:, 0].min())
+    if d == 2:
+        return _hv_2d(points, ref)
+    points = points[np.argsort(points[:, -1])]
+    depths = np.diff(np.append(points[:, -1], ref[-1]))
+    volume = 0.
+    for i in range(len(points)):
+        if deadline is not None and time.time() > deadline:
+            raise _BudgetExceeded
+        if depths[i] > 0:
+            volume += depths[i] * _hv_exact(pareto_front(points[:i + 1, :-1]), ref[:-1], deadline)
+    return volume
+
+
+def _count_dominated(samples, front):
+    block = max(1, 2 ** 22 // (len(front) * front.shape[1]))
+    count = 0
+    for start in range(0, len(samples), block):
+        s = samples[start:start + block]
+        count += int((front[None, :, :] <= s[:, None, :]).all(-1).any(-1).sum())
+    return count
+
+
+class HypervolumeEstimator:
+    """
+    Hypervolume indicator with a bounded cost. Two objectives are always computed
+    exactly. Exact slicing is also used for up to exact_max_dim objectives when
+    its estimated cost (element comparisons, counting the Pareto filter of every
+    slice) is at most exact_max_cost; it is abandoned for the estimate below if
+    it runs past max_time. Otherwise a randomized quasi-Monte Carlo estimate
+    (independently scrambled Sobol sequences over the box between the front and
+    the reference point) is refined until the confidence interval is within
+    rel_error of the value, max_time seconds pass or max_samples points have
+    been drawn per sequence.
+
+    Minimization by default like pymoo's HV; maximize=True follows botorch's
+    Hypervolume, where points must be larger than ref_point to count.
+    """
+
+    def __init__(self, ref_point, maximize=False, rel_error=0.01, max_time=1.0, max_samples=2 ** 16,
+                 confidence=0.95, n_sequences=16, exact_max_dim=3, exact_max_cost=2 ** 30, seed=0):
+        self.ref_point = np.asarray(ref_point, dtype=float)
+        self.sign = -1. if maximize else 1.
+        self.rel_error = rel_error
+        self.max_time = max_time
+        self.max_samples = max_samples
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.n_sequences = n_sequences
+        self.exact_max_dim = exact_max_dim
+        self.exact_max_cost = exact_max_cost
+        self.rng = np.random.default_rng(seed)
+
+    def compute(self, points):
+        """Hypervolume as a float, a drop-in for botorch's Hypervolume.compute"""
+        return self.estimate(points).value
+
+    def estimate(self, points):
+        if hasattr(points, 'detach'):
+            points = points.detach().cpu().numpy()
+        points = self.sign * np.asarray(points, dtype=float).reshape(-1, len(self.ref_point))
+        ref = self.sign * self.ref_point
+        start = time.time()
+        front = pareto_front(points[(points < ref).all(1)])
+        d = len(ref)
+        if len(front) <= 1 or d <= 2:
+            return HVEstimate(_hv_exact(front, ref), 0., True, 0)
+        if d <= self.exact_max_dim and _exact_cost(len(front), d) <= self.exact_max_cost:
+            try:
+                return HVEstimate(_hv_exact(front, ref, start + self.max_time), 0., True, 0)
+            except _BudgetExceeded:
+                pass
+        return self._estimate_qmc(front, ref, start)
+
+    def _estimate_qmc(self, front, ref, start):
+        lower = front.min(0)
+        box = float(np.prod(ref - lower))
+        engines = [qmc.Sobol(len(ref), scramble=True, seed=self.rng) for _ in range(self.n_sequences)]
+        dominated = np.zeros(self.n_sequences)
+        drawn = 0
+        while True:
+            n = max(2 ** 8, drawn)  # doubling keeps every Sobol prefix a power of two
+            for i, engine in enumerate(engines):
+                dominated[i] += _count_dominated(lower + engine.random(n) * (ref - lower), front)
+            drawn += n
+            fractions = dominated / drawn
+            value = box * fractions.mean()
+            half_width = self.z * box * fractions.std(ddof=1) / np.sqrt(self.n_sequences)
+            if (value > 0 and half_width <= self.rel_error * value) or drawn >= self.max_samples \
+                    or time.time() - start >= self.max_time:
+                return HVEstimate(value, half_width, False, drawn * self.n_sequences)
@@ -0,0 +1,150 @@
+"""
+Deferred imports for heavy optional backends (torch, rdkit, pygmo, pymoo, scipy,
+matplotlib, openai, ...).
+
+    torch = lazy_import('torch')
+    HV = lazy_import('pymoo.indicators.hv', 'HV')
+
+binds a placeholder at module load; the real module (or attribute) is imported
+the first time the placeholder is used: attribute access, call, indexing or
+isinstance checks against it. Modules that only need a backend on some code
+paths (molecular sanitizing, hypervolume, a particular LLM client) therefore
+cost nothing to import for problems that never reach those paths, which keeps
+the startup of ProcessPoolExecutor workers cheap.
+
+A backend that is not installed raises ImportError at first use, not at import.
+when_imported() runs setup code (e.g. seeding torch) once a module is imported,
+whoever imports it.
+"""
+
+import importlib
+import importlib.abc
+import importlib.util
+import sys
+import threading
+
+HEAVY_MODULES = ('torch', 'rdkit', 'pygmo', 'pymoo', 'scipy', 'matplotlib', 'openai',
+                 'google.generativeai', 'requests', 'pandas', 'tqdm')
+
+
+class LazyImport:
+    def __init__(self, module: str, attr: str = None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                if self._target is None:
+                    target = importlib.import_module(self._module)
+                    if self._attr is not None:
+                        target = getattr(target, self._attr)
+                    self._target = target
+                target = self._target
+        return target
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def __getattr__(self, name):
+        if name.startswith('__') and name.endswith('__'):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __instancecheck__(self, instance):
+        return isinstance(instance, self._load())
+
+    def __subclasscheck__(self, subclass):
+        return issubclass(subclass, self._load())
+
+    def __repr__(self):
+        name = self._module if self._attr is None else f'{self._module}.{self._attr}'
+        return f"<lazy {name}{'' if self.loaded else ' (not loaded)'}>"
+
+
+def lazy_import(module: str, attr: str = None) -> LazyImport:
+    """Placeholder for `import module` (or `from module import attr`) resolved on first use."""
+    return LazyImport(module, attr)
+
+
+def is_available(module: str) -> bool:
+    """True if module can be imported, without importing it."""
+    if module in sys.modules:
+        return sys.modules[module] is not None
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def loaded_heavy_modules() -> list:
+    """Heavy backends currently imported in this process."""
+    return [m for m in HEAVY_MODULES if m in sys.modules]
+
+
+_post_import_hooks = {}
+_hooks_lock = threading.Lock()
+
+
+class _NotifyingLoader(importlib.abc.Loader):
+    """Wraps a module's loader to run its when_imported() callbacks after executing it."""
+
+    def __init__(self, loader, name: str):
+        self._loader = loader
+        self._name = name
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._loader.exec_module(module)
+        with _hooks_lock:
+            callbacks = _post_import_hooks.pop(self._name, [])
+        for callback in callbacks:
+            callback(module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _PostImportFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in _post_import_hooks:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _NotifyingLoader(spec.loader, fullname)
+                return spec
+        return None
+
+
+_finder = _PostImportFinder()
+
+
+def when_imported(module: str, callback) -> None:
+    """
+    Calls callback(module_object) right away if module is already imported, otherwise
+    as soon as anything imports it. Callbacks registered before the import run in order.
+    """
+    with _hooks_lock:
+        loaded = sys.modules.get(module)
+        if loaded is None:
+            _post_import_hooks.setdefault(module, []).append(callback)
+            if _finder not in sys.meta_path:
+                sys.meta_path.insert(0, _finder)
+            return
+    callback(loaded)
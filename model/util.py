@@ -1,8 +1,12 @@
 import numpy as np
-from pymoo.indicators.hv import HV
-from pymoo.util.nds.non_dominated_sorting import NonDominatedSorting
-import pygmo as pg
 import re
+from model.lazy_import import lazy_import
+
+# hypervolume backends, imported on the first hypervolume computation
+HV = lazy_import('pymoo.indicators.hv', 'HV')
+NonDominatedSorting = lazy_import('pymoo.util.nds.non_dominated_sorting', 'NonDominatedSorting')
+pg = lazy_import('pygmo')
+HypervolumeEstimator = lazy_import('model.hypervolume', 'HypervolumeEstimator')
 
 def extract_smiles_from_string(text):
     pattern = r"<candidate>(.*?)</candidate>"
@@ -15,38 +19,49 @@ def split_list(lst, n):
     return [lst[i*k + min(i, m):(i+1)*k + min(i+1, m)] for i in range(n)]
 
 
-def fast_non_dominated_sort(population):
-    S = [[] for _ in range(len(population))]
-    front = [[]]
-    n = [0 for _ in range(len(population))]
-    rank = [0 for _ in range(len(population))]
-
-    for p in range(len(population)):
-        S[p] = []
-        n[p] = 0
-        for q in range(len(population)):
-            if dominates(population[p], population[q]):
-                S[p].append(q) 
-            elif dominates(population[q], population[p]):
-                n[p] += 1
-        if n[p] == 0:
-            rank[p] = 0
-            front[0].append(p)
-    
+def _score_matrix(population, scores=None):
+    if scores is not None:
+        return np.asarray(scores, dtype=float)
+    if len(population) == 0:
+        return np.empty((0, 0))
+    return np.array([p.scores for p in population], dtype=float)
+
+def _dominance_rows(rows, scores):
+    """[i, q]: rows[i] dominates scores[q]"""
+    rows = rows[:, None, :]
+    return ~(rows > scores[None]).any(axis=2) & (rows < scores[None]).any(axis=2)
+
+def fast_non_dominated_sort(population, scores=None, block_elems=1 << 22):
+    """
+    Pareto fronts (lists of indices into population) of minimized scores.
+    scores, an (n, n_objectives) array, can be passed instead of reading Item.scores.
+    The dominance relation is evaluated on the score matrix in blocks of rows of
+    about block_elems pairs, so memory stays O(block_elems) rather than O(n^2); the
+    front peeling order is the same as the pairwise loop it replaces.
+    """
+    scores = _score_matrix(population, scores)
+    size = len(scores)
+    step = max(1, block_elems // max(size, 1))
+    n = np.zeros(size, dtype=np.int64)  # number of points dominating each point
+    for lo in range(0, size, step):
+        n += _dominance_rows(scores[lo:lo + step], scores).sum(axis=0)
+
+    front = [list(np.flatnonzero(n == 0))]
     i = 0
     while len(front[i]) != 0:
         Q = []
-        for p in front[i]: # p: non dominated
-            for q in S[p]:
+        for lo in range(0, len(front[i]), step):
+            block = front[i][lo:lo + step]
+            dominated_by = _dominance_rows(scores[block], scores)
+            for row in dominated_by: # row of p: non dominated
+                q = np.flatnonzero(row)
                 n[q] -= 1
-                if n[q] == 0:
-                    rank[q] = i + 1
-                    Q.append(q)
+                Q.extend(q[n[q] == 0])
         i = i + 1
         front.append(Q)
 
     del front[-1]
-    return front
+    return [[int(p) for p in f] for f in front]
 
 def dominates(ind1, ind2):
     not_worse_in_all = True
@@ -60,24 +75,27 @@ def dominates(ind1, ind2):
 
     return not_worse_in_all and strictly_better_in_one
 
-def crowding_distance_assignment(front, population):
+def crowding_distance_assignment(front, population, scores=None):
+    scores = _score_matrix(population, scores)
     distances = [0] * len(front)
-    num_objectives = len(population[0].scores)
+    num_objectives = scores.shape[1]
     
     for m in range(num_objectives):
-        front.sort(key=lambda x: population[x].scores[m])
+        front.sort(key=lambda x: scores[x, m])
+        span = scores[front, m].max() - scores[front, m].min() + 1e-5
         distances[0] = distances[-1] = float('inf')
         for i in range(1, len(front) - 1):
-            distances[i] += (population[front[i + 1]].scores[m] - population[front[i - 1]].scores[m]) / (max(population[k].scores[m] for k in front) - min(population[k].scores[m] for k in front)+1e-5)
+            distances[i] += (scores[front[i + 1], m] - scores[front[i - 1], m]) / span
 
     return distances
 
-def nsga2_selection(population, pop_size,return_fronts=False):
-    fronts = fast_non_dominated_sort(population)
+def nsga2_selection(population, pop_size,return_fronts=False, scores=None):
+    scores = _score_matrix(population, scores)
+    fronts = fast_non_dominated_sort(population, scores)
     new_population = []
     for front in fronts:
         if len(new_population) + len(front) > pop_size:
-            crowding_distances = crowding_distance_assignment(front, population)
+            crowding_distances = crowding_distance_assignment(front, population, scores)
             sorted_front = sorted(front, key=lambda x: crowding_distances[front.index(x)], reverse=True)
             new_population.extend(sorted_front[:pop_size - len(new_population)])
         else:
@@ -86,10 +104,12 @@ def nsga2_selection(population, pop_size,return_fronts=False):
         return [population[i] for i in new_population],fronts
     return [population[i] for i in new_population]
 
-def so_selection(population, pop_size):
+def so_selection(population, pop_size, totals=None):
     # Single objective
-    sorted_items = sorted(population, key=lambda item: item.total, reverse=True)[:pop_size]
-    return sorted_items
+    if totals is None:
+        totals = [item.total for item in population]
+    order = np.argsort(-np.asarray(totals, dtype=float), kind='stable')[:pop_size]
+    return [population[i] for i in order]
 
 def nsga2_so_selection(population, pop_size):
     half_size = pop_size//2
@@ -121,30 +141,43 @@ def hvc_selection(pops,pop_size):
 
 
 def top_auc(buffer, top_n, finish, freq_log, max_oracle_calls):
+    """
+    Area under the running mean of the top_n totals against the number of oracle
+    calls. buffer is a list of [Item, order] pairs; a MoleculeBuffer provides
+    its order and total columns directly.
+    """
+    if hasattr(buffer, 'orders'):
+        orders, totals = buffer.orders, buffer.totals
+    else:
+        orders = np.array([kv[1] for kv in buffer])
+        totals = np.array([kv[0].total for kv in buffer], dtype=float)
+    totals = totals[np.argsort(orders, kind='stable')]
+
+    def top_n_mean(values):
+        if len(values) > top_n:
+            values = np.partition(values, len(values) - top_n)[len(values) - top_n:]
+        return np.mean(np.sort(values)[::-1])
+
     sum = 0
     prev = 0
     called = 0
-    ordered_results = list(sorted(buffer, key=lambda kv: kv[1], reverse=False))
     for idx in range(freq_log, min(len(buffer), max_oracle_calls), freq_log):
-        temp_result = ordered_results[:idx]
-        temp_result = list(sorted(temp_result, key=lambda kv: kv[0].total, reverse=True))[:top_n]
-        top_n_now = np.mean([item[0].total for item in temp_result])
+        top_n_now = top_n_mean(totals[:idx])
         sum += freq_log * (top_n_now + prev) / 2
         prev = top_n_now
         called = idx
-    temp_result = list(sorted(ordered_results, key=lambda kv: kv[0].total, reverse=True))[:top_n]
-    top_n_now = np.mean([item[0].total for item in temp_result])
+    top_n_now = top_n_mean(totals)
     sum += (len(buffer) - called) * (top_n_now + prev) / 2
     if finish and len(buffer) < max_oracle_calls:
         sum += (max_oracle_calls - len(buffer)) * top_n_now
     return sum / max_oracle_calls
 
-def cal_hv(scores):
+def cal_hv(scores, **budget):
+    """Hypervolume of minimized scores w.r.t. 1.1 in every objective.
+    budget (rel_error, max_time, ...) is passed to HypervolumeEstimator and only
+    matters for more than 3 objectives, where the value is a QMC estimate."""
     ref_point = np.array([1.1]*len(scores[0]))
-    hv = HV(ref_point=ref_point)
-    nds = NonDominatedSorting().do(scores,only_non_dominated_front=True)
-    scores = scores[nds]
-    return hv(scores)
+    return HypervolumeEstimator(ref_point, **budget).compute(scores)
 
 def cal_fusion_hv(scores):
     ref_point = np.array([1.0,20.0])
@@ -12,7 +12,12 @@ python problem/stellarator_vmec/plot_vmec_checkpoint.py \
   --baseline problem/stellarator_vmec/vmecpp/calculations/input.w7x \
   --outdir moo_results/plots \
   --topk 3 \
-  --compare_baseline
+  --compare_baseline \
+  --n_jobs 8
+
+Candidates (and the baseline) are re-evaluated on a process pool, each in its own
+scratch directory. Equilibria are cached under <outdir>/vmec_cache by the SHA-256
+of the modified input file, so a repeated analysis does not rerun VMEC.
 
 Dependencies: vmecpp, matplotlib, numpy, pandas (optional summary)
 """
@@ -21,7 +26,9 @@ import os
 import pickle
 import json
 import sys
+import hashlib
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from collections import deque
 from pathlib import Path
 from typing import Any, Dict, List, Tuple, Optional
@@ -42,6 +49,8 @@ except Exception:
 
 import vmecpp
 
+from workspace_manager import WorkspaceManager, clone_file
+
 # 支持作为模块导入或直接运行
 try:
     from .vmec_file_modifier import VmecFileModifier
@@ -175,82 +184,160 @@ def get_baseline_coeffs(baseline_input: Path) -> Dict[str, float]:
     return modifier.extract_coefficients()
 
 
+def substitute_coefficients(local_input: Path, coeffs: Dict[str, float]) -> Path:
+    """Substitute, in place, the coefficients that local_input already contains."""
+    modifier = VmecFileModifier(str(local_input.parent), local_input.name)
+    # Filter coefficients to those present in baseline
+    existing_keys = set(modifier.extract_coefficients().keys())
+    filtered_coeffs: Dict[str, float] = {}
+    for k, v in coeffs.items():
+        k_norm = k.strip().replace(" ", "")
+        if k_norm in existing_keys:
+            filtered_coeffs[k_norm] = v
+    if not filtered_coeffs:
+        raise ValueError("No valid coefficients can be replaced")
+
+    logger.debug(f"Replacing {len(filtered_coeffs)} coefficients")
+    modifier.replace_coefficients(filtered_coeffs)
+    return local_input.resolve()
+
+
+def prepare_vmec_input(baseline_input: Path, coeffs: Dict[str, float], tmp_dir: Path) -> Path:
+    """Copy the baseline into tmp_dir and substitute the coefficients it contains."""
+    if not baseline_input.exists():
+        raise FileNotFoundError(f"Baseline file does not exist: {baseline_input}")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    local_input = tmp_dir / baseline_input.name
+    logger.debug(f"Copying file: {baseline_input} -> {local_input}")
+    clone_file(baseline_input, local_input)
+    return substitute_coefficients(local_input, coeffs)
+
+
+def describe_vmec_error(e: Exception) -> str:
+    error_msg = str(e)
+    if isinstance(e, RuntimeError) and ("JACOBIAN" in error_msg or "FATAL ERROR" in error_msg):
+        return f"physically invalid: {error_msg[:100]}"
+    return f"{type(e).__name__}: {error_msg[:200]}"
+
+
 def run_vmec_safe(
     baseline_input: Path,
     coeffs: Dict[str, float],
     tmp_dir: Path,
+    max_threads: Optional[int] = None,
 ) -> Optional[Any]:
     """Run VMEC safely and return vmec_output, or None if it fails."""
-    local_input = None
     try:
-        import shutil
-        # Ensure temp directory exists
-        tmp_dir.mkdir(parents=True, exist_ok=True)
-        local_input = tmp_dir / baseline_input.name
-
-        # Copy baseline file
-        if not baseline_input.exists():
-            logger.error(f"Baseline file does not exist: {baseline_input}")
-            return None
-        
-        logger.debug(f"Copying file: {baseline_input} -> {local_input}")
-        shutil.copy2(baseline_input, local_input)
-        
-        # Verify copy succeeded
-        if not local_input.exists():
-            logger.error(f"File copy failed: {local_input}")
-            return None
-        
-        logger.debug(f"Creating VmecFileModifier: project_path={tmp_dir}, input_file={baseline_input.name}")
-        modifier = VmecFileModifier(str(tmp_dir), baseline_input.name)
-        
-        # Filter coefficients to those present in baseline
-        before_coeffs = modifier.extract_coefficients()
-        existing_keys = set(before_coeffs.keys())
-        filtered_coeffs: Dict[str, float] = {}
-        for k, v in coeffs.items():
-            k_norm = k.strip().replace(" ", "")
-            if k_norm in existing_keys:
-                filtered_coeffs[k_norm] = v
-
-        if not filtered_coeffs:
-            logger.warning("No valid coefficients can be replaced")
-            return None
-
-        logger.debug(f"Replacing {len(filtered_coeffs)} coefficients")
-        modifier.replace_coefficients(filtered_coeffs)
-        
-        # Run VMEC using absolute path
-        local_input_abs = local_input.resolve()
-        logger.debug(f"Running VMEC: {local_input_abs}")
-        if not local_input_abs.exists():
-            logger.error(f"VMEC input file does not exist: {local_input_abs}")
-            return None
-        vmec_input = vmecpp.VmecInput.from_file(str(local_input_abs))
-        vmec_output = vmecpp.run(vmec_input)
+        local_input = prepare_vmec_input(baseline_input, coeffs, tmp_dir)
+        logger.debug(f"Running VMEC: {local_input}")
+        vmec_output = vmecpp.run(vmecpp.VmecInput.from_file(str(local_input)), max_threads=max_threads)
         logger.debug("VMEC run succeeded")
         return vmec_output
-    except RuntimeError as e:
-        error_msg = str(e)
-        if "JACOBIAN" in error_msg or "FATAL ERROR" in error_msg:
-            logger.warning(f"VMEC run failed (physically invalid): {error_msg[:100]}")
-        else:
-            logger.warning(f"VMEC run failed: {error_msg[:100]}")
+    except Exception as e:
+        logger.warning(f"VMEC run failed: {describe_vmec_error(e)}")
         return None
-    except FileNotFoundError as e:
-        logger.error(f"File not found: {e}")
-        logger.info(f"Debug - tmp_dir: {tmp_dir} (exists: {tmp_dir.exists()})")
-        logger.info(f"Debug - local_input: {local_input} (exists: {local_input.exists() if local_input else 'N/A'})")
-        logger.info(f"Debug - baseline_input: {baseline_input} (exists: {baseline_input.exists()})")
+
+
+def _run_vmec_job(job: Tuple[str, Path], max_threads: Optional[int] = None) -> Tuple[str, Optional[Any], Optional[str]]:
+    # the OpenMP runtime is already loaded with vmecpp, so the thread count is passed per run
+    key, local_input = job
+    try:
+        return key, vmecpp.run(vmecpp.VmecInput.from_file(str(local_input)), max_threads=max_threads), None
+    except Exception as e:
+        return key, None, describe_vmec_error(e)
+
+
+def load_cached_output(cache_dir: Optional[Path], key: str) -> Optional[Any]:
+    if cache_dir is None or not (cache_dir / f"{key}.pkl").exists():
         return None
+    try:
+        with open(cache_dir / f"{key}.pkl", 'rb') as f:
+            return pickle.load(f)
     except Exception as e:
-        logger.warning(f"VMEC raised an exception: {type(e).__name__}: {str(e)[:200]}")
-        logger.info(f"Debug - tmp_dir: {tmp_dir}, local_input: {local_input}, baseline_input: {baseline_input}")
-        import traceback
-        logger.debug(traceback.format_exc())
+        logger.warning(f"Ignoring unreadable cache entry {key}: {e}")
         return None
 
 
+def store_cached_output(cache_dir: Optional[Path], key: str, vmec_output: Any) -> None:
+    if cache_dir is None:
+        return
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_dir / f"{key}.pkl.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(vmec_output, f)
+    os.replace(tmp_path, cache_dir / f"{key}.pkl")
+
+
+def evaluate_candidates(
+    baseline_input: Path,
+    candidates: Dict[str, Dict[str, float]],
+    scratch_dir: Optional[Path],
+    cache_dir: Optional[Path] = None,
+    n_jobs: int = 1,
+    threads_per_job: int = 1,
+    tmpfs: bool = False,
+) -> Dict[str, Tuple[Optional[Any], Optional[str]]]:
+    """
+    Run VMEC for every tag -> coefficients entry and return tag -> (vmec_output, error).
+    Each candidate gets a workspace <scratch>/<tag> whose files are hardlinks into a
+    staged copy of the baseline directory except the input itself, which is a private copy with the
+    candidate's coefficients. Identical inputs run once, and outputs are cached under
+    cache_dir by the SHA-256 of the modified input. With scratch_dir=None the
+    workspaces go to a temporary directory (on tmpfs if requested) that is removed on return.
+    """
+    max_threads = threads_per_job or None  # 0: VMEC's default (all cores)
+    results: Dict[str, Tuple[Optional[Any], Optional[str]]] = {}
+    pending: Dict[str, List[str]] = {}
+    jobs: List[Tuple[str, Path]] = []
+    if not baseline_input.exists():
+        raise FileNotFoundError(f"Baseline file does not exist: {baseline_input}")
+    # VMEC only reads the input and, for free-boundary runs, the mgrid file it names
+    workspaces = WorkspaceManager(baseline_input.parent, root=scratch_dir, mutable=[baseline_input.name],
+                                  include=['mgrid*'], tmpfs=tmpfs, keep=scratch_dir is not None)
+    live_workspaces = []  # a workspace is removed once garbage-collected, keep them until VMEC has run
+    for tag, coeffs in candidates.items():
+        try:
+            workspace = workspaces.create(tag)
+            live_workspaces.append(workspace)
+            local_input = substitute_coefficients(workspace.path / baseline_input.name, coeffs)
+        except Exception as e:
+            results[tag] = (None, f"input: {type(e).__name__}: {e}")
+            continue
+        key = hashlib.sha256(local_input.read_bytes()).hexdigest()
+        if key in pending:
+            pending[key].append(tag)
+            continue
+        cached = load_cached_output(cache_dir, key)
+        if cached is not None:
+            logger.info(f"{tag}: cached equilibrium {key[:12]}")
+            results[tag] = (cached, None)
+            continue
+        pending[key] = [tag]
+        jobs.append((key, local_input))
+
+    def record(key: str, vmec_output: Optional[Any], error: Optional[str]) -> None:
+        if vmec_output is not None:
+            store_cached_output(cache_dir, key, vmec_output)
+        for tag in pending[key]:
+            results[tag] = (vmec_output, error)
+            logger.info(f"{tag}: {'ok' if error is None else 'failed (' + error + ')'} [{len(results)}/{len(candidates)}]")
+
+    logger.info(f"Running VMEC for {len(jobs)} inputs ({len(candidates) - len(jobs)} cached or duplicate) on {n_jobs} workers")
+    if n_jobs <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            record(*_run_vmec_job(job, max_threads))
+    elif jobs:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(jobs))) as pool:
+            futures = {pool.submit(_run_vmec_job, job, max_threads): job[0] for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    record(*future.result())
+                except Exception as e:  # e.g. a worker killed by the OOM killer
+                    record(futures[future], None, f"worker: {type(e).__name__}: {e}")
+    workspaces.cleanup()
+    return results
+
+
 def plot_plasma_geometry(
     vmec_output: Any,
     out_png: Path,
@@ -521,6 +608,15 @@ def main():
                        help='compare against the baseline design')
     parser.add_argument('--skip_failed', action='store_true', default=True,
                        help='skip candidates whose VMEC run fails (default)')
+    parser.add_argument('--n_jobs', type=int, default=os.cpu_count(),
+                       help='parallel VMEC processes')
+    parser.add_argument('--vmec_threads', type=int, default=1,
+                       help='OpenMP threads per VMEC process (0: VMEC default)')
+    parser.add_argument('--cache_dir', default=None,
+                       help='equilibrium cache directory (default: <outdir>/vmec_cache)')
+    parser.add_argument('--no_cache', action='store_true', help='disable the equilibrium cache')
+    parser.add_argument('--tmpfs', action='store_true',
+                       help='build candidate workspaces on tmpfs and remove them at exit instead of <outdir>/vmec_tmp')
     args = parser.parse_args()
 
     pkl_path = Path(args.pkl)
@@ -542,22 +638,24 @@ def main():
     # 获取最优解
     best = pick_best_by_metrics(items, require_feasible=not args.allow_infeasible, topk=args.topk)
     
-    # 总是运行baseline用于对比（这样更容易看出优化效果）
-    logger.info("Running baseline design for comparison...")
-    tmp_baseline = outdir / "baseline_tmp"
-    tmp_baseline.mkdir(parents=True, exist_ok=True)
-    baseline_coeffs = get_baseline_coeffs(baseline_input)
-    baseline_output = run_vmec_safe(baseline_input, baseline_coeffs, tmp_baseline)
+    # 总是运行baseline用于对比（这样更容易看出优化效果）; baseline 与候选一起并行评估
+    candidates = {'baseline': get_baseline_coeffs(baseline_input)}
+    for metric, entries in best.items():
+        for rank, (item, metrics, coeffs) in enumerate(entries, start=1):
+            candidates[f'{metric}_top{rank}'] = coeffs
+    cache_dir = None if args.no_cache else Path(args.cache_dir or outdir / 'vmec_cache')
+    scratch_dir = None if args.tmpfs else outdir / "vmec_tmp"
+    results = evaluate_candidates(baseline_input, candidates, scratch_dir, cache_dir=cache_dir,
+                                  n_jobs=args.n_jobs, threads_per_job=args.vmec_threads, tmpfs=args.tmpfs)
+
+    baseline_output, baseline_error = results['baseline']
     if baseline_output is None:
-        logger.warning("Baseline run failed; skipping comparison")
-        baseline_output = None
+        logger.warning(f"Baseline run failed ({baseline_error}); skipping comparison")
     else:
         logger.info("Baseline run succeeded; will be used for comparison")
 
     # 汇总表
     summary_rows = []
-    tmp_base = outdir / "vmec_tmp"
-    tmp_base.mkdir(parents=True, exist_ok=True)
 
     # 绘制最优解
     for metric, entries in best.items():
@@ -566,14 +664,17 @@ def main():
             out_png = outdir / f'{tag}.png'
             
             logger.info(f"Processing {tag}...")
-            vmec_output = run_vmec_safe(baseline_input, coeffs, tmp_base / tag)
+            vmec_output, error = results[tag]
             
             if vmec_output is None:
                 if args.skip_failed:
-                    logger.warning(f"Skipping {tag} (VMEC run failed)")
+                    logger.warning(f"Skipping {tag} (VMEC run failed: {error})")
+                    row = {'metric': metric, 'kind': 'best', 'rank': rank, 'png': None, 'status': 'failed', 'error': error}
+                    row.update({k: metrics.get(k) for k in ['volume', 'aspect_ratio', 'magnetic_shear', 'is_feasible', 'total']})
+                    summary_rows.append(row)
                     continue
                 else:
-                    raise RuntimeError(f"{tag} VMEC run failed")
+                    raise RuntimeError(f"{tag} VMEC run failed: {error}")
             
             # 绘制（总是与baseline对比以突出优化效果）
             success = plot_plasma_geometry(
@@ -592,6 +693,8 @@ def main():
                     'kind': 'best',
                     'rank': rank,
                     'png': str(out_png),
+                    'status': 'ok',
+                    'error': None,
                 }
                 row.update({k: metrics.get(k) for k in ['volume', 'aspect_ratio', 'magnetic_shear', 'is_feasible', 'total']})
                 summary_rows.append(row)
@@ -605,7 +708,7 @@ def main():
         logger.info(f"Summary saved: {csv_path}")
 
     logger.info(f'Done! Output directory: {outdir.resolve()}')
-    logger.info(f'Generated {len(summary_rows)} figures')
+    logger.info(f"Generated {sum(row['status'] == 'ok' for row in summary_rows)} figures")
 
 
 if __name__ == '__main__':
@@ -7,250 +7,399 @@
 为后续的进化算法提供一个强大的、多样化的起点，从而最大化初始种群的多样性。
 
 工作流程：
-1. 基于一个基准SACS模型，通过随机扰动生成大量候选设计。
-2. 对每个候选设计运行完整的SACS分析，并提取性能指标（重量、UC、疲劳）。
-3. 收集所有成功完成分析的候选方案及其结果。
-4. 从成功方案中，根据以下标准挑选出精英种子：
+1. 在可优化构件的截面参数空间上生成空间填充设计（Sobol 或拉丁超立方），
+   每个设计点确定性地映射为一个候选方案（相同的 --seed 总是得到相同的候选序列）。
+2. 多个工作进程并行运行SACS分析，每个进程使用独立的项目副本（工作区），
+   互不干扰；每完成一个候选方案，结果立即追加写入 evaluations.jsonl。
+   脚本中断后重新运行会跳过日志中已有的候选方案，从断点继续。
+3. 从日志中的成功方案挑选精英种子：
    - 重量最低和最高的方案
    - UC值最低和最高的方案（在合理范围内）
-   - 疲劳寿命最长和最短的方案
+   - 轴向/弯曲UC最低的方案
    - 原始的基准方案（作为平衡点）
-5. 将挑选出的精英种子保存为独立的JSON文件，以便主优化算法加载。
+   使用 --select_only 可随时基于已有日志重新挑选，无需运行SACS。
+4. 将挑选出的精英种子保存为独立的JSON文件，以便主优化算法加载。
+
+示例：
+    python pre_evaluation_and_seed_selection.py --problem sacs_section_jk --num_candidates 256 --n_jobs 4
+    python pre_evaluation_and_seed_selection.py --problem sacs_section_jk --select_only
 """
 
 import os
+import re
 import json
+import time
+import shutil
 import logging
-import random
-import copy
+import argparse
+import importlib
+import multiprocessing.util
 import numpy as np
+import yaml
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scipy.stats import qmc
 
-# --- 导入您项目中的SACS工具模块 ---
-# 假设此脚本与您的 'problem' 目录在同一级别或已配置好PYTHONPATH
-try:
-    from problem.sacs.sacs_file_modifier import SacsFileModifier
-    from problem.sacs.sacs_runner import SacsRunner
-    from problem.sacs.sacs_interface_uc import get_sacs_uc_summary
-    from problem.sacs.sacs_interface_weight import calculate_sacs_volume
-    from problem.sacs.sacs_interface_ftg import get_sacs_fatigue_summary
-    from problem.sacs.evaluator import BASELINE_CODE_BLOCKS, _parse_and_modify_line
-except ImportError as e:
-    print(f"错误：无法导入项目模块。请确保此脚本的运行位置正确，或已将项目路径添加到PYTHONPATH。错误信息: {e}")
-    exit(1)
+from workspace_manager import WorkspaceManager
 
 
 # --- 脚本配置 ---
 CONFIG = {
-    "PROJECT_PATH": "/mnt/d/wsl_sacs_exchange/demo06_project/Demo06",
-    "SACS_INSTALL_PATH": "C:\\Program Files (x86)\\Bentley\\Engineering\\SACS CONNECT Edition V16 Update 1",
-    "NUM_CANDIDATES_TO_GENERATE": 100,  # 要尝试生成的候选方案总数
+    "NUM_CANDIDATES_TO_GENERATE": 128,        # 设计点总数（Sobol 时取不小于它的 2 的幂）
     "NUM_EXTREME_BEST_SEEDS_TO_PICK": 2,      # 每个极端维度挑选前N个“最好”的
-    "NUM_EXTREME_WORST_SEEDS_TO_PICK": 1,     # [新增] 每个极端维度挑选后N个“最差”的
-    "MAX_ACCEPTABLE_UC": 2.0,                 # [修改] 放宽UC值的接受上限，以捕获更多样性的解
-    "OUTPUT_DIR": "./elite_seeds",      # 保存精英种子的目录
-    "OPTIMIZABLE_BLOCKS": [             # 从config.yaml复制过来的可优化构件列表
-        "GRUP LG1", "GRUP LG2", "GRUP LG3", "GRUP LG4", "GRUP T01", 
-        "GRUP T02", "GRUP T03", "PGRUP P01"
-    ]
+    "NUM_EXTREME_WORST_SEEDS_TO_PICK": 1,     # 每个极端维度挑选后N个“最差”的
+    "MAX_ACCEPTABLE_UC": 2.0,                 # 放宽UC值的接受上限，以捕获更多样性的解
+    "SCALE_SPAN": 0.2,                        # 管径/壁厚/板厚相对基准值的最大缩放幅度 (±20%)
+    "SECTION_STEPS": 3,                       # 型钢截面在截面库中相对基准的最大移动档数
+    "SACS_TIMEOUT": 300,
+    "OUTPUT_DIR": "./elite_seeds",            # 保存精英种子和评估日志的目录
 }
 
 # --- 设置日志 ---
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(), logging.FileHandler("seed_finder.log", mode='w')] # 'w' to overwrite log each run
+    handlers=[logging.StreamHandler(), logging.FileHandler("seed_finder.log", mode='a')]
 )
 logger = logging.getLogger("SeedFinder")
 
 
-def generate_random_candidate(base_candidate, optimizable_blocks):
-    """通过随机扰动基准方案来生成一个新的候选方案。"""
-    new_candidate = copy.deepcopy(base_candidate)
-    
-    # 随机决定修改多少个构件，增加多样性 (1到3个)
-    num_modifications = random.randint(1, 4)
-    blocks_to_modify = random.sample(optimizable_blocks, min(num_modifications, len(optimizable_blocks)))
-    
-    for block_name in blocks_to_modify:
+def load_problem(problem_name):
+    """读取 problem/<name>/config.yaml 并导入对应的评估模块。"""
+    with open(os.path.join('problem', problem_name, 'config.yaml'), 'r') as f:
+        problem_config = yaml.safe_load(f)
+    evaluator = importlib.import_module(f'problem.{problem_name}.evaluator')
+    return problem_config, evaluator
+
+
+# ---------------------------------------------------------------------------
+# 空间填充设计
+# ---------------------------------------------------------------------------
+
+def design_dimensions(baseline_blocks, optimizable_blocks, section_library):
+    """
+    每个可优化构件对应的设计维度：
+      - 管状 GRUP: 管径、壁厚两个维度
+      - 型钢 GRUP: 截面库中的档位，一个维度
+      - PGRUP: 板厚，一个维度
+    """
+    dims = []
+    for block_name in optimizable_blocks:
         block_key = block_name.replace(" ", "_")
-        if block_key in new_candidate["new_code_blocks"]:
-            original_line = new_candidate["new_code_blocks"][block_key]
-            # 增加随机扰动的幅度，以产生更 극단적인 결과
-            modified_line = _parse_and_modify_line(original_line, block_name, allow_large_changes=True) # 假设_parse_and_modify_line可以接受这个参数
-            new_candidate["new_code_blocks"][block_key] = modified_line
-            logger.debug(f"Generated modification for {block_key}")
-            
-    return new_candidate
-
-def evaluate_candidate(modifier, runner, project_path):
-    """运行SACS并提取单个候选方案的指标，返回结果字典或None"""
-    analysis_result = runner.run_analysis(timeout=300)
-    if not analysis_result.get('success'):
-        logger.warning(f"SACS分析失败。原因: {analysis_result.get('error', '未知')[:200]}")
-        return None
+        line = baseline_blocks.get(block_key)
+        if line is None:
+            logger.warning(f"基准方案中没有构件 {block_key}，跳过。")
+            continue
+        keyword = block_name.split()[0]
+        if keyword == "GRUP" and 'CONE' in line:
+            continue
+        match = re.search(r'(W\d+X\d+)', line)
+        if keyword == "GRUP" and match:
+            if section_library and match.group(1) in section_library:
+                dims.append((block_key, 'section'))
+        elif keyword == "GRUP":
+            dims.append((block_key, 'od'))
+            dims.append((block_key, 'wt'))
+        elif keyword == "PGRUP":
+            dims.append((block_key, 'thick'))
+    return dims
+
+
+def sample_design(n_dims, n_points, method, seed):
+    if method == 'sobol':
+        m = int(np.ceil(np.log2(max(n_points, 2))))
+        return qmc.Sobol(n_dims, scramble=True, seed=seed).random_base2(m)
+    return qmc.LatinHypercube(n_dims, seed=seed).random(n_points)
+
+
+def apply_design_point(baseline_blocks, dims, point, section_library):
+    """把 [0,1]^d 中的一个点映射为一个完整的候选方案（格式与 _parse_and_modify_line 相同）。"""
+    span = CONFIG["SCALE_SPAN"]
+    blocks = dict(baseline_blocks)
+    values = {}
+    for (block_key, kind), u in zip(dims, point):
+        values.setdefault(block_key, {})[kind] = float(u)
+
+    for block_key, v in values.items():
+        line = blocks[block_key]
+        if 'section' in v:
+            current = re.search(r'(W\d+X\d+)', line).group(1)
+            i = section_library.index(current)
+            lo = max(0, i - CONFIG["SECTION_STEPS"])
+            hi = min(len(section_library) - 1, i + CONFIG["SECTION_STEPS"])
+            new_index = min(hi, lo + int(v['section'] * (hi - lo + 1)))
+            blocks[block_key] = line.rstrip().replace(current, section_library[new_index], 1)
+        elif 'thick' in v:
+            thick_match = re.search(r"(\d+\.\d+)", line[10:])
+            if not thick_match:
+                continue
+            thick_str = thick_match.group(1)
+            thick_val = np.clip(float(thick_str) * (1 - span + 2 * span * v['thick']), 0.250, 2.000)
+            num_decimals = len(thick_str.split('.')[1])
+            blocks[block_key] = line.replace(thick_str, f"{thick_val:.{num_decimals}f}", 1).rstrip()
+        else:
+            try:
+                od_val, wt_val = float(line[18:24]), float(line[25:30])
+            except (ValueError, IndexError):
+                continue
+            od_val = np.clip(od_val * (1 - span + 2 * span * v['od']), 10.0, 99.999)
+            wt_val = np.clip(wt_val * (1 - span + 2 * span * v['wt']), 0.5, 9.999)
+            blocks[block_key] = (line[:18] + f"{od_val:6.3f}" + " " + f"{wt_val:5.3f}" + line[30:]).rstrip()
+
+    return {"new_code_blocks": blocks}
+
+
+# ---------------------------------------------------------------------------
+# 并行评估（每个工作进程一个独立工作区）
+# ---------------------------------------------------------------------------
+
+# 工作区中只有 SACS 输入会被就地改写，需要私有副本；其余文件硬链接到每个工作进程的项目暂存副本，
+# 从不与主项目目录共享 inode。
+# 求解器输出（与 SacsRunner 运行前清理的模式一致）和备份目录不进入工作区。
+WORKSPACE_MUTABLE = ('sacinp.*', '*.runx')
+WORKSPACE_IGNORE = ('backups', '*.db', '*.lst', '*.out', '*.log', '*.err', '*.tmp', '*.ftg*')
 
+_worker = {}
+
+
+def _init_worker(problem_name, project_path, install_path, workspace_root, run_id):
+    """为本进程建立工作区（硬链接项目暂存副本，只复制会被改写的输入文件），并在其上创建 modifier/runner。"""
+    modules = {name: importlib.import_module(f'problem.{problem_name}.{name}')
+               for name in ['sacs_file_modifier', 'sacs_runner', 'sacs_interface_uc',
+                            'sacs_interface_weight_improved']}
+    # 暂存副本和工作区都放在本进程的目录下，进程被强制终止时主进程按 run_id 一并清理
+    manager = WorkspaceManager(project_path, root=Path(workspace_root) / f"{run_id}_worker_{os.getpid()}",
+                               mutable=WORKSPACE_MUTABLE, ignore=WORKSPACE_IGNORE)
+    workspace = manager.create("project")
+    # 工作进程退出时（multiprocessing 的退出钩子，atexit 在 fork 出的进程中不会运行）删除本进程的工作区
+    multiprocessing.util.Finalize(workspace, workspace.release, exitpriority=10)
+    multiprocessing.util.Finalize(manager, manager.cleanup, exitpriority=5)
+    _worker['manager'] = manager
+    _worker['workspace'] = workspace
+    _worker['modules'] = modules
+    _worker['modifier'] = modules['sacs_file_modifier'].SacsFileModifier(str(workspace.path))
+    _worker['runner'] = modules['sacs_runner'].SacsRunner(str(workspace.path), install_path)
+
+
+def evaluate_candidate(candidate_id, design):
+    """在本进程的工作区中运行SACS并提取指标，返回一条日志记录。"""
+    modifier, runner, modules = _worker['modifier'], _worker['runner'], _worker['modules']
+    workspace = str(_worker['workspace'].path)
+    record = {'id': candidate_id, 'design': design, 'metrics': None, 'status': 'failed', 'error': None}
+    start = time.time()
     try:
-        weight_res = calculate_sacs_volume(str(project_path))
-        uc_res = get_sacs_uc_summary(str(project_path))
-        ftg_res = get_sacs_fatigue_summary(str(project_path))
-        
-        # 兼容新的UC提取器状态 'success_no_data'
-        is_uc_valid = uc_res.get('status') in ['success', 'success_no_data']
-        if not (weight_res.get('status') == 'success' and is_uc_valid and ftg_res.get('status') == 'success'):
-            logger.warning(f"指标提取不完整，跳过。 Weight: {weight_res.get('status')}, UC: {uc_res.get('status')}, FTG: {ftg_res.get('status')}")
-            return None
-
-        return {
-            'weight': weight_res['total_volume_m3'],
-            'uc': uc_res.get('max_uc', 999.0),  # 如果无数据，给一个极大的惩罚值
-            'fatigue': ftg_res.get('min_life_years', 0.0) # 如果无数据，给一个极小值
+        _worker['workspace'].reset()
+        if not modifier.replace_code_blocks(design["new_code_blocks"]):
+            record['error'] = 'file_modification_failed'
+            return record
+
+        analysis_result = runner.run_analysis(timeout=CONFIG["SACS_TIMEOUT"])
+        if not analysis_result.get('success'):
+            record['error'] = f"sacs_run_failed: {str(analysis_result.get('error', '未知'))[:200]}"
+            return record
+
+        weight_res = modules['sacs_interface_weight_improved'].calculate_sacs_weight_from_db(workspace)
+        uc_res = modules['sacs_interface_uc'].get_sacs_uc_summary(workspace)
+        if not (weight_res.get('status') == 'success' and uc_res.get('status') == 'success'):
+            record['error'] = f"metric_extraction_failed: W:{weight_res.get('error', 'OK')}|UC:{uc_res.get('message', 'OK')}"
+            return record
+
+        record['metrics'] = {
+            'weight': weight_res['total_weight_tonnes'],
+            'uc': uc_res.get('max_uc', 999.0),
+            'axial_uc_max': uc_res.get('axial_uc_max', 999.0),
+            'bending_uc_max': uc_res.get('bending_uc_max', 999.0),
         }
+        record['status'] = 'success'
+        return record
     except Exception as e:
-        logger.error(f"在指标提取过程中发生异常: {e}", exc_info=True)
-        return None
+        record['error'] = f"{type(e).__name__}: {e}"
+        return record
+    finally:
+        record['elapsed'] = time.time() - start
+        try:
+            _worker['workspace'].reset()
+        except Exception:
+            pass
 
-def main():
-    """主执行函数"""
-    logger.info("=" * 50)
-    logger.info("精英种子查找脚本已启动 (包含最好和最差样本策略)")
-    logger.info("=" * 50)
 
-    # --- 初始化工具 ---
-    project_path = Path(CONFIG["PROJECT_PATH"])
-    if not project_path.exists():
-        logger.critical(f"项目路径不存在: {project_path}")
+def read_log(log_path):
+    """读取评估日志；同一 id 以最后一条记录为准，忽略中断时写了一半的行。"""
+    records = {}
+    if not log_path.exists():
+        return records
+    with open(log_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record['id']] = record
+    return records
+
+
+def run_evaluations(candidates, log_path, problem_name, project_path, install_path, n_jobs, workspace_root):
+    done = read_log(log_path)
+    todo = [(cid, design) for cid, design in candidates if cid not in done]
+    logger.info(f"日志中已有 {len(done)} 条记录，本次需要评估 {len(todo)} 个候选方案，并行度 {n_jobs}。")
+    if not todo:
         return
 
-    modifier = SacsFileModifier(str(project_path))
-    runner = SacsRunner(str(project_path), CONFIG["SACS_INSTALL_PATH"])
-    
-    successful_results = []
-    
-    # --- 1. 生成和评估循环 ---
-    logger.info(f"将生成和测试 {CONFIG['NUM_CANDIDATES_TO_GENERATE']} 个候选方案...")
-    for i in range(CONFIG['NUM_CANDIDATES_TO_GENERATE']):
-        logger.info(f"--- 处理候选方案 {i+1}/{CONFIG['NUM_CANDIDATES_TO_GENERATE']} ---")
-        
-        candidate_design = generate_random_candidate(BASELINE_CODE_BLOCKS, CONFIG["OPTIMIZABLE_BLOCKS"])
-        
-        if not modifier.replace_code_blocks(candidate_design["new_code_blocks"]):
-            logger.error(f"候选方案 {i+1}: 文件修改失败，跳过。")
-            continue
+    workspace_root = Path(workspace_root)
+    created_root = not workspace_root.exists()
+    workspace_root.mkdir(parents=True, exist_ok=True)
+    run_id = f"run_{os.getpid()}_{int(time.time())}"
+    start = time.time()
+    n_success = 0
+    try:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(todo)), initializer=_init_worker,
+                                 initargs=(problem_name, str(project_path), install_path, str(workspace_root), run_id)) as pool, \
+                open(log_path, 'a') as log_file:
+            futures = [pool.submit(evaluate_candidate, cid, design) for cid, design in todo]
+            for k, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                log_file.write(json.dumps(record) + '\n')
+                log_file.flush()
+                if record['status'] == 'success':
+                    n_success += 1
+                    m = record['metrics']
+                    logger.info(f"[{k}/{len(todo)}] 候选方案 {record['id']}: 成功！ Weight={m['weight']:.2f}, UC={m['uc']:.3f} ({record['elapsed']:.0f}s)")
+                else:
+                    logger.warning(f"[{k}/{len(todo)}] 候选方案 {record['id']}: 失败 ({record['error']})")
+    finally:
+        # 只清理本次运行的工作区（被强制终止的工作进程可能留下目录）；根目录只在本脚本创建时删除
+        for leftover in workspace_root.glob(f"{run_id}_worker_*"):
+            shutil.rmtree(leftover, ignore_errors=True)
+        if created_root:
+            shutil.rmtree(workspace_root, ignore_errors=True)
 
-        metrics = evaluate_candidate(modifier, runner, project_path)
-        if metrics is None:
-            continue
+    elapsed = time.time() - start
+    logger.info(f"本次评估完成: 成功 {n_success}/{len(todo)}，耗时 {elapsed / 3600:.2f} 小时。")
 
-        # 只有当UC在合理范围内时才认为是成功的方案
-        if metrics['uc'] > CONFIG["MAX_ACCEPTABLE_UC"]:
-             logger.warning(f"候选方案 {i+1}: 成功运行但UC值过高 ({metrics['uc']:.2f} > {CONFIG['MAX_ACCEPTABLE_UC']})，视为无效。")
-             continue
-
-        logger.info(f"候选方案 {i+1}: 成功！ Weight={metrics['weight']:.2f}, UC={metrics['uc']:.3f}, Fatigue={metrics['fatigue']:.1f}")
-        successful_results.append({
-            'id': i + 1,
-            'design': candidate_design,
-            'metrics': metrics
-        })
-    
-    logger.info("-" * 50)
-    logger.info(f"评估完成。总尝试次数: {CONFIG['NUM_CANDIDATES_TO_GENERATE']}, 成功方案数: {len(successful_results)}")
-    logger.info("-" * 50)
-
-    if not successful_results:
-        logger.critical("没有一个候选方案成功完成评估，无法挑选种子。请检查SACS配置或模型。")
-        return
 
-    # --- 2. 筛选精英种子 (重构逻辑) ---
-    logger.info("开始筛选精英种子 (最好和最差)...")
-    
-    selected_seeds = {} # 使用字典防止重复添加同一个方案
+# ---------------------------------------------------------------------------
+# 精英种子挑选
+# ---------------------------------------------------------------------------
+
+def select_seeds(records):
+    """从日志记录中挑选最好/最差/基准种子，返回 {reason: record}。"""
+    successful_results = [r for r in records.values()
+                          if r['status'] == 'success' and r['metrics']['uc'] <= CONFIG["MAX_ACCEPTABLE_UC"]]
+    logger.info(f"日志中共 {len(records)} 条记录，UC不超过 {CONFIG['MAX_ACCEPTABLE_UC']} 的成功方案 {len(successful_results)} 个。")
+
+    selected_seeds = {}  # 使用字典防止重复添加同一个方案
 
     def add_seed(seed, reason):
         """辅助函数，用于向selected_seeds字典添加种子，避免重复。"""
-        # 使用设计方案的JSON字符串作为唯一键
         seed_key = json.dumps(seed['design'], sort_keys=True)
         if seed_key not in selected_seeds:
             selected_seeds[seed_key] = {'reason': reason, **seed}
             return True
         return False
-    
-    # 按不同维度排序
-    sorted_by_weight = sorted(successful_results, key=lambda x: x['metrics']['weight'])
-    sorted_by_uc = sorted(successful_results, key=lambda x: x['metrics']['uc'])
-    sorted_by_fatigue = sorted(successful_results, key=lambda x: x['metrics']['fatigue'], reverse=True) # 寿命越长越好
 
-    # 挑选极致种子
+    # 添加基准方案作为平衡点
+    if 'baseline' in records and records['baseline']['status'] == 'success':
+        add_seed(records['baseline'], 'baseline_balanced')
+
     num_best = CONFIG['NUM_EXTREME_BEST_SEEDS_TO_PICK']
     num_worst = CONFIG['NUM_EXTREME_WORST_SEEDS_TO_PICK']
     num_total = len(successful_results)
+    orderings = {
+        'weight': sorted(successful_results, key=lambda x: x['metrics']['weight']),
+        'uc': sorted(successful_results, key=lambda x: x['metrics']['uc']),
+        'axial_uc': sorted(successful_results, key=lambda x: x['metrics']['axial_uc_max']),
+        'bending_uc': sorted(successful_results, key=lambda x: x['metrics']['bending_uc_max']),
+    }
 
     for i in range(min(num_best, num_total)):
-        add_seed(sorted_by_weight[i], f'min_weight_{i+1}')
-        add_seed(sorted_by_uc[i], f'min_uc_{i+1}')
-        add_seed(sorted_by_fatigue[i], f'max_fatigue_{i+1}')
+        for name, ordered in orderings.items():
+            add_seed(ordered[i], f'min_{name}_{i+1}')
 
     for i in range(min(num_worst, num_total)):
-        add_seed(sorted_by_weight[-(i+1)], f'max_weight_{i+1}')
-        add_seed(sorted_by_uc[-(i+1)], f'max_uc_{i+1}')
-        add_seed(sorted_by_fatigue[-(i+1)], f'min_fatigue_{i+1}')
-        
-    # 添加基准方案作为平衡点
-    logger.info("评估基准方案...")
-    modifier.replace_code_blocks(BASELINE_CODE_BLOCKS["new_code_blocks"])
-    baseline_metrics = evaluate_candidate(modifier, runner, project_path)
-    if baseline_metrics:
-        baseline_seed = {
-            'id': 'baseline', 
-            'design': BASELINE_CODE_BLOCKS, 
-            'metrics': baseline_metrics
-        }
-        add_seed(baseline_seed, 'baseline_balanced')
+        add_seed(orderings['weight'][-(i+1)], f'max_weight_{i+1}')
+        add_seed(orderings['uc'][-(i+1)], f'max_uc_{i+1}')
+
+    return sorted(selected_seeds.values(), key=lambda x: x['reason'])
 
-    # --- 3. 输出结果 ---
-    output_dir = Path(CONFIG["OUTPUT_DIR"])
-    output_dir.mkdir(exist_ok=True)
+
+def write_seeds(selected_seeds, output_dir):
     # 清空旧的种子文件
-    for f in output_dir.glob('*.json'):
+    for f in output_dir.glob('seed_*.json'):
         f.unlink()
-    
+
     logger.info("=" * 50)
     logger.info(f"最终挑选出 {len(selected_seeds)} 个精英种子方案:")
-    
-    # 为了让文件名更清晰，按挑选原因排序
-    sorted_final_seeds = sorted(selected_seeds.values(), key=lambda x: x['reason'])
-
-    for seed_data in sorted_final_seeds:
-        reason = seed_data['reason']
+    for seed_data in selected_seeds:
         metrics = seed_data['metrics']
-        
-        filename = f"seed_{reason}.json"
-        filepath = output_dir / filename
-        
-        with open(filepath, 'w') as f:
+        filename = f"seed_{seed_data['reason']}.json"
+        with open(output_dir / filename, 'w') as f:
             json.dump(seed_data['design'], f, indent=4)
-        
         logger.info(
             f"  -> 已保存 '{filename}' (ID: {seed_data['id']}) | "
-            f"Weight={metrics['weight']:.2f}, UC={metrics['uc']:.3f}, Fatigue={metrics['fatigue']:.1f}"
+            f"Weight={metrics['weight']:.2f}, UC={metrics['uc']:.3f}"
         )
-        
     logger.info("=" * 50)
     logger.info(f"所有精英种子已保存至 '{output_dir.resolve()}' 目录。")
-    logger.info("您可以将这些JSON文件作为主优化算法的初始种群。")
 
 
-if __name__ == "__main__":
-    # 假设 _parse_and_modify_line 函数需要一个默认的 allow_large_changes 参数
-    # 我们在这里用一个 patch 来模拟，或者您需要在原模块中添加它
-    original_parse_func = _parse_and_modify_line
-    def patched_parse_func(line, block_name, allow_large_changes=False):
-        # 这里只是一个示例，您可能需要更复杂地修改原函数
-        # 简单地忽略这个新参数，使用原函数的功能
-        return original_parse_func(line, block_name)
-    
-    # 全局替换
-    globals()['_parse_and_modify_line'] = patched_parse_func
+def main():
+    """主执行函数"""
+    parser = argparse.ArgumentParser(description="并行、可续跑的精英种子查找")
+    parser.add_argument('--problem', default='sacs_section_jk', help="problem/ 下的问题目录名")
+    parser.add_argument('--num_candidates', type=int, default=CONFIG["NUM_CANDIDATES_TO_GENERATE"])
+    parser.add_argument('--design', choices=['sobol', 'lhs'], default='sobol')
+    parser.add_argument('--seed', type=int, default=0, help="设计的随机种子，续跑时必须保持不变")
+    parser.add_argument('--n_jobs', type=int, default=4, help="并行SACS进程数")
+    parser.add_argument('--workspace_root', default=None,
+                        help="工作区根目录（需对Windows可见），默认放在项目目录旁边")
+    parser.add_argument('--output_dir', default=None, help="默认 problem/<name>/elite_seeds")
+    parser.add_argument('--select_only', action='store_true', help="只根据已有日志重新挑选种子")
+    args = parser.parse_args()
+
+    logger.info("=" * 50)
+    logger.info("精英种子查找脚本已启动 (空间填充设计 + 并行评估 + 可续跑日志)")
+    logger.info("=" * 50)
+
+    problem_config, evaluator = load_problem(args.problem)
+    output_dir = Path(args.output_dir or os.path.join('problem', args.problem, 'elite_seeds'))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    log_path = output_dir / 'evaluations.jsonl'
+
+    if not args.select_only:
+        project_path = Path(problem_config['sacs']['project_path'])
+        if not project_path.exists():
+            logger.critical(f"项目路径不存在: {project_path}")
+            return
+
+        baseline = evaluator.SEED_BASELINE
+        section_library = getattr(evaluator, 'W_SECTIONS_LIBRARY', [])
+        dims = design_dimensions(baseline["new_code_blocks"], problem_config['sacs']['optimizable_blocks'],
+                                 section_library)
+        if not dims:
+            logger.critical("没有可用的设计维度，请检查 optimizable_blocks 配置。")
+            return
+        points = sample_design(len(dims), args.num_candidates, args.design, args.seed)
+        logger.info(f"{args.design} 设计: {len(dims)} 维, {len(points)} 个候选方案。")
+
+        candidates = [('baseline', baseline)]
+        candidates += [(f'{args.design}_{args.seed}_{i}', apply_design_point(baseline["new_code_blocks"], dims, p,
+                                                                            section_library))
+                       for i, p in enumerate(points)]
 
+        workspace_root = args.workspace_root or str(project_path.parent / f"{project_path.name}_seed_workers")
+        run_evaluations(candidates, log_path, args.problem, project_path, problem_config['sacs']['install_path'],
+                        args.n_jobs, workspace_root)
+
+    records = read_log(log_path)
+    if not records:
+        logger.critical(f"日志 {log_path} 中没有任何记录，无法挑选种子。")
+        return
+    selected_seeds = select_seeds(records)
+    if not selected_seeds:
+        logger.critical("没有一个候选方案成功完成评估，无法挑选种子。请检查SACS配置或模型。")
+        return
+    write_seeds(selected_seeds, output_dir)
+
+
+if __name__ == "__main__":
     main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+脚本化的假 SACS 求解器，用于在没有 SACS/WSL 的机器上测试 SacsRunner 和进程监督器。
+
+SacsRunner 以 engine_command=[sys.executable, 'problem/fake_sacs_engine.py'] 调用时，
+参数与真实引擎相同 (runx 路径, 安装路径)，工作目录为项目目录。
+行为由环境变量 FAKE_SACS_SCENARIO 决定:
+  ok        逐步输出进度，写列表文件和 sacsdb.db，返回 0
+  fatal     输出若干进度后在列表文件中写入致命错误，然后挂起（应被提前终止）
+  diverge   在 stdout 输出不收敛信息，然后挂起
+  hang      输出一行后不再有任何输出并挂起（应被判定为卡死）
+  crash     输出若干行后以返回码 3 退出
+FAKE_SACS_STEP_DELAY 控制每一步之间的间隔秒数（默认 0.2）。
+"""
+
+import os
+import sys
+import time
+import sqlite3
+
+scenario = os.environ.get('FAKE_SACS_SCENARIO', 'ok')
+delay = float(os.environ.get('FAKE_SACS_STEP_DELAY', '0.2'))
+listing = open('fake.lst', 'a', encoding='gbk')
+
+
+def step(msg, to_listing=False):
+    if to_listing:
+        listing.write(msg + '\n')
+        listing.flush()
+    else:
+        print(msg, flush=True)
+    time.sleep(delay)
+
+
+step(f'PROGRAM SEASTATE STARTED  runx={sys.argv[1] if len(sys.argv) > 1 else "-"}')
+if scenario == 'hang':
+    time.sleep(3600)
+step('PRE PROCESSING INPUT DATA', to_listing=True)
+step('SOLVING STIFFNESS MATRIX')
+
+if scenario == 'fatal':
+    step(' *** FATAL ERROR *** MEMBER 101-205 HAS ZERO LENGTH', to_listing=True)
+    time.sleep(3600)
+if scenario == 'diverge':
+    step(' SOLUTION DID NOT CONVERGE AFTER 50 ITERATIONS')
+    time.sleep(3600)
+if scenario == 'crash':
+    step('UNEXPECTED END OF FILE')
+    sys.exit(3)
+
+step('POST PROCESSING MEMBER RESULTS', to_listing=True)
+with sqlite3.connect('sacsdb.db') as conn:
+    conn.execute('CREATE TABLE IF NOT EXISTS R_POSTMEMBERRESULTS '
+                 '(MemberName TEXT, MemberGroup TEXT, MemberLength REAL, MaxUC REAL, AxialUC REAL, '
+                 'YYBendingUC REAL, ZZBendingUC REAL)')
+    conn.executemany('INSERT INTO R_POSTMEMBERRESULTS VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     [('101-205', 'LG1', 30.0, 0.62, 0.31, 0.20, 0.11),
+                      ('205-310', 'T01', 18.5, 0.48, 0.12, 0.25, 0.11)])
+step('ANALYSIS COMPLETE')
+listing.close()
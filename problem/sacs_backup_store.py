@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SACS 项目目录的备份存储，供各问题目录下的 SacsFileModifier / SacsRunner 共用。
+
+- 备份按内容寻址：backups/objects/<sha1>.<后缀>，内容相同的模型文件只存一份，
+  重复快照既不新建文件也不写盘。
+- 只保留最近的快照（环形缓冲）以及固定的主基线 sacinp_master_baseline.*，
+  超出的对象由后台线程删除，不占用评估路径。
+- 环形缓冲保存在 backups/ring.json 中（标签、时间、哈希、进程号），所有读写都在
+  backups/.lock 的 fcntl.flock 排他锁内完成，因此多个进程（并发实验、分进程的
+  修改器和运行器）共用同一个缓冲：每个仍在运行的进程各自保留最近 keep 个快照，
+  已退出进程的快照合计保留 keep 个。只有不被缓冲中任何条目引用的对象才会被删除，
+  一个进程不会删掉另一个进程还要用来恢复的备份。
+- 同一个备份目录在进程内共享一个存储实例（get_backup_store）。
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: 只有进程内的锁
+    fcntl = None
+
+DEFAULT_KEEP = 20
+
+
+def _pid_alive(pid) -> bool:
+    if not isinstance(pid, int) or os.name == 'nt':
+        return isinstance(pid, int)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SacsBackupStore:
+    def __init__(self, backup_dir: Path, keep: int = DEFAULT_KEEP):
+        self.backup_dir = Path(backup_dir)
+        self.objects_dir = self.backup_dir / "objects"
+        self.ring_file = self.backup_dir / "ring.json"
+        self.lock_file = self.backup_dir / ".lock"
+        self.keep = max(1, int(keep))
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    # ---------------- 共享环形缓冲 ----------------
+
+    @contextmanager
+    def _locked(self):
+        """进程内线程锁 + 跨进程的 flock 排他锁。"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_file, 'a') as lock:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _read_ring(self) -> List[dict]:
+        try:
+            with open(self.ring_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return [e for e in entries if (self.objects_dir / e['object']).exists()]
+
+    def _write_ring(self, ring: List[dict]) -> None:
+        tmp_path = self.ring_file.with_name(f"{self.ring_file.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(ring, f, indent=1)
+        os.replace(tmp_path, self.ring_file)
+
+    def _trim(self, ring: List[dict]) -> List[dict]:
+        """运行中的进程各保留最近 keep 个条目，已退出进程的条目合计保留 keep 个。"""
+        alive, counts, kept = {}, {}, []
+        for entry in reversed(ring):
+            pid = entry.get('pid')
+            if pid not in alive:
+                alive[pid] = _pid_alive(pid)
+            group = pid if alive[pid] else None
+            counts[group] = counts.get(group, 0) + 1
+            if counts[group] <= self.keep:
+                kept.append(entry)
+        return kept[::-1]
+
+    # ---------------- 快照 ----------------
+
+    def snapshot(self, source: Path, label: str = "") -> Path:
+        """保存 source 当前内容的快照，返回对象文件路径（内容已存在时直接复用）。"""
+        source = Path(source)
+        with open(source, 'rb') as f:
+            data = f.read()
+        object_path = self.objects_dir / f"{hashlib.sha1(data).hexdigest()}{source.suffix}"
+        with self._locked():
+            if not object_path.exists():
+                tmp_path = object_path.with_name(f"{object_path.name}.{os.getpid()}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, object_path)
+                created = True
+            else:
+                created = False
+            ring = self._read_ring()
+            ring.append({'object': object_path.name, 'label': label, 'pid': os.getpid(),
+                         'time': datetime.now().isoformat(timespec='seconds')})
+            self._write_ring(self._trim(ring))
+        self.logger.debug(f"{'Created' if created else 'Reused'} backup object {object_path.name} ({label})")
+        self._schedule_retention()
+        return object_path
+
+    def ensure_pinned(self, source: Path, name: str) -> Path:
+        """固定的主基线：不存在时从 source 复制一次，之后从不被回收。"""
+        pinned_path = self.backup_dir / name
+        if not pinned_path.exists():
+            with self._locked():
+                if not pinned_path.exists():
+                    tmp_path = pinned_path.with_name(f"{name}.{os.getpid()}.tmp")
+                    shutil.copy2(source, tmp_path)
+                    os.replace(tmp_path, pinned_path)
+                    self.logger.info(f"Created master baseline backup: {name}")
+        return pinned_path
+
+    # ---------------- 保留策略 ----------------
+
+    def _schedule_retention(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._retention_loop, name="SacsBackupRetention", daemon=True)
+            self._worker.start()
+        self._wakeup.set()
+
+    def _retention_loop(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                self.apply_retention()
+            except Exception as e:
+                self.logger.warning(f"备份保留策略执行失败: {e}")
+
+    def apply_retention(self) -> int:
+        """在锁内按共享的 ring.json 删除不再被任何进程引用的对象，返回删除的对象数。"""
+        removed = 0
+        with self._locked():
+            ring = self._trim(self._read_ring())
+            live = {e['object'] for e in ring}
+            for path in self.objects_dir.iterdir():
+                if path.name not in live and not path.name.endswith(".tmp"):
+                    try:
+                        path.unlink()
+                        removed += 1
+                    except OSError as e:
+                        self.logger.warning(f"删除备份对象失败 {path.name}: {e}")
+            self._write_ring(ring)
+        if removed:
+            self.logger.debug(f"备份保留策略删除了 {removed} 个旧对象")
+        return removed
+
+
+_stores: Dict[str, SacsBackupStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_backup_store(backup_dir: Path, keep: int = DEFAULT_KEEP) -> SacsBackupStore:
+    """同一备份目录在进程内共享一个存储实例；keep 取各调用方要求的最大值。"""
+    key = os.path.abspath(backup_dir)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SacsBackupStore(backup_dir, keep)
+        elif keep > store.keep:
+            store.keep = keep
+        return store
@@ -1,10 +1,11 @@
 import re
 import shutil
-from datetime import datetime
 from typing import Dict, List, Optional
 from pathlib import Path
 import logging
 
+from ..sacs_backup_store import get_backup_store, DEFAULT_KEEP
+
 
 class SacsFileModifier:
     """
@@ -12,7 +13,7 @@ class SacsFileModifier:
     evaluation starts from an identical geometry.
     """
 
-    def __init__(self, project_path: str):
+    def __init__(self, project_path: str, backup_keep: int = DEFAULT_KEEP):
         self.project_path = Path(project_path)
         self.input_file = self.project_path / "sacinp.demo06"
         self.backup_dir = self.project_path / "backups"
@@ -24,6 +25,7 @@ class SacsFileModifier:
         if not self.input_file.exists():
             raise FileNotFoundError(f"SACS input file not found: {self.input_file}")
 
+        self.backup_store = get_backup_store(self.backup_dir, backup_keep)
         self.master_backup_path = self._ensure_master_backup()
 
     def _ensure_master_backup(self) -> Optional[Path]:
@@ -33,18 +35,13 @@ class SacsFileModifier:
         """
         suffix = self.input_file.suffix
         baseline_name = f"sacinp_master_baseline{suffix}"
-        baseline_path = self.backup_dir / baseline_name
-        if not baseline_path.exists():
-            shutil.copy2(self.input_file, baseline_path)
-            self.logger.info(f"Created master baseline backup: {baseline_name}")
-        return baseline_path
+        return self.backup_store.ensure_pinned(self.input_file, baseline_name)
 
     def _create_backup(self) -> Optional[Path]:
         """Creates a backup of the current input file before in-place edits."""
         try:
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = self.backup_dir / f"sacinp_pre_eval_{ts}{self.input_file.suffix}"
-            shutil.copy2(self.input_file, backup_path)
+            # 内容寻址存储：与已有快照相同的内容不会重复写盘
+            backup_path = self.backup_store.snapshot(self.input_file, "pre_eval")
             self.logger.info(f"Created backup: {backup_path.name}")
             return backup_path
         except Exception as e:
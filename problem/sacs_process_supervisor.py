@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SACS 进程监督器，供各问题目录下的 SacsRunner 共用。
+
+以非阻塞 Popen 启动求解器，事件驱动地读取其 stdout，并增量读取项目目录中的
+列表/输出文件（*.lst, *.out, *.err, *.log）。一旦出现已知的致命错误模式就立即
+终止进程；长时间没有任何新输出（卡死）或超过总超时也会终止。正常退出后立即交还
+控制权，不再轮询等待。
+
+列表文件位于 /mnt/<drive> (drvfs) 上时 inotify 不可用，因此文件尾随在 select()
+的超时间隙中进行（默认每 0.5 秒一次），stdout 本身则是真正的事件驱动读取。
+"""
+
+import os
+import re
+import time
+import logging
+import selectors
+import subprocess
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Iterable
+
+# 已知的致命错误模式（大小写不敏感，匹配 stdout 或列表文件中的任意一行）
+DEFAULT_FATAL_PATTERNS = [
+    r'\*\*\*+\s*FATAL',
+    r'FATAL\s+ERROR',
+    r'ABNORMAL(LY)?\s+TERMINAT',
+    r'EXECUTION\s+TERMINATED\s+(ABNORMALLY|DUE\s+TO|WITH\s+ERRORS?|BY\s+ERROR)',
+    r'(SOLUTION|ANALYSIS)\s+(DID\s+NOT|FAILED\s+TO)\s+CONVERGE',
+    r'\bDIVERG(ED|ENCE|ING)\b',
+    r'\bSINGULAR(ITY)?\b.*\bMATRIX\b|\bMATRIX\b.*\bSINGULAR',
+    r'\bLICEN[CS]E\b.*\b(NOT\s+AVAILABLE|UNAVAILABLE|EXPIRED|DENIED)',
+    r'\*+\s*INPUT\s+(DATA\s+)?ERRORS?\b',
+    r'\b[1-9]\d*\s+INPUT\s+(DATA\s+)?ERRORS?\b',
+    r'INPUT\s+(DATA\s+)?ERRORS?\s*[:=]\s*[1-9]',
+]
+
+# 命中致命模式但属于正常信息的行（如 "NO INPUT ERRORS DETECTED"、"EXECUTION TERMINATED NORMALLY"）
+DEFAULT_BENIGN_PATTERNS = [
+    r'\bNO\s+(\w+\s+){0,2}ERRORS?\b',
+    r'\b0+\s+(\w+\s+){0,2}ERRORS?\b',
+    r'ERRORS?\s*[:=]\s*0+\b',
+    r'\bNORMALLY\b',
+    r'\bERROR\s+CHECK',
+]
+
+# 进度标记：命中的行会记录为里程碑，便于定位失败发生在哪个阶段
+DEFAULT_PROGRESS_PATTERNS = [
+    r'\bPROGRAM\b.*\b(STARTED|BEGIN|COMPLETED|ENDED)\b',
+    r'\b(PRE|POST)?\s*PROCESSING\b',
+    r'\bSOLV(E|ING|ER)\b',
+    r'\bANALYSIS\s+COMPLETE',
+    r'\bDATABASE\b',
+]
+
+DEFAULT_WATCH_GLOBS = ('*.lst', '*.out', '*.err', '*.log')
+
+
+class SacsProcessSupervisor:
+    """
+    监督单次求解器运行。run() 返回的字典中:
+      status:   'completed' | 'failed' | 'fatal' | 'timeout' | 'stalled' | 'start_failed'
+      success:  进程正常退出 (返回码 0) 且没有命中致命模式
+      reason / fatal_line / warnings / milestones / output_tail / returncode / elapsed
+      返回码为 0 的正常退出不会因致命模式被判失败，命中的行记入 warnings
+      stall_timeout 为 None (默认) 时不做无输出检测，只受 timeout 限制
+    """
+
+    def __init__(self, command: List[str], cwd: str, timeout: float = 300, stall_timeout: Optional[float] = None,
+                 fatal_patterns: Optional[Iterable[str]] = None, progress_patterns: Optional[Iterable[str]] = None,
+                 benign_patterns: Optional[Iterable[str]] = None,
+                 watch_globs: Iterable[str] = DEFAULT_WATCH_GLOBS, tail_interval: float = 0.5,
+                 encoding: str = 'gbk', logger: Optional[logging.Logger] = None):
+        self.command = [str(c) for c in command]
+        self.cwd = Path(cwd)
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        flags = re.IGNORECASE
+        self.fatal_patterns = [re.compile(p, flags) for p in (fatal_patterns or DEFAULT_FATAL_PATTERNS)]
+        self.progress_patterns = [re.compile(p, flags) for p in (progress_patterns or DEFAULT_PROGRESS_PATTERNS)]
+        self.benign_patterns = [re.compile(p, flags) for p in (benign_patterns or DEFAULT_BENIGN_PATTERNS)]
+        self.watch_globs = list(watch_globs)
+        self.tail_interval = tail_interval
+        self.encoding = encoding
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self._offsets: Dict[Path, int] = {}
+        self._partial: Dict[Any, bytes] = {}
+        self.milestones: List[str] = []
+        self.output_tail: List[str] = []
+        self.fatal_line: Optional[str] = None
+        self.warnings: List[str] = []
+        self.last_activity = 0.0
+
+    # ---------------- 行处理 ----------------
+
+    def _feed(self, source: Any, data: bytes, final: bool = False) -> None:
+        """把新读到的字节按行切分并检查；不完整的最后一行留到下一次。"""
+        buf = self._partial.get(source, b'') + data
+        lines = buf.split(b'\n')
+        self._partial[source] = b'' if final else lines.pop()
+        for raw in lines:
+            line = raw.decode(self.encoding, errors='ignore').rstrip('\r')
+            if line.strip():
+                self._check_line(line, source)
+
+    def _check_line(self, line: str, source: Any) -> None:
+        self.last_activity = time.time()
+        self.output_tail.append(line)
+        del self.output_tail[:-50]
+        if self.fatal_line is None and any(p.search(line) for p in self.fatal_patterns) \
+                and not any(p.search(line) for p in self.benign_patterns):
+            self.fatal_line = f"{source}: {line.strip()}"
+            self.logger.error(f"检测到致命错误输出，提前终止求解器: {self.fatal_line}")
+        elif any(p.search(line) for p in self.progress_patterns):
+            self.milestones.append(line.strip())
+            self.logger.debug(f"求解进度: {line.strip()}")
+
+    def _snapshot_existing_files(self) -> None:
+        """运行前已存在的列表文件从当前末尾开始读，避免旧内容误触发。"""
+        for pattern in self.watch_globs:
+            for path in self.cwd.glob(pattern):
+                try:
+                    self._offsets[path] = path.stat().st_size
+                except OSError:
+                    pass
+
+    def _tail_files(self, final: bool = False) -> None:
+        for pattern in self.watch_globs:
+            for path in self.cwd.glob(pattern):
+                try:
+                    size = path.stat().st_size
+                except OSError:
+                    continue
+                offset = self._offsets.get(path, 0)
+                if size < offset:
+                    offset = 0  # 文件被重写
+                if size > offset:
+                    with open(path, 'rb') as f:
+                        f.seek(offset)
+                        data = f.read(size - offset)
+                    self._offsets[path] = size
+                    self._feed(path.name, data)
+                if final:
+                    self._feed(path.name, b'', final=True)
+
+    # ---------------- 主循环 ----------------
+
+    def _kill(self, process: subprocess.Popen) -> None:
+        try:
+            process.kill()
+            process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            self.logger.warning(f"终止求解器进程失败: {e}")
+
+    def run(self) -> Dict[str, Any]:
+        start = time.time()
+        self.last_activity = start
+        self._snapshot_existing_files()
+        self.logger.info(f"启动求解器: {self.command} (cwd={self.cwd})")
+        try:
+            process = subprocess.Popen(self.command, cwd=str(self.cwd), stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, bufsize=0)
+        except OSError as e:
+            return self._result('start_failed', None, start, reason=f"无法启动求解器: {e}")
+
+        selector = selectors.DefaultSelector()
+        os.set_blocking(process.stdout.fileno(), False)
+        selector.register(process.stdout, selectors.EVENT_READ)
+        stdout_open = True
+        status, reason = None, None
+        next_tail = start
+        try:
+            while True:
+                now = time.time()
+                if now - start > self.timeout:
+                    status, reason = 'timeout', f"超过总超时 {self.timeout} 秒"
+                    break
+                if self.stall_timeout and now - self.last_activity > self.stall_timeout:
+                    status, reason = 'stalled', f"{self.stall_timeout} 秒内没有任何新输出"
+                    break
+
+                wait = max(0.0, min(next_tail - now, start + self.timeout - now))
+                if stdout_open:
+                    for key, _ in selector.select(timeout=wait):
+                        data = os.read(key.fileobj.fileno(), 65536)
+                        if data:
+                            self._feed('stdout', data)
+                        else:
+                            selector.unregister(key.fileobj)
+                            stdout_open = False
+                            self._feed('stdout', b'', final=True)
+                else:
+                    # stdout 已关闭，只剩等待进程退出
+                    try:
+                        process.wait(timeout=wait if wait > 0 else 0.01)
+                    except subprocess.TimeoutExpired:
+                        pass
+
+                if time.time() >= next_tail:
+                    self._tail_files()
+                    next_tail = time.time() + self.tail_interval
+
+                if self.fatal_line is not None:
+                    status, reason = 'fatal', self.fatal_line
+                    break
+                if process.poll() is not None and not stdout_open:
+                    break
+        finally:
+            if process.poll() is None:
+                self._kill(process)
+            selector.close()
+            process.stdout.close()
+
+        # 进程结束后读取列表文件的剩余内容，退出前写出的致命信息也要识别
+        self._tail_files(final=True)
+        if self.fatal_line is not None and process.returncode == 0:
+            # 求解器自行正常退出（返回码 0）：致命模式的命中只记为警告，不判定失败
+            self.logger.warning(f"求解器正常退出，但输出中出现疑似错误信息: {self.fatal_line}")
+            self.warnings.append(self.fatal_line)
+            self.milestones.append(f"WARNING {self.fatal_line}")
+            self.fatal_line = None
+            status, reason = None, None
+        if status is None:
+            if self.fatal_line is not None:
+                status, reason = 'fatal', self.fatal_line
+            elif process.returncode != 0:
+                status, reason = 'failed', f"求解器返回码非零: {process.returncode}"
+            else:
+                status = 'completed'
+        return self._result(status, process.returncode, start, reason=reason)
+
+    def _result(self, status: str, returncode: Optional[int], start: float, reason: Optional[str] = None):
+        elapsed = time.time() - start
+        if status == 'completed':
+            self.logger.info(f"求解器正常结束，耗时 {elapsed:.1f} 秒。")
+        else:
+            self.logger.error(f"求解器运行失败 ({status})，耗时 {elapsed:.1f} 秒: {reason}")
+        return {
+            'success': status == 'completed',
+            'status': status,
+            'reason': reason,
+            'returncode': returncode,
+            'fatal_line': self.fatal_line,
+            'warnings': list(self.warnings),
+            'milestones': list(self.milestones),
+            'output_tail': '\n'.join(self.output_tail),
+            'elapsed': elapsed,
+        }
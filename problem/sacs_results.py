@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SACS 结果提取层，供各问题目录下的 sacs_interface_uc / sacs_interface_weight_improved 共用。
+
+- sacsdb.db 以只读方式只打开一次，UC 的“每杆件取控制工况”和重量的“按组汇总长度/面积”
+  都在 SQL 中完成，Python 侧只处理几十个组的汇总行。
+- sacinp 的 GRUP/PGRUP 截面表按文件内容哈希缓存，同一模型反复评估时不再重复解析。
+- 同一个数据库文件（路径、修改时间、大小都相同）的提取结果也会缓存，因此评估流程中
+  先后调用重量和UC接口只会读一次数据库。
+"""
+
+import os
+import re
+import math
+import sqlite3
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger("SacsResults")
+
+STEEL_DENSITY_LBS_PER_IN3 = 0.28356
+STEEL_AREAS_IN2 = {
+    "W24X55": 16.2, "W24X62": 18.2, "W24X68": 20.0, "W24X76": 22.4, "W24X84": 24.7,
+    "W24X94": 27.7, "W24X103": 30.3, "W24X104": 30.6, "W24X117": 34.4, "W24X131": 38.5,
+    "W24X146": 43.0, "W24X162": 47.7, "W24X176": 51.8, "W24X192": 56.5, "W24X207": 60.9,
+    "W24X229": 67.3
+}
+
+UC_PENALTY = 999.0
+
+# 每杆件取 MaxUC 最大的一行（SQLite 中 MAX() 聚合会带出同一行的其余裸列），再在外层求各项最大值
+UC_SUMMARY_SQL = """
+SELECT COUNT(*), MAX(max_uc), MAX(axial_uc), MAX(MAX(yy_uc, zz_uc))
+FROM (
+    SELECT MemberName,
+           MAX(MaxUC) AS max_uc,
+           ABS(COALESCE(AxialUC, 0.0)) AS axial_uc,
+           ABS(COALESCE(YYBendingUC, 0.0)) AS yy_uc,
+           ABS(COALESCE(ZZBendingUC, 0.0)) AS zz_uc
+    FROM R_POSTMEMBERRESULTS
+    WHERE MaxUC IS NOT NULL AND MaxUC > 0.0
+    GROUP BY MemberName
+)
+"""
+
+UC_PER_MEMBER_SQL = """
+SELECT MemberName, MAX(MaxUC), AxialUC, YYBendingUC, ZZBendingUC
+FROM R_POSTMEMBERRESULTS
+WHERE MaxUC IS NOT NULL AND MaxUC > 0.0
+GROUP BY MemberName
+"""
+
+MEMBER_GROUP_LENGTH_SQL = """
+SELECT MemberGroup, SUM(MemberLength)
+FROM (SELECT DISTINCT MemberName, MemberLength, MemberGroup FROM R_POSTMEMBERRESULTS WHERE MemberLength > 0)
+GROUP BY MemberGroup
+"""
+
+PLATE_GROUP_AREA_SQL = """
+SELECT PlateGroup, SUM(PlateArea)
+FROM (SELECT DISTINCT PlateName, PlateGroup, PlateArea FROM R_POSTPLATERESULTS WHERE PlateArea > 0)
+GROUP BY PlateGroup
+"""
+
+_SECTION_CACHE_SIZE = 256
+_section_cache: "OrderedDict[str, dict]" = OrderedDict()
+_result_cache: Dict[str, dict] = {}
+
+
+def _parse_section_lines(text: str) -> dict:
+    properties = {}
+    for line in text.splitlines():
+        line_stripped = line.strip()
+        parts = line_stripped.split()
+
+        if not parts: continue
+
+        if parts[0] == 'GRUP' and len(parts) > 1:
+            group_name = parts[1]
+            # I-Beam
+            w_section_match = re.search(r'(W\d+X\d+)', line_stripped)
+            if w_section_match:
+                section_name = w_section_match.group(1)
+                if section_name in STEEL_AREAS_IN2:
+                    properties[group_name] = {'type': 'ibeam', 'area': STEEL_AREAS_IN2[section_name]}
+                continue
+            # Tubular
+            try:
+                od = float(line[18:24].strip())
+                wt = float(line[25:30].strip())
+                area = (math.pi / 4) * (od**2 - (od - 2*wt)**2)
+                properties[group_name] = {'type': 'tubular', 'area': area}
+            except (ValueError, IndexError):
+                continue
+
+        elif parts[0] == 'PGRUP' and len(parts) > 1:
+            group_name = parts[1]
+            thick_match = re.search(r"(\d+\.\d+)", line[10:])
+            if thick_match:
+                properties[group_name] = {'type': 'plate', 'thickness': float(thick_match.group(1))}
+    return properties
+
+
+def _section_table(sacinp_path: str):
+    if not os.path.exists(sacinp_path):
+        logger.error(f"sacinp文件不存在: {sacinp_path}")
+        return None, {}
+    with open(sacinp_path, 'rb') as f:
+        data = f.read()
+    key = hashlib.sha1(data).hexdigest()
+    properties = _section_cache.get(key)
+    if properties is None:
+        try:
+            properties = _parse_section_lines(data.decode('latin-1'))
+        except Exception as e:
+            logger.error(f"解析sacinp文件时出错: {e}", exc_info=True)
+            return None, {}
+        _section_cache[key] = properties
+        if len(_section_cache) > _SECTION_CACHE_SIZE:
+            _section_cache.popitem(last=False)
+        logger.info(f"从 sacinp 解析了 {len(properties)} 个组/板的属性。")
+    else:
+        _section_cache.move_to_end(key)
+    return key, properties
+
+
+def section_table(sacinp_path: str) -> dict:
+    """sacinp 中所有 GRUP/PGRUP 的截面属性，按文件内容缓存。返回的字典不要修改。"""
+    return _section_table(sacinp_path)[1]
+
+
+def connect_readonly(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+def _uc_summary(cursor) -> Dict[str, Any]:
+    n_members, max_uc, axial_uc_max, bending_uc_max = cursor.execute(UC_SUMMARY_SQL).fetchone()
+    if not n_members:
+        return {"status": "failed", "message": "数据库中未找到有效的UC记录",
+                "max_uc": UC_PENALTY, "axial_uc_max": UC_PENALTY, "bending_uc_max": UC_PENALTY}
+    return {
+        "status": "success",
+        "total_members": n_members,
+        "max_uc": float(max_uc),
+        "axial_uc_max": float(axial_uc_max),
+        "bending_uc_max": float(bending_uc_max),
+    }
+
+
+def _weight(cursor, group_properties: dict) -> Dict[str, Any]:
+    if not group_properties:
+        return {'status': 'error', 'error': '无法从sacinp文件解析任何组属性'}
+
+    total_weight_lbs = 0.0
+    for group, length_ft in cursor.execute(MEMBER_GROUP_LENGTH_SQL):
+        prop = group_properties.get(group)
+        if prop and prop['type'] in ('tubular', 'ibeam'):
+            total_weight_lbs += prop['area'] * (length_ft * 12.0) * STEEL_DENSITY_LBS_PER_IN3
+    try:
+        for group, area_ft2 in cursor.execute(PLATE_GROUP_AREA_SQL):
+            prop = group_properties.get(group)
+            if prop and prop['type'] == 'plate':
+                total_weight_lbs += (area_ft2 * 144) * prop['thickness'] * STEEL_DENSITY_LBS_PER_IN3
+    except sqlite3.OperationalError:
+        logger.warning("数据库中没有板单元结果表 (R_POSTPLATERESULTS)，将忽略板重量。")
+
+    if total_weight_lbs == 0:
+        return {'status': 'error', 'error': '计算出的总重量为0'}
+    total_weight_tonnes = total_weight_lbs / 2204.62
+    logger.info(f"重量计算成功。总重: {total_weight_tonnes:.2f} 吨。")
+    return {'status': 'success', 'total_weight_tonnes': total_weight_tonnes}
+
+
+def extract_sacs_results(db_path: str, sacinp_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    一次只读连接内完成 UC 摘要和（给定 sacinp 时的）重量计算。
+
+    Returns:
+        {'uc': get_sacs_uc_summary 格式的字典, 'weight': calculate_sacs_weight_from_db 格式的字典或 None}
+    """
+    db_path = str(db_path)
+    if not os.path.exists(db_path):
+        message = f"数据库文件不存在: {db_path}"
+        return {'uc': {"status": "failed", "message": message, "max_uc": UC_PENALTY,
+                       "axial_uc_max": UC_PENALTY, "bending_uc_max": UC_PENALTY},
+                'weight': {'status': 'error', 'error': '数据库文件不存在'}}
+
+    section_key, group_properties = _section_table(sacinp_path) if sacinp_path else (None, None)
+    st = os.stat(db_path)
+    db_key = (st.st_mtime_ns, st.st_size)
+    entry = _result_cache.get(db_path)
+    if entry is None or entry['key'] != db_key:
+        # 新的一次分析结果：旧缓存作废
+        entry = {'key': db_key, 'uc': None, 'weight': {}}
+    need_weight = sacinp_path is not None and section_key not in entry['weight']
+    if entry['uc'] is not None and not need_weight:
+        return {'uc': entry['uc'], 'weight': entry['weight'].get(section_key) if sacinp_path else None}
+
+    try:
+        conn = connect_readonly(db_path)
+        try:
+            cursor = conn.cursor()
+            if entry['uc'] is None:
+                entry['uc'] = _uc_summary(cursor)
+            if need_weight:
+                entry['weight'][section_key] = _weight(cursor, group_properties)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"从数据库提取结果时出错: {e}")
+        uc = entry['uc'] or {"status": "failed", "message": f"数据库查询失败: {e}", "max_uc": UC_PENALTY,
+                             "axial_uc_max": UC_PENALTY, "bending_uc_max": UC_PENALTY}
+        weight = entry['weight'].get(section_key, {'status': 'error', 'error': str(e)}) if sacinp_path else None
+        return {'uc': uc, 'weight': weight}
+
+    _result_cache[db_path] = entry
+    return {'uc': entry['uc'], 'weight': entry['weight'].get(section_key) if sacinp_path else None}
@@ -3,7 +3,6 @@
 import os
 import subprocess
 import time
-import shutil
 import sqlite3
 import logging
 import json
@@ -11,6 +10,9 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, List, Any
 
+from ..sacs_process_supervisor import SacsProcessSupervisor
+from ..sacs_backup_store import get_backup_store, DEFAULT_KEEP
+
 # --- 设置顶级日志记录器 ---
 logging.basicConfig(
     level=logging.INFO,
@@ -24,14 +26,24 @@ class SacsRunner:
     SACS运行器，专为在WSL (Windows Subsystem for Linux) 环境下调用Windows中的SACS程序而设计。
     """
 
-    def __init__(self, project_path: Optional[str] = None, sacs_install_path: Optional[str] = None):
+    def __init__(self, project_path: Optional[str] = None, sacs_install_path: Optional[str] = None,
+                 engine_command: Optional[List[str]] = None, stall_timeout: Optional[float] = None,
+                 fatal_patterns: Optional[List[str]] = None, backup_keep: int = DEFAULT_KEEP):
         """
         初始化SACS运行器。
         - 设定 SACS 项目在 WSL 中的路径。
         - 设定 SACS 在 Windows 中的安装路径。
         - 预先处理好所有需要的 WSL 路径和 Windows 路径。
+        - engine_command: 替代 AnalysisEngine.exe 的命令（如 problem/fake_sacs_engine.py），
+          此时不做 WSL 路径转换，可在普通 Linux 上运行。
+        - stall_timeout / fatal_patterns: 传给 SacsProcessSupervisor，用于提前终止无望的运行。
+          stall_timeout 默认关闭 (None)：部分求解阶段可能长时间没有输出，需按模型规模显式设置。
+        - backup_keep: 备份目录中保留的最近快照数；内容相同的快照只存一份，主基线始终保留。
         """
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.engine_command = list(engine_command) if engine_command else None
+        self.stall_timeout = stall_timeout
+        self.fatal_patterns = fatal_patterns
 
         wsl_project_path_str = project_path or "/mnt/d/wsl_sacs_exchange/sacs_project/Demo13_Section"
         win_sacs_install_path_str = sacs_install_path or r"C:\Program Files (x86)\Bentley\Engineering\SACS CONNECT Edition V16 Update 1"
@@ -68,16 +80,19 @@ class SacsRunner:
         self.db_file: Path = self.project_path / "sacsdb.db"
         self.backup_dir: Path = self.project_path / "backups"
         self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.backup_store = get_backup_store(self.backup_dir, backup_keep)
         self._verify_wsl_environment()
 
         self.logger.info(f"SacsRunner 初始化成功。项目路径 (WSL): {self.project_path}")
         self.logger.info(f"SACS 引擎路径 (WSL): {self.wsl_engine_path_str}")
 
     def _wsl_to_windows_path(self, wsl_path: Path) -> str:
+        if self.engine_command: return str(wsl_path)
         result = subprocess.run(['wslpath', '-w', str(wsl_path)], capture_output=True, text=True, check=True)
         return result.stdout.strip()
 
     def _windows_to_wsl_path(self, win_path: str) -> str:
+        if self.engine_command: return win_path
         result = subprocess.run(['wslpath', '-u', win_path], capture_output=True, text=True, check=True)
         return result.stdout.strip()
 
@@ -86,7 +101,7 @@ class SacsRunner:
             raise FileNotFoundError(f"项目目录在WSL中不存在: {self.project_path}")
         if not self.input_file.exists():
             raise FileNotFoundError(f"SACS输入文件在WSL中不存在: {self.input_file}")
-        if not Path(self.wsl_engine_path_str).exists():
+        if not self.engine_command and not Path(self.wsl_engine_path_str).exists():
             raise FileNotFoundError(f"SACS引擎在WSL中不可见或路径有误: {self.wsl_engine_path_str}")
         self.logger.info("SACS 运行环境 (WSL侧) 验证通过。")
 
@@ -106,8 +121,9 @@ class SacsRunner:
                                    'backup_path': str(backup_path) if backup_path else None})
                 return run_result
 
-            if not self._wait_for_database():
-                return {'success': False, 'error': '数据库文件生成超时或无效',
+            # 求解器已退出，只需短暂确认数据库已写完
+            if not self._database_ready():
+                return {'success': False, 'error': '求解器结束后数据库文件缺失或无效',
                         'execution_time': time.time() - start_time,
                         'backup_path': str(backup_path) if backup_path else None}
 
@@ -126,8 +142,7 @@ class SacsRunner:
             self.logger.info("=" * 20 + " SACS分析结束 " + "=" * 20)
 
     def _execute_sacs_on_windows(self, timeout: int) -> Dict[str, Any]:
-        command_args = [
-            self.wsl_engine_path_str,
+        command_args = (self.engine_command or [self.wsl_engine_path_str]) + [
             self.win_runx_path_str,
             self.win_sacs_install_path_str
         ]
@@ -137,35 +152,22 @@ class SacsRunner:
         self.logger.info(f"即将直接执行Windows程序: {command_args}")
         self.logger.info(f"在WSL工作目录中运行 (将自动映射到Windows): {working_directory_wsl}")
 
-        try:
-            process = subprocess.run(
-                command_args,
-                cwd=working_directory_wsl,
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=timeout,
-                encoding='gbk',
-                errors='ignore'
-            )
-
+        supervisor = SacsProcessSupervisor(command_args, working_directory_wsl, timeout=timeout,
+                                           stall_timeout=self.stall_timeout, fatal_patterns=self.fatal_patterns,
+                                           logger=self.logger)
+        supervision = supervisor.run()
+        if supervision['success']:
             self.logger.info("SACS引擎成功执行。")
-            return {'success': True, 'process': process}
+            return {'success': True, 'supervision': supervision}
 
-        except FileNotFoundError:
-            msg = f"执行失败：在WSL中找不到 '{self.wsl_engine_path_str}'。请检查路径中的空格、权限，并确保wslpath转换正确。"
+        if supervision['status'] == 'start_failed':
+            msg = f"执行失败：在WSL中找不到 '{command_args[0]}'。请检查路径中的空格、权限，并确保wslpath转换正确。"
             self.logger.critical(msg)
-            return {'success': False, 'error': msg}
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"SACS分析失败，返回码非零: {e.returncode}")
-            self.logger.error(f"SACS 输出:\n{e.stderr or e.stdout}")
-            return {'success': False, 'error': e.stderr or e.stdout, 'process': e}
-        except subprocess.TimeoutExpired as e:
-            self.logger.error(f"SACS分析超时（超过 {timeout} 秒）。")
-            return {'success': False, 'error': 'TimeoutExpired', 'process': e}
-        except Exception as e:
-            self.logger.critical(f"执行SACS时发生未知严重错误: {e}", exc_info=True)
-            return {'success': False, 'error': str(e)}
+            return {'success': False, 'error': msg, 'supervision': supervision}
+        error = 'TimeoutExpired' if supervision['status'] == 'timeout' else \
+            f"{supervision['status']}: {supervision['reason']}\n{supervision['output_tail']}"
+        self.logger.error(f"SACS 输出:\n{supervision['output_tail']}")
+        return {'success': False, 'error': error, 'status': supervision['status'], 'supervision': supervision}
 
     def _cleanup_old_results(self):
         self.logger.info("正在清理旧的分析结果...")
@@ -178,27 +180,31 @@ class SacsRunner:
                     self.logger.warning(f"删除文件失败 {f.name}: {e}")
 
     def _create_backup(self, desc: str) -> Optional[Path]:
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = self.backup_dir / f"sacinp_{desc}_{ts}.{self.project_suffix}"
         try:
-            shutil.copy2(self.input_file, backup_path)
+            backup_path = self.backup_store.snapshot(self.input_file, desc)
             self.logger.info(f"已创建输入文件备份: {backup_path.name}")
             return backup_path
         except Exception as e:
             self.logger.error(f"创建备份失败: {e}")
             return None
 
-    def _wait_for_database(self, timeout: int = 60) -> bool:
-        self.logger.info(f"等待数据库文件 '{self.db_file.name}' 生成...")
+    def _database_ready(self, timeout: float = 60, poll: float = 0.5) -> bool:
+        """
+        求解器退出后确认数据库已写完：文件大小在两次检查间不再变化且可以打开。
+        通常一个 poll 间隔后即通过；drvfs 可能仍在回写，因此最多再等待 timeout 秒。
+        """
         end_time = time.time() + timeout
-        while time.time() < end_time:
-            if self.db_file.exists() and self.db_file.stat().st_size > 0:
-                time.sleep(2)
-                if self._check_database_integrity():
-                    self.logger.info("数据库文件已生成并可访问。")
-                    return True
-            time.sleep(1)
-        self.logger.error(f"等待数据库文件超时 ({timeout}秒)。")
+        last_size = -1
+        while True:
+            size = self.db_file.stat().st_size if self.db_file.exists() else 0
+            if size > 0 and size == last_size and self._check_database_integrity():
+                self.logger.info("数据库文件已生成并可访问。")
+                return True
+            if time.time() >= end_time:
+                break
+            last_size = size
+            time.sleep(poll)
+        self.logger.error(f"数据库文件 '{self.db_file.name}' 在 {timeout} 秒内未写完或无效。")
         return False
 
     def _check_database_integrity(self) -> bool:
@@ -19,17 +19,29 @@ Usage:
     
     # Dry run (test without actually running)
     python run_all_baselines.py --problem geo_jk --dry-run
+
+    # Run the full matrix concurrently: 2 SACS licenses, a 120 requests/minute LLM quota
+    python run_all_baselines.py --problem all --seeds 42 43 44 --solver-slots 2 --llm-rpm 120 --retries 1 --yes
+
+Runs are scheduled concurrently by experiment_scheduler.ExperimentScheduler. Each run holds one
+solver slot and its problem's SACS project directory (one run per directory at a time), LLM-driven
+runs also hold --rpm-per-llm-run of the --llm-rpm quota. Runs that already finished (the scheduler's
+<result>.done marker, or for older results a json that reached the evaluation budget) are skipped,
+so re-running the same command resumes the matrix. Status and
+timings of every run are written to logs/experiment_manifest.json, each run's output to logs/.
 """
 
 import os
 import sys
 import shutil
-import subprocess
 import argparse
 import time
+import yaml
 from datetime import datetime
 from pathlib import Path
 
+from experiment_scheduler import ExperimentScheduler, Job, python_cmd, result_is_complete
+
 # ==================== Configuration ====================
 
 # SACS Problems Configuration
@@ -76,15 +88,24 @@ SACS_PROBLEMS = {
 PROJECT_ROOT = Path(__file__).parent.absolute()
 
 # Available algorithms (baselines + MOLLM)
+# config_flag: how the script takes the config path (None = positional)
+# suffix: appended to save_suffix by the script
+# result_dir: folder under save_dir ('full' / 'last' = model.name / its last comma-separated part + results/)
 ALGORITHMS = {
     # Baseline algorithms
-    'ga': {'script': 'baseline_ga.py', 'type': 'baseline'},
-    'sms': {'script': 'baseline_sms.py', 'type': 'baseline'},
-    'nsga2': {'script': 'baseline_nsga2.py', 'type': 'baseline'},
-    'moead': {'script': 'baseline_moead.py', 'type': 'baseline'},
-    'rs': {'script': 'baseline_rs.py', 'type': 'baseline'},
+    'ga': {'script': 'baseline_ga.py', 'type': 'baseline', 'uses_llm': False, 'config_flag': None,
+           'suffix': '_baseline_GA_optimized', 'result_dir': 'full'},
+    'sms': {'script': 'baseline_sms.py', 'type': 'baseline', 'uses_llm': False, 'config_flag': None,
+            'suffix': '_baseline_SMSEMOA', 'result_dir': 'full'},
+    'nsga2': {'script': 'baseline_nsga2.py', 'type': 'baseline', 'uses_llm': False, 'config_flag': None,
+              'suffix': '_baseline_NSGA2', 'result_dir': 'full'},
+    'moead': {'script': 'baseline_moead.py', 'type': 'baseline', 'uses_llm': False, 'config_flag': None,
+              'suffix': '', 'result_dir': 'baseline_moead'},
+    'rs': {'script': 'baseline_rs.py', 'type': 'baseline', 'uses_llm': False, 'config_flag': '--config',
+           'suffix': '', 'result_dir': 'last'},
     # MOLLM
-    'mollm': {'script': 'main.py', 'type': 'mollm'},
+    'mollm': {'script': 'main.py', 'type': 'mollm', 'uses_llm': True, 'config_flag': None,
+              'suffix': '', 'result_dir': 'full'},
 }
 
 # Backward compatibility
@@ -96,6 +117,9 @@ DEFAULT_SEEDS = [42]
 # Log file
 LOG_FILE = PROJECT_ROOT / "baseline_experiments.log"
 
+# Machine-readable status of every run, rewritten after each state change
+MANIFEST_FILE = PROJECT_ROOT / "logs" / "experiment_manifest.json"
+
 # ==================== Helper Functions ====================
 
 def log_message(msg, level="INFO"):
@@ -150,98 +174,53 @@ def reset_sacs_seed(problem_key):
         log_message(f"ERROR: Failed to reset SACS seed file: {e}", "ERROR")
         return False
 
-def run_algorithm(algorithm_name, problem_key, seed, dry_run=False, skip_reset=False):
-    """Run a single algorithm experiment (baseline or MOLLM) for specified problem"""
-    if algorithm_name not in ALGORITHMS:
-        log_message(f"ERROR: Unknown algorithm '{algorithm_name}'", "ERROR")
-        return False
-    
-    if problem_key not in SACS_PROBLEMS:
-        log_message(f"ERROR: Unknown problem '{problem_key}'", "ERROR")
-        return False
-    
+def load_problem_config(problem_key):
+    """Load the YAML config of a problem (paths in SACS_PROBLEMS are relative to problem/)"""
+    with open(PROJECT_ROOT / 'problem' / SACS_PROBLEMS[problem_key]['config_path'], 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+def expected_result_path(algorithm_name, problem_key, seed):
+    """Path of the result json the algorithm writes for this problem and seed"""
+    config = load_problem_config(problem_key)
+    algo_info = ALGORITHMS[algorithm_name]
+    model_name = config['model']['name']
+    model_dir = {'full': model_name, 'last': model_name.split(',')[-1]}.get(algo_info['result_dir'],
+                                                                          algo_info['result_dir'])
+    sub_dir = 'results' if algo_info['result_dir'] in ('full', 'last') else ''
+    file_name = f"{'_'.join(config['goals'])}_{config['save_suffix']}{algo_info['suffix']}_{seed}.json"
+    return str(PROJECT_ROOT / config['save_dir'] / model_dir / sub_dir / file_name)
+
+def build_job(algorithm_name, problem_key, seed, skip_reset=False, cpus_per_run=1, rpm_per_llm_run=30):
+    """Describe one (algorithm, problem, seed) run as a scheduler job"""
     algo_info = ALGORITHMS[algorithm_name]
-    script = algo_info['script']
-    algo_type = algo_info['type']
-    script_path = PROJECT_ROOT / script
     problem = SACS_PROBLEMS[problem_key]
     config_path = problem['config_path']
-    
-    if not script_path.exists():
-        log_message(f"ERROR: Script not found: {script_path}", "ERROR")
-        return False
-    
-    log_message(f"="*80)
-    log_message(f"Starting: {algorithm_name.upper()} ({algo_type}) | {problem['name']} (seed={seed})")
-    log_message(f"Script: {script}")
-    log_message(f"Config: {config_path}")
-    log_message(f"="*80)
-    
-    if dry_run:
-        log_message(f"[DRY RUN] Would execute: python {script} {config_path} --seed {seed}", "DRY_RUN")
-        time.sleep(1)  # Simulate some work
-        return True
-    
-    # Reset seed file before each run (unless skipped)
-    if not skip_reset:
-        if not reset_sacs_seed(problem_key):
-            log_message(f"ERROR: Failed to reset seed file, skipping {algorithm_name}", "ERROR")
-            return False
-    
-    # Build command based on algorithm type
-    if algo_type == 'mollm':
-        # MOLLM uses main.py with config path
-        cmd = [sys.executable, str(script_path), config_path, "--seed", str(seed)]
+    script_path = PROJECT_ROOT / algo_info['script']
+    if algo_info['config_flag']:
+        cmd = python_cmd(script_path, algo_info['config_flag'], config_path, "--seed", seed)
     else:
-        # Baselines use their own scripts
-        cmd = [sys.executable, str(script_path), config_path, "--seed", str(seed)]
-    
-    log_message(f"Executing: {' '.join(cmd)}")
-    
-    start_time = time.time()
-    
-    # Create output log file with problem identifier
-    output_log = PROJECT_ROOT / f"logs/{problem_key}_{algorithm_name}_seed{seed}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    output_log.parent.mkdir(exist_ok=True)
-    
-    try:
-        # Use Popen for real-time output
-        process = subprocess.Popen(
-            cmd,
-            cwd=PROJECT_ROOT,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding='utf-8',
-            errors='replace',
-            bufsize=1  # Line buffered
-        )
-        
-        # Stream output to both console and log file
-        with open(output_log, 'w', encoding='utf-8') as f:
-            for line in process.stdout:
-                print(line, end='')  # Real-time console output
-                f.write(line)        # Save to log file
-                f.flush()            # Force write to disk
-        
-        # Wait for process to complete
-        return_code = process.wait()
-        elapsed = time.time() - start_time
-        
-        if return_code == 0:
-            log_message(f"✓ {algorithm_name.upper()} completed successfully in {elapsed/3600:.2f} hours", "SUCCESS")
-            log_message(f"  Output saved to: {output_log}")
-            return True
-        else:
-            log_message(f"✗ {algorithm_name.upper()} failed with return code {return_code}", "ERROR")
-            log_message(f"  Check log for details: {output_log}")
-            return False
-            
-    except Exception as e:
-        elapsed = time.time() - start_time
-        log_message(f"✗ Exception occurred: {e}", "ERROR")
-        log_message(f"  Runtime before error: {elapsed/3600:.2f} hours")
-        return False
+        cmd = python_cmd(script_path, config_path, "--seed", seed)
+
+    # one run at a time per SACS project directory, plus the global solver slots
+    resources = {'solver': 1, f'sacs:{problem_key}': 1, 'cpu': cpus_per_run}
+    if algo_info['uses_llm']:
+        resources['llm_rpm'] = rpm_per_llm_run
+
+    budget = load_problem_config(problem_key).get('optimization', {}).get('eval_budget')
+    job_id = f"{problem_key}_{algorithm_name}_seed{seed}"
+    return Job(
+        job_id=job_id,
+        cmd=cmd,
+        resources=resources,
+        result_path=expected_result_path(algorithm_name, problem_key, seed),
+        log_path=str(PROJECT_ROOT / f"logs/{job_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
+        cwd=str(PROJECT_ROOT),
+        # baseline_moead.py reads its config path and seed from the environment
+        env={'MOLLM_CONFIG': config_path, 'MOLLM_SEED': str(seed)},
+        before_start=None if skip_reset else (lambda: reset_sacs_seed(problem_key)),
+        is_complete=lambda path: result_is_complete(path, budget),
+        meta={'problem': problem_key, 'algorithm': algorithm_name, 'type': algo_info['type'], 'seed': seed},
+    )
 
 def main():
     parser = argparse.ArgumentParser(
@@ -310,6 +289,60 @@ Examples:
         help='Skip SACS seed file reset (use existing state)'
     )
     
+    parser.add_argument(
+        '--solver-slots',
+        type=int,
+        default=len(SACS_PROBLEMS),
+        help='Maximum number of concurrent SACS runs, e.g. the number of licenses (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--llm-rpm',
+        type=int,
+        default=0,
+        help='LLM requests-per-minute quota shared by LLM-driven runs, 0 for no limit (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--rpm-per-llm-run',
+        type=int,
+        default=30,
+        help='Requests per minute one LLM-driven run is expected to use (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--cpus',
+        type=int,
+        default=os.cpu_count(),
+        help='CPU cores available to all runs together (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--cpus-per-run',
+        type=int,
+        default=1,
+        help='CPU cores reserved for each run (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=0,
+        help='Extra attempts for a run that exits with an error (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--manifest',
+        default=str(MANIFEST_FILE),
+        help='JSON file with status and timings of every run (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--yes',
+        action='store_true',
+        help='Do not ask for confirmation before starting'
+    )
+    
     args = parser.parse_args()
     
     # Determine which problems to run
@@ -355,7 +388,7 @@ Examples:
     total_experiments = len(problems_to_run) * len(algorithms_to_run) * len(args.seeds)
     log_message(f"Total experiments to run: {total_experiments}")
     
-    if not args.dry_run:
+    if not args.dry_run and not args.yes:
         response = input("\nProceed? [y/N]: ")
         if response.lower() != 'y':
             log_message("Aborted by user")
@@ -363,27 +396,24 @@ Examples:
     
     # Run experiments
     start_time = time.time()
-    results = []
-    
-    for problem in problems_to_run:
-        log_message(f"\n{'='*80}")
-        log_message(f"Starting experiments for problem: {SACS_PROBLEMS[problem]['name']}")
-        log_message(f"{'='*80}\n")
-        
-        for algorithm in algorithms_to_run:
-            for seed in args.seeds:
-                success = run_algorithm(
-                    algorithm, 
-                    problem, 
-                    seed, 
-                    dry_run=args.dry_run,
-                    skip_reset=args.skip_reset
-                )
-                results.append((problem, algorithm, seed, success))
-                
-                # Brief pause between experiments
-                if not args.dry_run:
-                    time.sleep(5)
+    jobs = [
+        build_job(algorithm, problem, seed, skip_reset=args.skip_reset,
+                  cpus_per_run=args.cpus_per_run, rpm_per_llm_run=args.rpm_per_llm_run)
+        for problem in problems_to_run
+        for algorithm in algorithms_to_run
+        for seed in args.seeds
+    ]
+    limits = {'solver': args.solver_slots, 'cpu': args.cpus}
+    limits.update({f'sacs:{problem}': 1 for problem in problems_to_run})
+    if args.llm_rpm > 0:
+        limits['llm_rpm'] = args.llm_rpm
+    log_message(f"Resource limits: {limits}")
+    log_message(f"Manifest: {args.manifest}")
+
+    scheduler = ExperimentScheduler(limits, args.manifest, retries=args.retries, echo=log_message)
+    entries = scheduler.run(jobs, dry_run=args.dry_run)
+    results = [(job.meta['problem'], job.meta['algorithm'], job.meta['seed'],
+                entries.get(job.job_id, {}).get('status', 'dry_run')) for job in jobs]
     
     # Summary
     total_time = time.time() - start_time
@@ -391,21 +421,23 @@ Examples:
     log_message("EXPERIMENT SUMMARY")
     log_message("="*80)
     
-    success_count = sum(1 for _, _, _, success in results if success)
-    fail_count = len(results) - success_count
+    success_count = sum(1 for _, _, _, status in results if status == 'success')
+    skipped_count = sum(1 for _, _, _, status in results if status == 'skipped')
+    fail_count = sum(1 for _, _, _, status in results if status == 'failed')
     
     log_message(f"Total experiments: {len(results)}")
     log_message(f"Successful: {success_count}")
+    log_message(f"Skipped (already finished): {skipped_count}")
     log_message(f"Failed: {fail_count}")
     log_message(f"Total time: {total_time/3600:.2f} hours")
     log_message("="*80)
     
     # Detailed results
     log_message("\nDetailed Results:")
-    for problem, algorithm, seed, success in results:
-        status = "✓" if success else "✗"
+    status_marks = {'success': "✓", 'skipped': "-", 'failed': "✗"}
+    for problem, algorithm, seed, status in results:
         algo_type = ALGORITHMS[algorithm]['type']
-        log_message(f"  {status} {problem} | {algorithm.upper()} ({algo_type}) (seed={seed})")
+        log_message(f"  {status_marks.get(status, '?')} {problem} | {algorithm.upper()} ({algo_type}) (seed={seed})")
     
     log_message("="*80)
     log_message(f"All experiments completed. Check {LOG_FILE} for details.")
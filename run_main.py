@@ -1,12 +1,66 @@
+import os
+import argparse
+import yaml
 from main import main
-args = main(['circle_n/config.yaml'])
-from model.MOLLM import MOLLM,ConfigLoader
-
-ns = [31,30,29,28,27]
-for i in ns:
-    config = ConfigLoader(args.config)
-    config.config['description'] = f'n = {i} circles in a unit square'
-    config.config['save_suffix'] = f'circle_packing_{i}'
-    config.config['n_circles'] = i
-    mollm = MOLLM(config,resume=args.resume,eval=args.eval,seed=args.seed,objectives=args.objectives,directions=args.directions)
-    mollm.run()
\ No newline at end of file
+from experiment_scheduler import ExperimentScheduler, Job, python_cmd, result_is_complete
+
+# Sweep over the number of circles. Each n gets its own derived config under
+# problem/circle_n/sweep/ and runs as a separate main.py process, so several
+# sweep points run at once within the LLM quota.
+parser = argparse.ArgumentParser()
+parser.add_argument('--ns', type=int, nargs='+', default=[31,30,29,28,27])
+parser.add_argument('--max_parallel', type=int, default=2)
+parser.add_argument('--llm_rpm', type=int, default=0, help='shared requests-per-minute quota, 0 for no limit')
+parser.add_argument('--rpm_per_run', type=int, default=30)
+parser.add_argument('--retries', type=int, default=0)
+parser.add_argument('--manifest', default='logs/run_main_manifest.json')
+sweep_args, rest = parser.parse_known_args()
+args = main(['circle_n/config.yaml'] + rest)
+
+with open(os.path.join('problem', args.config)) as f:
+    base_config = yaml.safe_load(f)
+sweep_dir = os.path.join(os.path.dirname(args.config), 'sweep')
+os.makedirs(os.path.join('problem', sweep_dir), exist_ok=True)
+
+jobs = []
+for i in sweep_args.ns:
+    config = dict(base_config)
+    config['description'] = f'n = {i} circles in a unit square'
+    config['save_suffix'] = f'circle_packing_{i}'
+    config['n_circles'] = i
+    config_path = os.path.join(sweep_dir, f'config_n{i}.yaml')
+    with open(os.path.join('problem', config_path), 'w') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+
+    cmd = python_cmd('main.py', config_path, '--seed', args.seed)
+    if args.resume:
+        cmd.append('--resume')
+    if args.eval:
+        cmd.append('--eval')
+    if args.objectives:
+        cmd += ['--objectives', *args.objectives]
+    if args.directions:
+        cmd += ['--directions', *args.directions]
+    result_path = os.path.join(config['save_dir'], config['model']['name'], 'results',
+                               '_'.join(args.objectives or config['goals']) + f"_{config['save_suffix']}_{args.seed}.json")
+    budget = config.get('optimization', {}).get('eval_budget')
+    if args.eval:
+        # evaluating existing results: never skipped as finished, and leaves the
+        # run's completion marker alone
+        jobs.append(Job(job_id=f'circle_packing_{i}_seed{args.seed}_eval', cmd=cmd, resources={'run': 1},
+                        log_path=f'logs/circle_packing_{i}_seed{args.seed}_eval.log',
+                        meta={'n_circles': i, 'seed': args.seed, 'eval': True}))
+        continue
+    jobs.append(Job(job_id=f'circle_packing_{i}_seed{args.seed}', cmd=cmd,
+                    resources={'run': 1, 'llm_rpm': sweep_args.rpm_per_run},
+                    result_path=result_path, log_path=f'logs/circle_packing_{i}_seed{args.seed}.log',
+                    is_complete=lambda path, budget=budget: result_is_complete(path, budget),
+                    meta={'n_circles': i, 'seed': args.seed}))
+
+limits = {'run': sweep_args.max_parallel}
+if sweep_args.llm_rpm > 0:
+    limits['llm_rpm'] = sweep_args.llm_rpm
+scheduler = ExperimentScheduler(limits, sweep_args.manifest, retries=sweep_args.retries)
+entries = scheduler.run(jobs)
+for job_id, entry in entries.items():
+    print(f"{job_id}: {entry['status']}")
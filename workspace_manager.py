@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Cheap private workspaces for isolated SACS / VMEC evaluations.
+
+A workspace is a directory tree mirroring a source project directory. The
+manager first copies the filtered source once into a private staging
+directory <root>/.base_*, and every file of a workspace is a hardlink into
+that copy, except the files matching `mutable` patterns (e.g. 'sacinp.*' or
+'input.w7x'), which get a private copy because the candidate rewrites them in
+place. Copies are reflinks (copy-on-write clones) where the filesystem
+supports them and plain copies otherwise, so creating a workspace costs one
+directory walk and no data blocks beyond the mutable files.
+
+Workspaces never share inodes with the source project itself: a solver that
+rewrites a linked file in place can at worst spoil the staged copy of this
+manager, never the master project. Code running in a workspace should still
+only write to mutable files (or create new files, or unlink existing ones).
+Output patterns the solver rewrites in place belong in `ignore` so they are
+never linked in the first place; any other file can be given a private copy
+on demand with Workspace.materialize().
+
+Workspaces are removed when released, when garbage-collected, or at
+interpreter exit, unless the manager was created with keep=True. The staged
+copy is always removed by cleanup() or at exit; kept workspaces still hold
+their linked data. `include` restricts staging to the files the workspaces
+actually need.
+"""
+
+import os
+import errno
+import shutil
+import fnmatch
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+TMPFS_DIR = '/dev/shm'
+
+
+def clone_file(src, dst) -> str:
+    """
+    Private copy of src at dst: a reflink when the filesystem supports it, a
+    regular copy otherwise. Returns 'reflink' or 'copy'.
+    """
+    src, dst = str(src), str(dst)
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    if fcntl is not None:
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return 'reflink'
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+def link_file(src, dst) -> str:
+    """Hardlink src to dst, falling back to clone_file(). Returns 'link', 'reflink' or 'copy'."""
+    try:
+        os.link(src, dst)
+        return 'link'
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            os.unlink(dst)
+            return link_file(src, dst)
+        return clone_file(src, dst)
+
+
+def _matches(name: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatch(name, p) for p in patterns)
+
+
+class Workspace:
+    def __init__(self, manager: 'WorkspaceManager', path: Path):
+        self.manager = manager
+        self.path = path
+        self.materialized = set()
+        self._finalizer = None if manager.keep else weakref.finalize(self, shutil.rmtree, str(path), True)
+
+    def materialize(self, relpath) -> Path:
+        """Replace a linked file with a private copy before writing to it in place."""
+        relpath = str(relpath)
+        target = self.path / relpath
+        if relpath not in self.materialized:
+            clone_file(self.manager.base / relpath, target)
+            self.materialized.add(relpath)
+        return target
+
+    def reset(self) -> None:
+        """Bring mutable and materialized files back to the source state (cheap restore_baseline)."""
+        for relpath in self.manager.mutable_files + sorted(self.materialized):
+            clone_file(self.manager.base / relpath, self.path / relpath)
+
+    def release(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer()
+        elif not self.manager.keep:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> 'Workspace':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def __fspath__(self) -> str:
+        return str(self.path)
+
+
+class WorkspaceManager:
+    """
+    Creates workspaces mirroring `source` under `root`.
+
+    source:  project directory, treated as read-only
+    root:    where workspaces live; a fresh temporary directory when omitted
+             (under /dev/shm when tmpfs=True)
+    mutable: file name patterns that get a private copy in every workspace
+    ignore:  file or directory name patterns left out of workspaces entirely
+    include: if given, only files matching these name patterns (or `mutable`)
+             are staged and appear in workspaces
+    keep:    leave workspaces on disk after release / exit; the staged copy is
+             removed by cleanup() or at exit either way (linked files keep their data)
+    """
+
+    def __init__(self, source, root=None, mutable: Iterable[str] = (), ignore: Iterable[str] = (),
+                 include: Optional[Iterable[str]] = None, tmpfs: bool = False, keep: bool = False):
+        self.source = Path(source).resolve()
+        self.mutable = list(mutable)
+        self.ignore = list(ignore)
+        self.include = None if include is None else list(include) + self.mutable
+        self.keep = keep
+        if root is None:
+            tmp_parent = TMPFS_DIR if tmpfs and os.path.isdir(TMPFS_DIR) else None
+            self.root = Path(tempfile.mkdtemp(prefix='mollm_ws_', dir=tmp_parent))
+            self._owns_root = True
+        else:
+            self.root = Path(root)
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._owns_root = False
+
+        self.dirs, files = self._scan()
+        self.mutable_files = [f for f in files if _matches(os.path.basename(f), self.mutable)]
+        self.shared_files = [f for f in files if not _matches(os.path.basename(f), self.mutable)]
+        self.base = self._stage_base()
+
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._finalizer = weakref.finalize(self, self._remove, str(self.root), str(self.base),
+                                           self._owns_root and not keep)
+
+    def _scan(self) -> Tuple[List[str], List[str]]:
+        """Walk the source once; workspaces are created from the cached listing."""
+        dirs, files = [], []
+        for current, subdirs, names in os.walk(self.source):
+            subdirs[:] = sorted(d for d in subdirs if not _matches(d, self.ignore))
+            rel = os.path.relpath(current, self.source)
+            if rel != '.':
+                dirs.append(rel)
+            for name in sorted(names):
+                if _matches(name, self.ignore) or (self.include is not None and not _matches(name, self.include)):
+                    continue
+                files.append(name if rel == '.' else os.path.join(rel, name))
+        if self.include is not None:
+            # only the directories leading to staged files
+            dirs = [d for d in dirs if any(f.startswith(d + os.sep) for f in files)]
+        return dirs, files
+
+    def _stage_base(self) -> Path:
+        """
+        One private copy of the source next to the workspaces: links never reach the
+        master project, and they work when the root is on another filesystem (tmpfs).
+        """
+        base = Path(tempfile.mkdtemp(prefix='.base_', dir=self.root))
+        for rel in self.dirs:
+            (base / rel).mkdir()
+        for rel in self.mutable_files + self.shared_files:
+            clone_file(self.source / rel, base / rel)
+        return base
+
+    @staticmethod
+    def _remove(root: str, base: str, remove_root: bool) -> None:
+        shutil.rmtree(root if remove_root else base, ignore_errors=True)
+
+    def create(self, name: Optional[str] = None) -> Workspace:
+        """Build a new workspace (replacing any leftover directory of the same name)."""
+        if name is None:
+            with self._lock:
+                self._counter += 1
+                name = f"ws_{os.getpid()}_{self._counter}"
+        path = self.root / name
+        if path.exists():
+            shutil.rmtree(path)
+        path.mkdir()
+        for rel in self.dirs:
+            (path / rel).mkdir()
+        for rel in self.shared_files:
+            link_file(self.base / rel, path / rel)
+        for rel in self.mutable_files:
+            clone_file(self.base / rel, path / rel)
+        return Workspace(self, path)
+
+    def cleanup(self) -> None:
+        """Remove the staged base (and the root if the manager created it and keep is off)."""
+        self._finalizer()